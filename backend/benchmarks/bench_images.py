@@ -0,0 +1,156 @@
+"""
+Benchmark outfit image processing on 12-megapixel phone photos.
+
+Compares the former pipeline (``verify()``, a full-resolution decode for the
+compressed image and another for the thumbnail) with the single-decode
+pipeline in ``common.utils.image_processing``. Each path runs in its own
+subprocess. Peak memory is the resident high-water mark during processing,
+above the memory in use once the upload is loaded (``VmHWM`` reset through
+``/proc/self/clear_refs`` on Linux, ``ru_maxrss`` of the whole worker
+elsewhere).
+
+Usage (from the backend directory):
+    python benchmarks/bench_images.py [--repeat 5] [--size 4032 3024] [--format PNG]
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fitmate.settings_test')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from common.utils.image_processing import process_outfit_image  # noqa: E402
+
+
+def legacy_process(image):
+    # Former pipeline: the upload is decoded three times at full resolution
+    img = Image.open(image)
+    img.verify()
+
+    image.seek(0)
+    img = Image.open(image)
+    img.thumbnail((1920, 1920), Image.Resampling.LANCZOS)
+    compressed = BytesIO()
+    img.save(compressed, format='JPEG', quality=85, optimize=True)
+
+    image.seek(0)
+    img = Image.open(image)
+    img.thumbnail((300, 300), Image.Resampling.LANCZOS)
+    thumbnail = BytesIO()
+    img.save(thumbnail, format='JPEG', quality=85, optimize=True)
+    return compressed, thumbnail
+
+
+def single_decode_process(image):
+    compressed, thumbnail, error = process_outfit_image(image)
+    assert error is None, error
+    return compressed, thumbnail
+
+
+PATHS = {
+    'three decodes (former)': legacy_process,
+    'single decode + draft': single_decode_process,
+}
+
+
+def make_photo(path, size, fmt='JPEG'):
+    """Write a JPEG resembling a phone photo (gradients plus sensor-like noise)"""
+    width, height = size
+    gradient = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise((width // 4, height // 4), 30).resize(size)
+    Image.merge('RGB', (noise, gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(
+        path, fmt, quality=92
+    )
+
+
+def reset_peak_rss():
+    """Start a new high-water mark (Linux); returns False where that is not possible"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            return int(re.search(r'VmHWM:\s+(\d+)', f.read()).group(1))
+    except (OSError, AttributeError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def current_rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return peak_rss_kb()
+
+
+def worker(label, photo, repeat):
+    with open(photo, 'rb') as f:
+        data = f.read()
+    content_type = Image.MIME[Image.open(photo).format]
+    uploads = [SimpleUploadedFile(os.path.basename(photo), data, content_type=content_type) for _ in range(repeat)]
+    # Without a resettable high-water mark the figure also includes startup (imports, settings)
+    baseline = current_rss_kb() if reset_peak_rss() else 0
+
+    fn = PATHS[label]
+    start = time.process_time()
+    for upload in uploads:
+        fn(upload)
+    cpu_ms = (time.process_time() - start) * 1000 / repeat
+    print(json.dumps({'cpu_ms': cpu_ms, 'peak_mb': (peak_rss_kb() - baseline) / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--size', type=int, nargs=2, default=[4032, 3024])
+    parser.add_argument('--format', choices=['JPEG', 'PNG', 'WEBP'], default='JPEG')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--photo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.photo, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        photo = os.path.join(tmp, f'photo.{args.format.lower()}')
+        make_photo(photo, tuple(args.size), args.format)
+        megapixels = args.size[0] * args.size[1] / 1e6
+        print(f'{megapixels:.1f} MP {args.format}, {os.path.getsize(photo) / 1e6:.1f} MB, {args.repeat} runs')
+
+        header = f"{'path':<26}{'cpu ms/image':>14}{'peak MB':>10}"
+        print(header)
+        print('-' * len(header))
+        for label in PATHS:
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', label, '--photo', photo, '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:<26}{result['cpu_ms']:>14.1f}{result['peak_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark the complete-look search on large synthetic wardrobes.
+
+Compares the pruned top-k pair search with exhaustive enumeration of every
+top/bottom pair, and times layered (top + bottom + outerwear) search.
+
+Usage (from the backend directory):
+    python benchmarks/bench_looks.py [--sizes 1000 2000 5000] [--k 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fitmate.settings_test')
+
+import django  # noqa: E402
+
+django.setup()
+
+from recommendations.looks import (  # noqa: E402
+    LookItem, item_score, pair_bonus, search_looks, top_k_pairs
+)
+
+OCCASIONS = [None, 'casual', 'formal', 'sports', 'party', 'work']
+SEASONS = [None, 'spring', 'summer', 'fall', 'winter', 'all_season']
+COLORS = [None, 'neutral', 'warm', 'cool']
+
+
+def make_items(rng, n, realistic):
+    items = []
+    for i in range(n):
+        occasion, season = rng.choice(OCCASIONS), rng.choice(SEASONS)
+        if realistic:
+            # Most items have no fit result, so scores cluster on a few values
+            fit = rng.choice([75] * 8 + [rng.uniform(40, 100)])
+            score = item_score(fit, occasion, season, 'work', 'fall')
+        else:
+            score = rng.uniform(0, 100)
+        items.append(LookItem(i, score, occasion, season, rng.choice(COLORS)))
+    return items
+
+
+def brute_force(tops, bottoms, k):
+    scores = [t.score + b.score + pair_bonus(t, b) for t in tops for b in bottoms]
+    scores.sort(reverse=True)
+    return scores[:k]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 5000])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--brute-max', type=int, default=2000,
+                        help='Largest size for which the exhaustive baseline is run')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    header = f"{'dist':<10}{'items':>7}{'pairs':>12}{'evaluated':>11}{'pruned ms':>11}{'brute ms':>10}{'layered ms':>12}"
+    print(header)
+    print('-' * len(header))
+
+    for realistic in (False, True):
+        for n in args.sizes:
+            tops, bottoms = make_items(rng, n, realistic), make_items(rng, n, realistic)
+            layers = make_items(rng, n // 4, realistic)
+
+            stats = {}
+            pairs, pruned_ms = timed(lambda: top_k_pairs(tops, bottoms, args.k, stats))
+
+            brute_ms = float('nan')
+            if n <= args.brute_max:
+                expected, brute_ms = timed(lambda: brute_force(tops, bottoms, args.k))
+                assert [round(s, 6) for s, _, _ in pairs] == [round(s, 6) for s in expected]
+
+            _, layered_ms = timed(lambda: search_looks(tops, bottoms, layers, k=args.k))
+
+            print(f"{'realistic' if realistic else 'uniform':<10}{n:>7}{n * n:>12}{stats['evaluated']:>11}"
+                  f"{pruned_ms:>11.2f}{brute_ms:>10.1f}{layered_ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark outfit serialization for recommendation responses.
+
+Compares the per-item cost of the former path (``OutfitSerializer`` per
+outfit, one tags query each), ``OutfitSerializer(many=True)`` with prefetched
+tags, and the values-based fast path from ``outfits.representations``. Runs
+against an in-memory SQLite database.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py [--sizes 10 50 200] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fitmate.settings_test')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, reset_queries  # noqa: E402
+from django.db.models import prefetch_related_objects  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from outfits.models import Outfit, OutfitTag  # noqa: E402
+from outfits.representations import represent_instances, represent_outfits  # noqa: E402
+from outfits.serializers import OutfitSerializer  # noqa: E402
+
+
+def make_outfits(user, n):
+    outfits = Outfit.objects.bulk_create([
+        Outfit(user=user, name=f'Outfit {i}', description='Benchmark outfit', image=f'outfits/{i}.jpg',
+               thumbnail=f'outfits/thumbnails/{i}.jpg', category='top', occasion='casual',
+               brand='Brand', color='Blue', season='summer', outfit_chest=Decimal('96.5'),
+               outfit_waist=Decimal('80'), times_worn=i)
+        for i in range(n)
+    ])
+    OutfitTag.objects.bulk_create([
+        OutfitTag(outfit=outfit, tag=tag) for outfit in outfits for tag in ('casual', 'weekend')
+    ])
+    return [outfit.id for outfit in outfits]
+
+
+def per_outfit(ids):
+    # Former path: the recommender's instances serialized one by one
+    return [OutfitSerializer(outfit).data for outfit in Outfit.objects.filter(pk__in=ids)]
+
+
+def prefetched(ids):
+    outfits = list(Outfit.objects.filter(pk__in=ids))
+    prefetch_related_objects(outfits, 'tags')
+    return OutfitSerializer(outfits, many=True).data
+
+
+def fast_instances(ids):
+    return represent_instances(list(Outfit.objects.filter(pk__in=ids)))
+
+
+def fast_values(ids):
+    return represent_outfits(ids)
+
+
+def measure(fn, ids, repeat):
+    with CaptureQueriesContext(connection) as queries:
+        fn(ids)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(ids)
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed * 1e6 / len(ids), len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+
+    paths = [
+        ('per-outfit serializer', per_outfit),
+        ('serializer + prefetch', prefetched),
+        ('fast path (instances)', fast_instances),
+        ('fast path (.values())', fast_values),
+    ]
+    header = f"{'path':<24}{'items':>7}{'queries':>9}{'us/item':>10}"
+    print(header)
+    print('-' * len(header))
+
+    for n in args.sizes:
+        ids = make_outfits(user, n)
+        reference = JSONRenderer().render(sorted(per_outfit(ids), key=lambda o: o['id']))
+        for label, fn in paths:
+            output = sorted(fn(ids), key=lambda o: o['id'])
+            assert JSONRenderer().render(output) == reference, f'{label} output differs'
+            per_item_us, queries = measure(fn, ids, args.repeat)
+            print(f'{label:<24}{n:>7}{queries:>9}{per_item_us:>10.1f}')
+        reset_queries()
+        Outfit.objects.all().delete()
+
+
+if __name__ == '__main__':
+    main()
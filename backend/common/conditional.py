@@ -0,0 +1,68 @@
+"""
+Conditional GET from per-user version stamps.
+
+Dashboard endpoints are polled far more often than the data behind them
+changes. Instead of hashing the rendered body, each endpoint provides a
+version function that reads a cheap stamp from an index (e.g. the count and
+latest ``updated_at`` of the user's rows). The stamp, together with the
+request path and query string, becomes a weak ``ETag`` and its timestamp the
+``Last-Modified`` header; a request whose ``If-None-Match`` (or
+``If-Modified-Since``) matches gets ``304 Not Modified`` before the view runs
+its queries or serializes anything.
+
+HTTP dates have whole-second precision, so ``Last-Modified`` is the stamp
+rounded up and is only sent (and ``If-Modified-Since`` only honoured) once
+that second is over: a later change can then never fall in the advertised
+second and be answered with a stale 304.
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Weak ETag from the string forms of ``parts`` (weak: JSON and browsable renderings share it)"""
+    digest = hashlib.blake2b('|'.join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def conditional_get(version_func):
+    """
+    Decorate an ``APIView.get`` with ETag/Last-Modified validators.
+
+    Args:
+        version_func: Callable taking the request and returning ``(stamp, last_modified)``:
+            a value that changes whenever the response would, and a datetime or None
+
+    Returns:
+        Decorator for the view's ``get`` method
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            stamp, last_modified = version_func(request)
+            # Pages, filters and field selections of one endpoint are different representations
+            etag = make_etag(type(self).__name__, request.user.pk, request.get_full_path(), stamp)
+            timestamp = math.ceil(last_modified.timestamp()) if last_modified else None
+            if timestamp is not None and timestamp >= time.time():
+                # The second is still open; validate with the ETag alone
+                timestamp = None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = get(self, request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                if timestamp is not None:
+                    response.headers.setdefault('Last-Modified', http_date(timestamp))
+            # Per-user data: keep it out of shared caches and have clients revalidate every time
+            patch_vary_headers(response, ('Authorization',))
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
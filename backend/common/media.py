@@ -0,0 +1,179 @@
+"""
+Serving stored media files.
+
+Files are streamed with ``FileResponse`` so WSGI servers that support
+``wsgi.file_wrapper`` (gunicorn) send them with ``sendfile()`` straight from
+the page cache; byte ranges are served the same way from an offset. Behind
+nginx, ``MEDIA_ACCEL_REDIRECT_PREFIX`` hands the transfer to the proxy with
+``X-Accel-Redirect`` after Django has checked access. Either way image bytes
+never pass through Python.
+
+Media URLs carry an expiry and a signature of the file name and expiry (see
+``common.storage``), so ``<img>`` tags, which cannot send an Authorization
+header, can load files the API handed out. Expiries are rounded to
+``MEDIA_URL_LIFETIME`` buckets so a file's URL stays the same (and cached)
+within a bucket; a URL works for one to two lifetimes, after which access is
+checked again, so a URL handed out while an outfit was public stops working
+once it is made private.
+"""
+import mimetypes
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+_signer = signing.Signer(salt='fitmate.media')
+# Seconds a served file may be cached privately
+MEDIA_MAX_AGE = 86400
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_url_bucket(now=None):
+    """Start (Unix time) of the current URL bucket; signed URLs change when it does"""
+    lifetime = settings.MEDIA_URL_LIFETIME
+    now = int(time.time() if now is None else now)
+    return now - now % lifetime
+
+
+def media_expiry(now=None):
+    """Expiry of URLs signed now: the end of the bucket after the current one"""
+    return media_url_bucket(now) + 2 * settings.MEDIA_URL_LIFETIME
+
+
+def media_signature(name, expires):
+    return _signer.signature(f'{name}:{expires}')
+
+
+def verify_media_signature(name, expires, signature):
+    """
+    Check a media URL's signature.
+
+    Returns:
+        int or None: Expiry of a genuine, unexpired signature, otherwise None
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return None
+    if not signature or expires <= time.time():
+        return None
+    if not signing.constant_time_compare(media_signature(name, expires), signature):
+        return None
+    return expires
+
+
+class FileRange:
+    """
+    File-like view of ``length`` bytes of an open file starting at ``start``.
+
+    ``fileno()`` and the file position let sendfile() send the range without
+    reading it; ``read()`` is bounded for servers that copy through Python.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``Range: bytes=...`` header.
+
+    Returns:
+        tuple or None or False: (start, end) inclusive; None to ignore the
+        header (absent, malformed or multiple ranges); False if unsatisfiable
+    """
+    match = _RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def serve_file(request, path, name, content_type=None, max_age=MEDIA_MAX_AGE):
+    """
+    Stream a file with validators, byte ranges and optional X-Accel-Redirect.
+
+    Args:
+        request: The request
+        path: Filesystem path of the file
+        name: Name of the file relative to ``MEDIA_ROOT`` (for X-Accel-Redirect)
+        content_type: Content type (guessed from the name when omitted)
+        max_age: Seconds the (private) response may be cached
+
+    Returns:
+        HttpResponse: 200, 206, 304 or 416 response
+    """
+    if content_type is None:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        accel_prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+        if accel_prefix:
+            # The proxy sends the body and handles Range itself
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + name
+        else:
+            response = _file_response(request, path, stat.st_size, etag, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=max_age)
+    return response
+
+
+def _file_response(request, path, size, etag, content_type):
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        # The client's copy is outdated: send the whole file
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,122 @@
+"""
+Pagination with an opt-in keyset (cursor) mode.
+
+Page-number pagination needs a ``COUNT(*)`` and an ``OFFSET`` that grows with
+page depth. Views that declare ``cursor_ordering`` (timestamp fields followed
+by the integer ``id``, e.g. ``('-uploaded_at', '-id')``) can also be paged by
+keyset: when the request has a ``cursor`` parameter (empty for the first page),
+the next page is fetched with
+``WHERE (uploaded_at, id) < (last_uploaded_at, last_id)`` over
+a matching index, so every page costs the same. Requests without ``cursor``
+keep the page-number response, so existing clients are unaffected.
+
+Keyset pages always follow ``cursor_ordering``, so ``cursor`` combined with a
+parameter of the view's filter backends that reorders results (``ordering``,
+or ``search`` ranked by relevance) is rejected with 400 rather than silently
+reordered.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetOrPageNumberPagination(PageNumberPagination):
+    """Page numbers by default, keyset pages when ``cursor`` is given"""
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    conflicting_order_message = 'Cannot be combined with {param}; cursor pages are ordered newest first.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        ordering = getattr(view, 'cursor_ordering', None)
+        if not ordering or self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.check_order_params(request, view)
+        self.request = request
+        self.keyset = ordering
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*ordering)
+        position = self.decode_cursor(request.query_params[self.cursor_query_param])
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        items = list(queryset[:page_size + 1])
+        self.has_next = len(items) > page_size
+        self.page = items[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'results': data,
+        })
+
+    def check_order_params(self, request, view):
+        """Reject filter parameters that would order results differently from the keyset"""
+        for backend in getattr(view, 'filter_backends', ()):
+            for attr in ('ordering_param', 'search_param'):
+                param = getattr(backend, attr, None)
+                if param and request.query_params.get(param):
+                    raise ValidationError({
+                        self.cursor_query_param: self.conflicting_order_message.format(param=param)
+                    })
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Condition selecting rows after ``position`` in ``ordering``.
+
+        Expands the row-value comparison ``(a, b) < (x, y)`` into
+        ``a < x OR (a = x AND b < y)``, which every backend can satisfy with
+        an index on the ordering columns.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = [getattr(last, field.lstrip('-')) for field in self.keyset]
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    @staticmethod
+    def encode_cursor(position):
+        text = '|'.join(
+            value.isoformat() if isinstance(value, datetime) else str(value) for value in position
+        )
+        return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Returns:
+            list or None: Position values, or None for the first page
+        """
+        if not cursor:
+            return None
+        try:
+            text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            values = text.split('|')
+            if len(values) != len(self.keyset):
+                raise ValueError
+            # The last (unique) field is an integer id, the others timestamps
+            return [datetime.fromisoformat(value) for value in values[:-1]] + [int(values[-1])]
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,54 @@
+"""
+Shared serializer helpers.
+"""
+from rest_framework import permissions, serializers
+
+
+def sparse_field_names(request, available):
+    """
+    Field names selected by the ``fields`` and ``omit`` query parameters.
+
+    Both take comma-separated names; unknown names are ignored.
+
+    Args:
+        request: The current request (or None)
+        available: Names the serializer can render
+
+    Returns:
+        list: Names to render, in ``available`` order
+    """
+    names = list(available)
+    if request is None:
+        return names
+
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if fields:
+        wanted = {name.strip() for name in fields.split(',')}
+        names = [name for name in names if name in wanted]
+    if omit:
+        unwanted = {name.strip() for name in omit.split(',')}
+        names = [name for name in names if name not in unwanted]
+    return names
+
+
+class SparseFieldsMixin:
+    """
+    Let API clients pick fields with ``?fields=a,b`` or ``?omit=c``.
+
+    Only applies to reads, and only to the top-level serializer of a response
+    (or the child of a top-level list); nested serializers always render in
+    full and writes always validate every field.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        request = self.context.get('request')
+        if parent is not None or request is None or request.method not in permissions.SAFE_METHODS:
+            return fields
+
+        keep = set(sparse_field_names(request, fields))
+        return {name: field for name, field in fields.items() if name in keep}
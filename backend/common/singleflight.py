@@ -0,0 +1,57 @@
+"""
+Request coalescing for duplicate concurrent work.
+
+When several threads of the same worker ask for the same key at the same time,
+only the first one runs the computation; the others wait and receive its result.
+Nothing is cached once the call finishes, so later requests always recompute.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers using the same key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run ``fn`` once for all concurrent callers with ``key``.
+
+        Args:
+            key: Hashable identifier of the computation (user, parameters, ...)
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            The result of ``fn``; exceptions are re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
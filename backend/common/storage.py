@@ -0,0 +1,26 @@
+"""
+File storage whose URLs are signed.
+
+Media files are served by an access-checked view (``common.media``). Browsers
+load images with plain ``<img>`` requests that carry no Authorization header,
+so every URL the API hands out includes an expiry and a signature of the
+file name and expiry; the view serves signed names without further checks
+until they expire. Expiries are bucketed, so URLs are stable for a while and
+browser caches keep working.
+"""
+from urllib.parse import urlencode
+
+from django.core.files.storage import FileSystemStorage
+
+from .media import media_expiry, media_signature
+
+
+class SignedFileSystemStorage(FileSystemStorage):
+    """``FileSystemStorage`` that appends ``?exp=<expiry>&sig=<signature>`` to file URLs"""
+
+    def url(self, name):
+        url = super().url(name)
+        if not name:
+            return url
+        expires = media_expiry()
+        return f"{url}?{urlencode({'exp': expires, 'sig': media_signature(name, expires)})}"
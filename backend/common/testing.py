@@ -0,0 +1,43 @@
+"""
+Helpers shared by the test suites.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+
+class QueryCounter:
+    """Thread-safe execute wrapper counting SQL statements across connections"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_concurrently(workers, fn):
+    """
+    Load generator: call ``fn(i)`` from ``workers`` threads released at the same instant.
+
+    Each thread closes its own database connection when done.
+
+    Returns:
+        list: Results in submission order
+    """
+    barrier = threading.Barrier(workers)
+
+    def run(i):
+        barrier.wait()
+        try:
+            return fn(i)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, i) for i in range(workers)]
+        return [future.result() for future in futures]
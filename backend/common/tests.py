@@ -0,0 +1,257 @@
+import base64
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import mock, skipUnless
+
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from .singleflight import SingleFlight
+from .utils.disk_cache import DiskLRUCache
+from .testing import run_concurrently
+from .utils.image_processing import (
+    decode_image, dhash, dominant_colors, placeholder_data_uri, process_image, process_outfit_image,
+    validate_image
+)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Test request coalescing primitive"""
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def slow(self, result=42):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.1)
+        return result
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test concurrent callers with the same key run the function once"""
+        results = run_concurrently(10, lambda i: self.flight.do('key', self.slow))
+        self.assertEqual(results, [42] * 10)
+        self.assertEqual(self.calls, 1)
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test a finished call is not reused by later callers"""
+        self.flight.do('key', self.slow)
+        self.flight.do('key', self.slow)
+        self.assertEqual(self.calls, 2)
+
+    def test_errors_propagate_to_all_waiters(self):
+        """Test every concurrent caller sees the leader's exception"""
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        def call(i):
+            try:
+                self.flight.do('key', fail)
+            except ValueError as e:
+                return str(e)
+
+        self.assertEqual(run_concurrently(5, call), ['boom'] * 5)
+
+
+def make_upload(size=(4000, 3000), mode='RGB', fmt='JPEG', color='navy', content_type='image/jpeg'):
+    output = BytesIO()
+    Image.new(mode, size, color).save(output, fmt)
+    return SimpleUploadedFile(f'photo.{fmt.lower()}', output.getvalue(), content_type=content_type)
+
+
+# Peak memory (kB) a fresh interpreter adds while processing the file given as argv[1].
+# VmHWM starts over with each exec, unlike ru_maxrss, which keeps the parent's peak.
+PEAK_MEMORY_SCRIPT = """
+import sys
+import django
+django.setup()
+from django.core.files.uploadedfile import SimpleUploadedFile
+from common.utils.image_processing import process_image
+
+def peak():
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+
+upload = SimpleUploadedFile('photo.png', open(sys.argv[1], 'rb').read(), content_type='image/png')
+before = peak()
+process_image(upload)
+print(peak() - before)
+"""
+
+
+class ImagePipelineTests(SimpleTestCase):
+    """Test the single-decode upload pipeline"""
+
+    def test_jpeg_is_scaled_while_decoding(self):
+        """Test large JPEGs are decoded at a reduced scale that still covers the target"""
+        img = decode_image(make_upload())
+        self.assertEqual(img.size, (2000, 1500))
+
+    def test_mpo_is_accepted_as_jpeg(self):
+        """Test multi-picture JPEGs from phone cameras validate and are scaled while decoding"""
+        output = BytesIO()
+        Image.new('RGB', (4000, 3000), 'navy').save(output, 'MPO', save_all=True,
+                                                     append_images=[Image.new('RGB', (400, 300), 'red')])
+        upload = SimpleUploadedFile('photo.jpg', output.getvalue(), content_type='image/jpeg')
+        self.assertEqual(validate_image(upload), (True, None))
+        self.assertEqual(decode_image(upload).size, (2000, 1500))
+        upload.seek(0)
+        self.assertEqual(process_image(upload).width, 1920)
+
+    def test_image_and_thumbnail(self):
+        """Test the stored image and thumbnail are resized JPEGs with their real byte size"""
+        upload = make_upload()
+        with mock.patch.object(Image, 'open', wraps=Image.open) as opened:
+            processed = process_image(upload)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual((processed.width, processed.height), (1920, 1440))
+
+        for file, size, name in ((processed.image, (1920, 1440), 'photo.jpg'),
+                                 (processed.thumbnail, (300, 225), 'photo_thumb.jpg')):
+            self.assertEqual(file.name, name)
+            self.assertEqual(file.size, len(file.read()))
+            file.seek(0)
+            with Image.open(file) as img:
+                self.assertEqual((img.format, img.size), ('JPEG', size))
+
+    def test_dhash_survives_resizing_and_reencoding(self):
+        """Test copies of a photo hash alike and different photos do not"""
+        pixels = np.random.RandomState(0).randint(0, 256, (30, 40), dtype=np.uint8)
+        photo = Image.fromarray(pixels).resize((400, 300), Image.Resampling.BICUBIC).convert('RGB')
+        copy = BytesIO()
+        photo.resize((200, 150)).save(copy, 'JPEG', quality=60)
+        with Image.open(copy) as img:
+            self.assertLessEqual(bin(dhash(photo) ^ dhash(img)).count('1'), 2)
+        mirrored = photo.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        self.assertGreater(bin(dhash(photo) ^ dhash(mirrored)).count('1'), 16)
+        self.assertEqual(process_image(make_upload()).dhash, dhash(Image.new('RGB', (300, 225), 'navy')))
+
+    def test_dominant_colors_skip_plain_backdrop(self):
+        """Test k-means finds the garment colors and leaves out a uniform background"""
+        photo = Image.new('RGB', (300, 225), (245, 245, 245))
+        photo.paste((25, 35, 80), (60, 20, 240, 205))
+        photo.paste((200, 30, 40), (60, 20, 240, 60))
+        colors = dominant_colors(photo)
+        self.assertEqual(colors[0][0], (25, 35, 80))
+        self.assertAlmostEqual(colors[0][1], 0.72, delta=0.05)
+        self.assertLess(max(abs(a - b) for a, b in zip(colors[1][0], (200, 30, 40))), 12)
+        self.assertAlmostEqual(sum(share for _, share in colors), 1)
+        # Without a backdrop, everything counts
+        self.assertEqual(dominant_colors(Image.new('RGB', (300, 225), 'teal')), [((0, 128, 128), 1.0)])
+
+    def test_placeholder_is_a_tiny_data_uri(self):
+        """Test placeholders are small WebP data URIs of the image's shape"""
+        pixels = np.random.RandomState(0).randint(0, 256, (30, 40, 3), dtype=np.uint8)
+        photo = Image.fromarray(pixels).resize((300, 225), Image.Resampling.BICUBIC)
+        placeholder = placeholder_data_uri(photo)
+        prefix = 'data:image/webp;base64,'
+        self.assertTrue(placeholder.startswith(prefix))
+        self.assertLess(len(placeholder), 500)
+        with Image.open(BytesIO(base64.b64decode(placeholder[len(prefix):]))) as img:
+            self.assertEqual((img.format, img.size), ('WEBP', (24, 18)))
+        self.assertTrue(process_image(make_upload()).placeholder.startswith(prefix))
+
+    def test_transparency_is_flattened_on_white(self):
+        """Test transparent PNGs become RGB on a white background"""
+        processed = process_image(make_upload((50, 50), 'RGBA', 'PNG', (255, 0, 0, 0), 'image/png'))
+        with Image.open(processed.image) as img:
+            self.assertEqual(img.mode, 'RGB')
+            self.assertTrue(all(channel > 245 for channel in img.getpixel((25, 25))))
+
+    def test_invalid_uploads_are_rejected(self):
+        """Test corrupt files and disallowed formats disguised by their content type"""
+        corrupt = SimpleUploadedFile('photo.jpg', b'not an image', content_type='image/jpeg')
+        gif = make_upload((10, 10), fmt='GIF')
+        truncated = make_upload()
+        truncated = SimpleUploadedFile('photo.jpg', truncated.read()[:5000], content_type='image/jpeg')
+        for upload in (corrupt, gif, truncated):
+            with self.subTest(upload=upload.name):
+                image, thumbnail, error = process_outfit_image(upload)
+                self.assertIsNone(image)
+                self.assertTrue(error.startswith('Invalid image file'))
+
+    def test_large_png_is_reduced_before_conversion(self):
+        """Test formats without draft decoding are box-reduced right after decoding"""
+        img = decode_image(make_upload((8000, 2000), fmt='PNG', content_type='image/png'))
+        self.assertEqual(img.size, (4000, 1000))
+
+    def peak_memory(self, img, **params):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'photo.png')
+            img.save(path, 'PNG', **params)
+            output = subprocess.run([sys.executable, '-c', PEAK_MEMORY_SCRIPT, path], cwd=settings.BASE_DIR,
+                                    capture_output=True, text=True, check=True).stdout
+        return int(output.split()[-1])
+
+    @skipUnless(os.path.exists('/proc/self/status'), 'Peak memory is read from /proc')
+    def test_palette_png_peaks_no_higher_than_rgb(self):
+        """Test a transparent palette PNG is converted band by band instead of at full size"""
+        photo = Image.new('RGB', (5000, 5000), (200, 30, 40))
+        photo.paste((20, 30, 100), (0, 0, 2500, 5000))
+        palette = photo.convert('P')
+        rgb_peak = self.peak_memory(photo)
+        palette_peak = self.peak_memory(palette, transparency=palette.getpixel((0, 0)))
+        # Converting at full size (RGBA, then RGB on white) added ~4 bytes per pixel over RGB
+        self.assertLess(palette_peak, rgb_peak * 1.15)
+
+    def test_non_rgb_modes_are_converted_and_reduced(self):
+        """Test palette, grayscale and transparent images decode to reduced RGB with transparency on white"""
+        palette = Image.new('P', (8000, 2000), 1)
+        palette.putpalette([0, 0, 0, 20, 30, 100])
+        palette.paste(0, (0, 0, 8000, 1000))
+        upload = BytesIO()
+        palette.save(upload, 'PNG', transparency=0)
+        img = decode_image(SimpleUploadedFile('photo.png', upload.getvalue(), content_type='image/png'))
+        self.assertEqual((img.mode, img.size), ('RGB', (4000, 1000)))
+        self.assertEqual(img.getpixel((0, 0)), (255, 255, 255))
+        self.assertEqual(img.getpixel((0, 999)), (20, 30, 100))
+        gray = decode_image(make_upload((8000, 2000), 'L', 'PNG', 90, 'image/png'))
+        self.assertEqual((gray.mode, gray.size, gray.getpixel((0, 0))), ('RGB', (4000, 1000), (90, 90, 90)))
+
+    @override_settings(MAX_IMAGE_PIXELS=1000000)
+    def test_decompression_bomb_is_rejected_from_header(self):
+        """Test images over the pixel limit are refused before decoding"""
+        bomb = make_upload((2000, 2000), mode='1', fmt='PNG', color=0, content_type='image/png')
+        self.assertLess(bomb.size, 10000)
+        with mock.patch.object(Image.Image, 'load') as load:
+            image, thumbnail, error = process_outfit_image(bomb)
+        load.assert_not_called()
+        self.assertIsNone(image)
+        self.assertIn('2000x2000 exceed the maximum of 1 megapixels', error)
+
+
+class DiskLRUCacheTests(SimpleTestCase):
+    """Test the size-capped variant cache"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = DiskLRUCache(directory.name, max_bytes=1000)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test going over the cap evicts by last use, down to the low-water mark"""
+        for i, key in enumerate(['a', 'b', 'c']):
+            self.cache.put(key, b'x' * 300)
+            os.utime(self.cache.path(key), (i, i))
+        self.cache.get('a')  # now the most recently used
+
+        self.cache.put('d', b'x' * 300)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual([key for key in 'acd' if self.cache.get(key)], ['a', 'c', 'd'])
+        self.assertLessEqual(self.cache.total_size(), 900)
+
+    def test_missing_entry(self):
+        """Test lookups of absent keys (and of a cache directory not yet created)"""
+        self.assertIsNone(DiskLRUCache(os.path.join(self.cache.directory, 'new'), 10).get('a'))
+        self.assertEqual(self.cache.total_size(), 0)
@@ -0,0 +1,101 @@
+"""
+Size-capped file cache with least-recently-used eviction.
+
+Entries are files named by their key in one directory. Reads refresh the
+file's mtime, so the mtime order is the recency order across every process
+sharing the directory. Each process keeps a running estimate of the total
+size; once it passes the cap the directory is scanned and the least recently
+used files are removed until the cache is back under ``low_water`` of the
+cap. Files are written to a temporary name and renamed into place, so
+readers never see partial entries.
+"""
+import os
+import tempfile
+import threading
+
+
+class DiskLRUCache:
+    """Files keyed by name under ``directory``, at most ``max_bytes`` in total"""
+
+    low_water = 0.9
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """
+        Returns:
+            str or None: Path of the cached file, marked as recently used
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        """
+        Store ``data`` (bytes) under ``key``, evicting old entries if over the cap.
+
+        Returns:
+            str: Path of the cached file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.total_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._size = self.evict(int(self.max_bytes * self.low_water))
+        return self.path(key)
+
+    def _entries(self):
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.startswith('.tmp-'):
+                        try:
+                            yield entry.path, entry.stat()
+                        except FileNotFoundError:
+                            continue
+        except FileNotFoundError:
+            return
+
+    def total_size(self):
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def evict(self, target_bytes):
+        """
+        Remove least recently used files until the cache holds at most ``target_bytes``.
+
+        Returns:
+            int: Remaining size in bytes
+        """
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if size <= target_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= stat.st_size
+        return size
@@ -1,22 +1,77 @@
 """
 Image processing utilities for Fitmate application.
 Handles image compression, thumbnail generation, and validation.
+
+An upload is decoded exactly once. JPEGs are decoded with ``Image.draft()``,
+which lets libjpeg scale by 1/2, 1/4 or 1/8 while decoding, so a 12-megapixel
+phone photo never exists in memory at full resolution when a 1920px image is
+all that is kept. The RGB conversion is done once on the decoded pixels, and
+the thumbnail is made from the already resized image.
+
+Peak memory per upload is bounded: uploads are spooled to temporary files
+(``FILE_UPLOAD_MAX_MEMORY_SIZE``), images over ``MAX_IMAGE_PIXELS`` are
+rejected from their header before any pixel is decoded, and formats that
+cannot be scaled while decoding are box-reduced right after decoding, so
+later conversions work on a few megapixels at most. Images in other modes
+than RGB (palette, transparent, grayscale) are converted and reduced a band
+of rows at a time, so no full-size converted copy is ever held.
+
+The pipeline also computes, from the thumbnail, a 64-bit difference hash
+(dHash), a perceptual fingerprint for finding duplicate and similar photos,
+the dominant colors (a vectorized k-means over a few thousand pixels) and a
+placeholder: a tiny WebP of a few hundred bytes, inlined as a data URI in list
+responses so grids show a blurred preview before thumbnails load.
 """
+import base64
+
+import numpy as np
 from PIL import Image
 from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.conf import settings
-import sys
 import os
 
+IMAGE_MAX_SIZE = (1920, 1920)
+THUMBNAIL_SIZE = (300, 300)
+JPEG_QUALITY = 85
+# Variants are sized by width; this only guards against extreme aspect ratios
+MAX_VARIANT_HEIGHT = 4096
+# Multi-picture JPEGs (MPO, saved by many phone cameras) are JPEGs whose first frame is the photo
+JPEG_FORMATS = ('JPEG', 'MPO')
+# Rows of non-RGB images are converted this many pixels at a time
+CONVERT_BAND_PIXELS = 1 << 20
+# dHash compares each pixel of a (DHASH_SIZE + 1) x DHASH_SIZE grayscale image with its neighbour
+DHASH_SIZE = 8
+# Dominant colors: clusters found in a COLOR_SAMPLE_SIZE-bounded copy of the thumbnail
+COLOR_CLUSTERS = 4
+COLOR_SAMPLE_SIZE = (64, 64)
+COLOR_ITERATIONS = 10
+# Placeholders: at most 24px on the longer side, scaled up (and so blurred) by the client
+PLACEHOLDER_SIZE = (24, 24)
+PLACEHOLDER_QUALITY = 40
+
+
+class ProcessedImage:
+    """Result of the upload pipeline: encoded image and thumbnail plus what was derived from the pixels"""
+    __slots__ = ('image', 'thumbnail', 'width', 'height', 'dhash', 'colors', 'placeholder')
+
+    def __init__(self, image, thumbnail, width, height, dhash, colors, placeholder):
+        self.image = image
+        self.thumbnail = thumbnail
+        self.width = width
+        self.height = height
+        self.dhash = dhash
+        self.colors = colors
+        self.placeholder = placeholder
+
 
 def validate_image(image):
     """
-    Validate image format and size.
-    
+    Validate image format and size without decoding the pixels.
+
     Args:
         image: Uploaded image file
-        
+
     Returns:
         tuple: (is_valid, error_message)
     """
@@ -24,136 +79,275 @@ def validate_image(image):
     if image.size > settings.MAX_UPLOAD_SIZE:
         max_mb = settings.MAX_UPLOAD_SIZE / (1024 * 1024)
         return False, f"Image size exceeds maximum allowed size of {max_mb}MB"
-    
+
     # Check content type
     if hasattr(image, 'content_type'):
         if image.content_type not in settings.ALLOWED_IMAGE_TYPES:
             return False, f"Invalid image format. Allowed formats: JPEG, PNG, WebP"
-    
-    # Try to open and verify it's a valid image
+
+    # Check the real format and dimensions from the header
     try:
-        img = Image.open(image)
-        img.verify()
-        return True, None
+        inspect_image(image)
     except Exception as e:
         return False, f"Invalid image file: {str(e)}"
+    finally:
+        image.seek(0)
+
+    return True, None
+
+
+def fit_within(size, max_size):
+    """Dimensions of ``size`` scaled down (never up) to fit ``max_size``, keeping the aspect ratio"""
+    width, height = size
+    scale = min(max_size[0] / width, max_size[1] / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def inspect_image(image):
+    """
+    Open an image and check its format and pixel count from the header only.
+
+    Returns:
+        PIL.Image.Image: Opened, not yet decoded image (problems raise ``ValueError``/``OSError``)
+    """
+    try:
+        img = Image.open(image)
+    except Image.DecompressionBombError:
+        raise ValueError(_too_many_pixels_message())
+    mime = 'image/jpeg' if img.format in JPEG_FORMATS else Image.MIME.get(img.format)
+    if mime not in settings.ALLOWED_IMAGE_TYPES:
+        raise ValueError(f"Unsupported image format: {img.format}")
+    if img.width * img.height > settings.MAX_IMAGE_PIXELS:
+        raise ValueError(_too_many_pixels_message(img.size))
+    return img
+
+
+def decode_image(image, max_size=IMAGE_MAX_SIZE):
+    """
+    Decode an upload once, at the smallest resolution that still covers ``max_size``.
+
+    Args:
+        image: Image file
+        max_size: Largest dimensions that will be kept (width, height)
+
+    Returns:
+        PIL.Image.Image: Loaded RGB image (decode errors raise ``OSError``)
+    """
+    img = inspect_image(image)
+    target = fit_within(img.size, max_size)
+    if img.format in JPEG_FORMATS:
+        # Scale-on-decode to at least the target size; also decodes CMYK/YCbCr straight to RGB
+        img.draft('RGB', target)
+    img.load()
+
+    # Other formats decode at full size: shrink at once (box filter, keeping at
+    # least twice the target for the final LANCZOS pass) before any conversion
+    factor = max(1, min(img.width // (2 * target[0]), img.height // (2 * target[1])))
+    if img.mode != 'RGB':
+        # Palette and bilevel images can't be box-reduced, and converting any
+        # mode at full size would hold several copies of the image
+        return _to_rgb_reduced(img, factor)
+    if factor > 1:
+        img = img.reduce(factor)
+    return img
+
+
+def _to_rgb_reduced(img, factor):
+    """``to_rgb()`` then ``reduce(factor)``, a band of rows at a time"""
+    rows = max(1, CONVERT_BAND_PIXELS // (img.width * factor)) * factor
+    result = Image.new('RGB', (-(-img.width // factor), -(-img.height // factor)))
+    for top in range(0, img.height, rows):
+        band = to_rgb(img.crop((0, top, img.width, min(top + rows, img.height))))
+        if factor > 1:
+            band = band.reduce(factor)
+        result.paste(band, (0, top // factor))
+    return result
+
+
+def _too_many_pixels_message(size=None):
+    limit = f"{settings.MAX_IMAGE_PIXELS / 1e6:g} megapixels"
+    if size:
+        return f"Image dimensions {size[0]}x{size[1]} exceed the maximum of {limit}"
+    return f"Image dimensions exceed the maximum of {limit}"
+
+
+def to_rgb(img):
+    """Convert to RGB, flattening transparency onto a white background"""
+    if img.mode == 'RGB':
+        return img
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def dhash(img, hash_size=DHASH_SIZE):
+    """
+    Difference hash of an image.
+
+    Each bit tells whether a pixel of a tiny grayscale version is brighter than
+    its right neighbour, so re-encoded, resized or slightly edited copies of a
+    photo differ in a few bits and the Hamming distance between two hashes
+    measures how different the images look.
+
+    Returns:
+        int: Unsigned hash of ``hash_size ** 2`` bits
+    """
+    width = hash_size + 1
+    pixels = img.convert('L').resize((width, hash_size), Image.Resampling.BOX).tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(row * width, row * width + hash_size):
+            value = (value << 1) | (pixels[col] > pixels[col + 1])
+    return value
+
+
+def _background_mask(pixels):
+    """
+    Pixels that belong to a plain backdrop, judged from the image border.
+
+    Product and mirror photos are often taken against a wall or sheet; if the
+    border is nearly uniform, pixels close to its median color are backdrop.
+    """
+    border = np.concatenate([pixels[0], pixels[-1], pixels[1:-1, 0], pixels[1:-1, -1]])
+    median = np.median(border, axis=0)
+    if np.mean(np.abs(border - median).sum(axis=1) < 48) < 0.8:
+        return None
+    background = np.abs(pixels - median).sum(axis=2) < 48
+    # Keep everything if the photo is (almost) all backdrop
+    return background if background.mean() < 0.9 else None
+
+
+def dominant_colors(img, clusters=COLOR_CLUSTERS, iterations=COLOR_ITERATIONS):
+    """
+    Dominant colors of an image by k-means over a small downsampled copy.
 
+    Runs on at most ``COLOR_SAMPLE_SIZE`` pixels with all distances computed
+    as one NumPy array per iteration, so it takes a few milliseconds. A plain
+    backdrop (see ``_background_mask``) is left out.
 
-def compress_image(image, max_size=(1920, 1920), quality=85):
+    Returns:
+        list: ((r, g, b), share) pairs, largest share first; shares sum to 1
     """
-    Compress and resize image while maintaining aspect ratio.
-    
+    sample = to_rgb(img).copy()
+    sample.thumbnail(COLOR_SAMPLE_SIZE, Image.Resampling.BOX)
+    pixels = np.asarray(sample, dtype=np.float32)
+    background = _background_mask(pixels) if min(pixels.shape[:2]) > 2 else None
+    pixels = pixels[~background] if background is not None else pixels.reshape(-1, 3)
+
+    # Deterministic start: pixels at evenly spaced brightness quantiles
+    clusters = min(clusters, len(pixels))
+    order = np.argsort(pixels.sum(axis=1), kind='stable')
+    centers = pixels[order[(np.arange(clusters) * 2 + 1) * len(pixels) // (2 * clusters)]]
+    for _ in range(iterations):
+        # |p - c|^2 without the per-pixel |p|^2 term, which does not change the nearest center
+        labels = ((centers ** 2).sum(axis=1) - 2 * pixels @ centers.T).argmin(axis=1)
+        counts = np.bincount(labels, minlength=clusters)
+        sums = np.stack([np.bincount(labels, pixels[:, c], minlength=clusters) for c in range(3)], axis=1)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.abs(updated - centers).max() < 0.5:
+            break
+        centers = updated.astype(np.float32)
+
+    return [
+        (tuple(int(round(c)) for c in centers[i]), float(counts[i] / len(pixels)))
+        for i in np.argsort(-counts, kind='stable') if counts[i]
+    ]
+
+
+def placeholder_data_uri(img, size=PLACEHOLDER_SIZE, quality=PLACEHOLDER_QUALITY):
+    """
+    Micro-thumbnail of an image as a ``data:`` URI (a few hundred characters).
+
+    Returns:
+        str: ``data:image/webp;base64,...``
+    """
+    tiny = to_rgb(img).copy()
+    tiny.thumbnail(size, Image.Resampling.BOX)
+    output = BytesIO()
+    tiny.save(output, format='WEBP', quality=quality, method=6)
+    return 'data:image/webp;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+
+
+def encode_jpeg(img, name, quality=JPEG_QUALITY):
+    """
+    Encode a PIL image as an uploadable JPEG file.
+
+    Returns:
+        InMemoryUploadedFile: JPEG with its real byte size
+    """
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True)
+    size = output.tell()
+    output.seek(0)
+    return InMemoryUploadedFile(output, 'ImageField', name, 'image/jpeg', size, None)
+
+
+def process_image(image, max_size=IMAGE_MAX_SIZE, thumbnail_size=THUMBNAIL_SIZE, quality=JPEG_QUALITY):
+    """
+    Decode, convert, resize and encode an upload plus its thumbnail.
+
     Args:
         image: Uploaded image file
-        max_size: Maximum dimensions (width, height)
+        max_size: Maximum dimensions of the stored image
+        thumbnail_size: Maximum dimensions of the thumbnail
         quality: JPEG quality (1-100)
-        
+
     Returns:
-        InMemoryUploadedFile: Compressed image
+        ProcessedImage: Encoded image and thumbnail plus the thumbnail's dHash, dominant colors and placeholder
     """
-    try:
-        # Open image
-        img = Image.open(image)
-        
-        # Convert RGBA to RGB if necessary
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        
-        # Resize if larger than max_size
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Save to BytesIO
-        output = BytesIO()
-        img_format = 'JPEG'
-        img.save(output, format=img_format, quality=quality, optimize=True)
-        output.seek(0)
-        
-        # Get filename and extension
-        filename = os.path.splitext(image.name)[0]
-        
-        # Create InMemoryUploadedFile
-        compressed_image = InMemoryUploadedFile(
-            output,
-            'ImageField',
-            f"{filename}.jpg",
-            'image/jpeg',
-            sys.getsizeof(output),
-            None
-        )
-        
-        return compressed_image
-    except Exception as e:
-        raise Exception(f"Error compressing image: {str(e)}")
+    img = to_rgb(decode_image(image, max_size))
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    thumb = img.copy()
+    thumb.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
 
+    filename = os.path.splitext(os.path.basename(image.name or 'image'))[0]
+    return ProcessedImage(
+        encode_jpeg(img, f"{filename}.jpg", quality),
+        encode_jpeg(thumb, f"{filename}_thumb.jpg", quality),
+        img.width,
+        img.height,
+        dhash(thumb),
+        dominant_colors(thumb),
+        placeholder_data_uri(thumb),
+    )
 
-def create_thumbnail(image, size=(300, 300)):
+
+def render_variant(image, width, image_format='JPEG', quality=80):
     """
-    Create a thumbnail from an image.
-    
+    Render an image at ``width`` pixels wide (never upscaled).
+
     Args:
-        image: Image file or Image object
-        size: Thumbnail size (width, height)
-        
+        image: Image file
+        width: Target width
+        image_format: 'JPEG' or 'WEBP'
+        quality: Encoder quality (1-100)
+
     Returns:
-        InMemoryUploadedFile: Thumbnail image
+        bytes: Encoded variant
     """
-    try:
-        # Open image if it's a file
-        if hasattr(image, 'read'):
-            img = Image.open(image)
-            # Reset file pointer
-            image.seek(0)
-        else:
-            img = image
-        
-        # Convert RGBA to RGB if necessary
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        
-        # Create thumbnail
-        img.thumbnail(size, Image.Resampling.LANCZOS)
-        
-        # Save to BytesIO
-        output = BytesIO()
-        img.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-        
-        # Generate filename
-        if hasattr(image, 'name'):
-            filename = os.path.splitext(image.name)[0]
-        else:
-            filename = 'thumbnail'
-        
-        # Create InMemoryUploadedFile
-        thumbnail = InMemoryUploadedFile(
-            output,
-            'ImageField',
-            f"{filename}_thumb.jpg",
-            'image/jpeg',
-            sys.getsizeof(output),
-            None
-        )
-        
-        return thumbnail
-    except Exception as e:
-        raise Exception(f"Error creating thumbnail: {str(e)}")
+    box = (width, MAX_VARIANT_HEIGHT)
+    img = to_rgb(decode_image(image, box))
+    img.thumbnail(box, Image.Resampling.LANCZOS)
+
+    output = BytesIO()
+    if image_format == 'WEBP':
+        img.save(output, format='WEBP', quality=quality, method=4)
+    else:
+        img.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
 
 
 def process_outfit_image(image):
     """
     Process an outfit image: validate, compress, and create thumbnail.
-    
+
     Args:
         image: Uploaded image file
-        
+
     Returns:
         tuple: (compressed_image, thumbnail, error_message)
     """
@@ -161,17 +355,10 @@ def process_outfit_image(image):
     is_valid, error = validate_image(image)
     if not is_valid:
         return None, None, error
-    
+
     try:
-        # Compress main image
-        compressed = compress_image(image, max_size=(1920, 1920), quality=85)
-        
-        # Reset image pointer
-        image.seek(0)
-        
-        # Create thumbnail
-        thumbnail = create_thumbnail(image, size=(300, 300))
-        
-        return compressed, thumbnail, None
+        processed = process_image(image)
     except Exception as e:
-        return None, None, str(e)
+        return None, None, f"Invalid image file: {str(e)}"
+
+    return processed.image, processed.thumbnail, None
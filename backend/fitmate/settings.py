@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'outfits',
     'predictions',
     'recommendations',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -138,12 +139,51 @@ FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
 
 # File Upload Settings
 MAX_UPLOAD_SIZE = env.int('MAX_UPLOAD_SIZE', default=10485760)  # 10MB in bytes
-FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
+# Uploads larger than this are spooled to a temporary file instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=262144)  # 256KB
 DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
+# Images with more pixels are rejected from their header, before decoding
+# (a small compressed PNG can otherwise expand to hundreds of MB)
+MAX_IMAGE_PIXELS = env.int('MAX_IMAGE_PIXELS', default=40000000)  # 40 megapixels
+# Outfit images are compressed and thumbnailed after the response by
+# IMAGE_PROCESSING_WORKERS threads (0 processes them inline). Beyond
+# IMAGE_PROCESSING_QUEUE waiting jobs, uploads are processed in the request
+IMAGE_PROCESSING_WORKERS = env.int('IMAGE_PROCESSING_WORKERS', default=2)
+IMAGE_PROCESSING_QUEUE = env.int('IMAGE_PROCESSING_QUEUE', default=16)
+# Responsive image variants: requested widths are snapped up to one of these
+# buckets, rendered on first request and kept in a content-addressed disk
+# cache; least recently used variants are evicted beyond the size cap
+IMAGE_VARIANT_WIDTHS = [150, 300, 600, 1200]
+IMAGE_VARIANT_CACHE_DIR = env('IMAGE_VARIANT_CACHE_DIR', default=os.path.join(BASE_DIR, 'cache', 'image_variants'))
+IMAGE_VARIANT_CACHE_MAX_BYTES = env.int('IMAGE_VARIANT_CACHE_MAX_BYTES', default=536870912)  # 512MB
 
 # Allowed image formats
 ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/webp', 'image/jpg']
 
+# Recommendations
+# Precomputed snapshots older than this are ignored and recomputed live
+RECOMMENDATION_SNAPSHOT_MAX_AGE_HOURS = env.int('RECOMMENDATION_SNAPSHOT_MAX_AGE_HOURS', default=24)
+
+# Wardrobe stats
+# When enabled, per-user counts are maintained on outfit save/delete and the
+# stats endpoint reads a single row (run repair_wardrobe_stats after enabling)
+WARDROBE_STATS_ENABLED = env.bool('WARDROBE_STATS_ENABLED', default=False)
+
+# Worn counter write-behind: coalesce "mark as worn" increments in memory and
+# flush them in batched UPDATEs every OUTFIT_WORN_FLUSH_SECONDS
+OUTFIT_WORN_WRITE_BEHIND = env.bool('OUTFIT_WORN_WRITE_BEHIND', default=False)
+OUTFIT_WORN_FLUSH_SECONDS = env.float('OUTFIT_WORN_FLUSH_SECONDS', default=5.0)
+
+# Longest window (in days) accepted by the forgotten-outfits and wear-trend endpoints
+WEAR_ANALYTICS_MAX_DAYS = env.int('WEAR_ANALYTICS_MAX_DAYS', default=365)
+
+# Delta sync: tombstones older than this are purged, and clients whose watermark
+# is older get a full sync instead
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=30)
+# Watermarks are set this far in the past so rows saved by transactions that
+# commit after the sync query are not missed (clients may see them twice)
+SYNC_WATERMARK_LAG_SECONDS = env.int('SYNC_WATERMARK_LAG_SECONDS', default=5)
+
 # Security Settings
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -159,6 +199,22 @@ if not DEBUG:
 # Media files (uploaded images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Media is served by an access-checked view; file URLs carry a signature so
+# <img> tags can load them without an Authorization header. Behind nginx, set
+# the prefix of an internal location aliased to MEDIA_ROOT and the view hands
+# the transfer to nginx with X-Accel-Redirect after checking access
+MEDIA_ACCEL_REDIRECT_PREFIX = env('MEDIA_ACCEL_REDIRECT_PREFIX', default='')
+# Signed media URLs are valid for one to two lifetimes (seconds), then access is checked again
+MEDIA_URL_LIFETIME = env.int('MEDIA_URL_LIFETIME', default=3600)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'common.storage.SignedFileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 # Static files
 STATIC_URL = '/static/'
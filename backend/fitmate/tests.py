@@ -0,0 +1,172 @@
+"""
+Query-budget regression suite.
+
+Every API endpoint has a maximum number of SQL queries. Each endpoint is
+requested against a small wardrobe and again after the data has grown: the
+count must stay within budget and must not grow with the data (N+1 queries).
+Hot list queries are also checked with SQLite's ``EXPLAIN QUERY PLAN`` to make
+sure they are served from an index rather than a full table scan.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Value
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from measurements.models import Measurement
+from outfits.models import Outfit, OutfitTag
+from predictions.models import FitResult
+from sync.models import Tombstone
+
+User = get_user_model()
+
+CATEGORIES = ['top', 'bottom', 'dress', 'outerwear', 'full_outfit']
+OCCASIONS = ['casual', 'formal', 'sports', 'party', 'work']
+SEASONS = ['spring', 'summer', 'fall', 'winter', 'all_season']
+COLORS = ['Blue', 'Black', 'White', 'Red', 'Green']
+
+# (method, url, data, maximum queries). '{outfit}' is replaced by an outfit id.
+# Counts include the SAVEPOINT/RELEASE statements of atomic blocks and, for conditional
+# GET endpoints, the version stamp lookups.
+ENDPOINT_BUDGETS = [
+    ('get', '/api/auth/profile/', None, 0),
+    ('get', '/api/measurements/', None, 2),
+    ('patch', '/api/measurements/', {'weight': '71'}, 2),
+    ('get', '/api/outfits/', None, 4),
+    ('get', '/api/outfits/?category=top&occasion=casual&season=spring', None, 4),
+    ('get', '/api/outfits/?search=blue', None, 5),
+    ('get', '/api/outfits/?cursor=', None, 3),
+    ('get', '/api/outfits/{outfit}/', None, 2),
+    ('get', '/api/outfits/?tags=casual,party', None, 4),
+    ('get', '/api/outfits/favorites/', None, 2),
+    ('get', '/api/outfits/stats/', None, 4),
+    ('get', '/api/outfits/forgotten/', None, 2),
+    ('get', '/api/outfits/wear-trend/', None, 2),
+    ('get', '/api/outfits/search/?q=blue&scope=public', None, 3),
+    ('get', '/api/outfits/tags/', None, 1),
+    ('get', '/api/outfits/{outfit}/tags/', None, 2),
+    ('get', '/api/outfits/{outfit}/processing/', None, 1),
+    ('get', '/api/outfits/{outfit}/duplicates/', None, 5),
+    ('get', '/api/outfits/{outfit}/similar/?scope=public', None, 5),
+    ('post', '/api/outfits/{outfit}/tags/', {'tag': 'casual'}, 4),
+    ('post', '/api/outfits/{outfit}/favorite/', None, 1),
+    ('post', '/api/outfits/{outfit}/worn/', None, 8),
+    ('post', '/api/predictions/predict/', {'outfit_id': '{outfit}'}, 4),
+    ('get', '/api/predictions/results/', None, 3),
+    ('get', '/api/predictions/results/?fit_status=good', None, 3),
+    ('get', '/api/recommendations/outfits/', None, 5),
+    ('get', '/api/recommendations/outfits/?occasion=casual', None, 6),
+    ('get', '/api/recommendations/outfits/{outfit}/similar/', None, 5),
+    ('get', '/api/recommendations/looks/', None, 3),
+    ('get', '/api/recommendations/people-like-you/', None, 2),
+    ('get', '/api/sync/', None, 5),
+]
+
+
+class QueryBudgetTests(APITestCase):
+    """Test query counts of every endpoint stay within budget and flat as data grows"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Measurement.objects.create(user=self.user, height=170, weight=70, chest=92, waist=78,
+                                   hips=96, shoulder=44, gender='female')
+        self.stranger = User.objects.create_user(username='stranger', email='s@example.com',
+                                                 password='testpass123')
+        self.outfit = self.populate(10)
+
+    def populate(self, count):
+        """Add ``count`` outfits (with fit results) for the user and public outfits for a stranger"""
+        outfit = None
+        for i in range(count):
+            attributes = {
+                'category': CATEGORIES[i % 5], 'occasion': OCCASIONS[i % 5], 'season': SEASONS[i % 5],
+                'color': COLORS[i % 5], 'outfit_chest': Decimal(90 + i % 5),
+                'image': f'outfits/blue{i}.jpg', 'image_dhash': i,
+            }
+            outfit = Outfit.objects.create(user=self.user, name=f'Blue outfit {i}',
+                                           is_favorite=i % 2 == 0, **attributes)
+            OutfitTag.objects.create(outfit=outfit, tag=OCCASIONS[i % 5])
+            FitResult.objects.create(user=self.user, outfit=outfit, fit_score=80, fit_status='good')
+            Outfit.objects.create(user=self.stranger, name=f'Public blue {i}', is_public=True, **attributes)
+        return outfit
+
+    def count_queries(self, method, url, data):
+        url = url.format(outfit=self.outfit.id)
+        if data:
+            data = {key: str(value).format(outfit=self.outfit.id) for key, value in data.items()}
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url}: {response.status_code}')
+        return len(queries)
+
+    def test_endpoint_query_budgets(self):
+        """Test each endpoint's query count is within budget and independent of data size"""
+        small = [self.count_queries(method, url, data) for method, url, data, _ in ENDPOINT_BUDGETS]
+        self.populate(30)
+        large = [self.count_queries(method, url, data) for method, url, data, _ in ENDPOINT_BUDGETS]
+
+        for (method, url, _, budget), before, after in zip(ENDPOINT_BUDGETS, small, large):
+            with self.subTest(endpoint=f'{method.upper()} {url}'):
+                self.assertLessEqual(after, budget)
+                self.assertEqual(before, after, 'Query count grows with the data (N+1)')
+
+
+class QueryPlanTests(APITestCase):
+    """Test hot list queries are served from composite indexes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+
+    def assertUsesIndex(self, queryset):
+        """Assert every table of the query is read through an index and rows need no sort"""
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            self.assertRegex(plan, r'SEARCH \w+ USING (COVERING )?INDEX')
+            self.assertNotIn('TEMP B-TREE', plan)
+        elif connection.vendor == 'mysql':
+            for row in self.mysql_plan(queryset):
+                self.assertIsNotNone(row['key'], row)
+                self.assertNotEqual(row['type'], 'ALL', row)
+                self.assertNotIn('Using filesort', row['Extra'] or '', row)
+        else:
+            self.skipTest(f'Query plans are not checked on {connection.vendor}')
+
+    def mysql_plan(self, queryset):
+        """Rows of MySQL's tabular EXPLAIN as dicts (id, type, key, Extra, ...)"""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def test_outfit_filters_use_indexes(self):
+        """Test filtered outfit lists use a (user, field, uploaded_at) index without sorting"""
+        outfits = Outfit.objects.filter(user=self.user)
+        for filters in ({}, {'category': 'top'}, {'occasion': 'casual'}, {'season': 'summer'},
+                        {'is_favorite': Value(True)}):
+            with self.subTest(filters=filters):
+                self.assertUsesIndex(outfits.filter(**filters).order_by('-uploaded_at'))
+
+    def test_fit_history_uses_indexes(self):
+        """Test fit history, with and without a status filter, uses an index without sorting"""
+        results = FitResult.objects.filter(user=self.user).order_by('-created_at')
+        self.assertUsesIndex(results)
+        self.assertUsesIndex(results.filter(fit_status='good'))
+
+    def test_version_stamps_use_indexes(self):
+        """Test conditional GET version stamps are index lookups"""
+        for queryset in (Outfit.objects.filter(user=self.user).values('updated_at'),
+                         Tombstone.objects.filter(user_id=self.user.id).values('deleted_at')):
+            with self.subTest(model=queryset.model.__name__):
+                self.assertUsesIndex(queryset)
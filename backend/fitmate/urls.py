@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from outfits.views import MediaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,7 +10,7 @@ urlpatterns = [
     path('api/outfits/', include('outfits.urls')),
     path('api/predictions/', include('predictions.urls')),
     path('api/recommendations/', include('recommendations.urls')),
+    path('api/sync/', include('sync.urls')),
+    # Access-checked media (also in production; see MEDIA_ACCEL_REDIRECT_PREFIX)
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', MediaView.as_view(), name='media'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,11 +1,18 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
+from common.conditional import conditional_get
 from .models import Measurement
 from .serializers import MeasurementSerializer
 from .body_shape import detect_body_shape
 
 
+def measurement_version(request):
+    """Version stamp of the user's measurements for conditional GET: (stamp, last modified)"""
+    row = Measurement.objects.filter(user=request.user).values_list('id', 'updated_at').first()
+    return row, row[1] if row else None
+
+
 class MeasurementViewSet(generics.GenericAPIView):
     """
     Combined view for handling measurements at the root path.
@@ -13,6 +20,7 @@ class MeasurementViewSet(generics.GenericAPIView):
     """
     serializer_class = MeasurementSerializer
     
+    @conditional_get(measurement_version)
     def get(self, request):
         """Get user's measurements"""
         try:
@@ -1,7 +1,17 @@
 from django.contrib import admin
-from .models import Outfit
+from .models import Outfit, WardrobeStats, WearEvent
 
 @admin.register(Outfit)
 class OutfitAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'uploaded_at']
-    search_fields = ['name', 'user__username']
\ No newline at end of file
+    search_fields = ['name', 'user__username']
+
+@admin.register(WardrobeStats)
+class WardrobeStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'updated_at']
+    search_fields = ['user__username']
+
+@admin.register(WearEvent)
+class WearEventAdmin(admin.ModelAdmin):
+    list_display = ['outfit', 'user', 'worn_at']
+    search_fields = ['user__username', 'outfit__name']
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class OutfitsConfig(AppConfig):
     name = 'outfits'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
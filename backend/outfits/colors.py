@@ -0,0 +1,112 @@
+"""
+Canonical names for detected outfit colors.
+
+The image pipeline returns dominant colors as RGB cluster centers. Each is
+snapped to the nearest color of ``PALETTE`` (the canonical vocabulary) by
+CIELAB distance, which follows perceived difference far better than RGB.
+Instead of converting every color, a lookup table maps each RGB cube of
+``_STEP`` levels per channel to its palette color; it is computed once per
+process with NumPy (32,768 cells) and a lookup is a single index.
+"""
+import numpy as np
+
+# Reference sRGB values of the canonical colors of vocabulary.py ('multicolor' has none)
+PALETTE = {
+    'black': (20, 20, 20),
+    'white': (245, 245, 245),
+    'grey': (128, 128, 128),
+    'beige': (215, 195, 160),
+    'cream': (245, 235, 205),
+    'brown': (110, 70, 40),
+    'khaki': (170, 160, 110),
+    'navy': (20, 30, 100),
+    'blue': (40, 90, 190),
+    'teal': (0, 128, 128),
+    'green': (40, 140, 60),
+    'olive': (110, 110, 40),
+    'yellow': (240, 210, 40),
+    'gold': (200, 160, 50),
+    'orange': (240, 130, 30),
+    'red': (200, 30, 40),
+    'maroon': (120, 20, 35),
+    'pink': (240, 150, 180),
+    'purple': (120, 60, 150),
+    'silver': (192, 192, 198),
+}
+
+_NAMES = list(PALETTE)
+_BITS = 5
+_STEP = 256 >> _BITS
+# Colors making up less of the photo are noise (seams, shadows, buttons)
+MIN_SHARE = 0.1
+_lut = None
+
+
+def srgb_to_lab(rgb):
+    """Convert an (..., 3) array of sRGB values (0-255) to CIELAB (D65)"""
+    c = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = linear @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ]) / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def get_lut():
+    """Palette index of every quantized RGB cell (indexed by the top ``_BITS`` bits of r, g, b)"""
+    global _lut
+    if _lut is None:
+        levels = np.arange(1 << _BITS) * _STEP + _STEP // 2
+        cells = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1).reshape(-1, 3)
+        palette = srgb_to_lab([PALETTE[name] for name in _NAMES])
+        distances = ((srgb_to_lab(cells)[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        _lut = distances.argmin(axis=1).astype(np.uint8)
+    return _lut
+
+
+def snap_color(rgb):
+    """Canonical name of the palette color nearest to ``rgb``"""
+    r, g, b = (channel >> (8 - _BITS) for channel in rgb)
+    return _NAMES[get_lut()[(r << (2 * _BITS)) | (g << _BITS) | b]]
+
+
+def name_colors(colors):
+    """
+    Canonical names of dominant colors, merging clusters that snap to the same name.
+
+    Args:
+        colors: ((r, g, b), share) pairs from ``dominant_colors``
+
+    Returns:
+        list: ``{'color', 'hex', 'share'}`` dicts for colors covering at least
+        ``MIN_SHARE`` of the photo, largest first; ``hex`` is the largest cluster's
+    """
+    named = {}
+    for rgb, share in colors:
+        name = snap_color(rgb)
+        if name in named:
+            named[name]['share'] += share
+        else:
+            named[name] = {'color': name, 'hex': '#%02x%02x%02x' % rgb, 'share': share}
+    detected = sorted(named.values(), key=lambda item: -item['share'])
+    return [
+        dict(item, share=round(item['share'], 3))
+        for item in detected if item['share'] >= MIN_SHARE
+    ]
+
+
+def detected_color_fields(detected):
+    """Outfit field values for colors from ``name_colors``"""
+    return {
+        'primary_color': detected[0]['color'] if detected else '',
+        'secondary_color': detected[1]['color'] if len(detected) > 1 else '',
+        'detected_colors': detected,
+    }
+
+
+def outfit_color(outfit):
+    """Stated color of an outfit (lower case), or else the primary color detected in its photo"""
+    return outfit.color.lower() if outfit.color else outfit.primary_color
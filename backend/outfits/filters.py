@@ -0,0 +1,27 @@
+"""
+Filter backends for outfit lists.
+"""
+from rest_framework import filters
+
+from .search import order_by_ids, search_outfit_ids
+
+
+class OutfitSearchFilter(filters.BaseFilterBackend):
+    """
+    Indexed replacement for ``SearchFilter`` on the user's own outfits.
+
+    Uses the same ``search`` query parameter. Results are ranked by relevance
+    unless an explicit ``ordering`` is requested, so list this backend after
+    ``OrderingFilter``.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        ids = search_outfit_ids(query, user=request.user)
+        if request.query_params.get(filters.OrderingFilter.ordering_param):
+            return queryset.filter(pk__in=ids)
+        return order_by_ids(queryset, ids)
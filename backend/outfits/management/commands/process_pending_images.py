@@ -0,0 +1,32 @@
+"""
+Process outfit uploads whose background job never finished.
+
+Jobs live in process memory, so uploads accepted just before a restart stay
+in the 'processing' state. Run periodically (e.g. from cron) to finish them.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from outfits.models import Outfit
+from outfits.processing import process_stored_image
+
+
+class Command(BaseCommand):
+    help = 'Process outfit images stuck in the processing state'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=10,
+                            help='Only outfits that have been processing for this many minutes')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        pending = Outfit.objects.filter(
+            processing_status=Outfit.PROCESSING, updated_at__lt=cutoff
+        ).values_list('id', 'image')
+
+        results = [process_stored_image(outfit_id, image) for outfit_id, image in pending]
+        ready = results.count(Outfit.READY)
+        failed = results.count(Outfit.FAILED)
+        self.stdout.write(self.style.SUCCESS(f'Processed {ready} images ({failed} failed).'))
@@ -0,0 +1,20 @@
+"""
+Rebuild the wardrobe search index.
+
+Postings are maintained on Outfit save; rebuild after bulk imports, queryset
+``update()`` of searchable fields, or a change of the tokenizer.
+"""
+from django.core.management.base import BaseCommand
+
+from outfits.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild OutfitSearchTerm postings for all outfits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Outfits per transaction')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} outfits.'))
@@ -0,0 +1,17 @@
+"""
+Rebuild the daily wear rollups from the WearEvent log.
+
+Use after importing or deleting events directly, or if rollups are suspected
+to have drifted.
+"""
+from django.core.management.base import BaseCommand
+
+from outfits.wear import rebuild_daily_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute OutfitWearDaily rows from WearEvent'
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily wear rows.'))
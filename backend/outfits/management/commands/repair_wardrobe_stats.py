@@ -0,0 +1,48 @@
+"""
+Detect and repair drift between WardrobeStats rows and the outfits table.
+
+Rows can drift when outfits are changed without signals firing (queryset
+``update()``, raw SQL, or while WARDROBE_STATS_ENABLED was off).
+"""
+from django.core.management.base import BaseCommand
+
+from outfits.models import WardrobeStats
+from outfits.stats import compute_all_wardrobe_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute WardrobeStats rows that no longer match the outfits table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Also create rows for users with outfits but no stats row'
+        )
+
+    def handle(self, *args, **options):
+        expected = compute_all_wardrobe_counts()
+
+        drifted = []
+        for stats in WardrobeStats.objects.all().iterator():
+            actual = expected.pop(stats.user_id, {})
+            if stats.counts != actual:
+                drifted.append(stats.user_id)
+                self.stdout.write(f'  user {stats.user_id}: {stats.counts} -> {actual}')
+                if not options['dry_run']:
+                    stats.counts = actual
+                    stats.save(update_fields=['counts', 'updated_at'])
+
+        # Whatever is left in expected belongs to users without a row
+        missing = list(expected.items()) if options['create_missing'] else []
+        if missing and not options['dry_run']:
+            WardrobeStats.objects.bulk_create(
+                [WardrobeStats(user_id=user_id, counts=counts) for user_id, counts in missing],
+                batch_size=500
+            )
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {len(drifted)} drifted rows'
+            + (f', {len(missing)} missing rows' if options['create_missing'] else '') + '.'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0003_alter_outfit_options_outfit_brand_outfit_category_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outfit',
+            name='category',
+            field=models.CharField(choices=[('top', 'Top'), ('bottom', 'Bottom'), ('dress', 'Dress'), ('outerwear', 'Outerwear'), ('full_outfit', 'Full Outfit')], default='full_outfit', max_length=20),
+        ),
+    ]
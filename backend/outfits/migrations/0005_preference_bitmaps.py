@@ -0,0 +1,122 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:29
+
+import zlib
+
+from django.db import migrations, models
+
+# Frozen copy of outfits.vocabulary as of this migration: later vocabulary
+# changes must not change the masks it writes
+MASK_BITS = 63
+CANONICAL_COLORS = [
+    'black', 'white', 'grey', 'beige', 'cream', 'brown', 'khaki', 'navy', 'blue', 'teal',
+    'green', 'olive', 'yellow', 'gold', 'orange', 'red', 'maroon', 'pink', 'purple', 'silver',
+    'multicolor',
+]
+COLOR_ALIASES = {
+    'gray': 'grey', 'charcoal': 'grey', 'ivory': 'cream', 'offwhite': 'cream',
+    'tan': 'beige', 'nude': 'beige', 'camel': 'brown', 'chocolate': 'brown',
+    'denim': 'blue', 'indigo': 'navy', 'turquoise': 'teal', 'mint': 'green',
+    'mustard': 'yellow', 'rust': 'orange', 'peach': 'orange', 'coral': 'pink',
+    'burgundy': 'maroon', 'wine': 'maroon', 'lavender': 'purple', 'violet': 'purple',
+    'lilac': 'purple', 'multi': 'multicolor', 'printed': 'multicolor',
+}
+STYLES = ['casual', 'formal', 'sports', 'party', 'work']
+_COLOR_BITS = {color: i for i, color in enumerate(CANONICAL_COLORS)}
+_STYLE_BITS = {style: i for i, style in enumerate(STYLES)}
+
+
+def normalize_color(text):
+    if not text:
+        return None
+    for word in reversed(text.lower().replace('-', ' ').replace('/', ' ').split()):
+        word = COLOR_ALIASES.get(word, word)
+        if word in _COLOR_BITS:
+            return word
+    return None
+
+
+def color_mask(values):
+    mask = 0
+    for value in values or []:
+        color = normalize_color(value)
+        if color:
+            mask |= 1 << _COLOR_BITS[color]
+    return mask
+
+
+def style_mask(values):
+    mask = 0
+    for value in values or []:
+        bit = _STYLE_BITS.get((value or '').strip().lower())
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def brand_mask(values):
+    mask = 0
+    for value in values or []:
+        name = ''.join((value or '').lower().split())
+        if name:
+            mask |= 1 << (zlib.crc32(name.encode()) % MASK_BITS)
+    return mask
+
+
+def backfill_masks(apps, schema_editor):
+    Outfit = apps.get_model('outfits', 'Outfit')
+    UserPreferences = apps.get_model('outfits', 'UserPreferences')
+
+    outfits = list(Outfit.objects.only('color', 'brand', 'occasion'))
+    for outfit in outfits:
+        outfit.color_mask = color_mask([outfit.color])
+        outfit.brand_mask = brand_mask([outfit.brand])
+        outfit.style_mask = style_mask([outfit.occasion])
+    Outfit.objects.bulk_update(outfits, ['color_mask', 'brand_mask', 'style_mask'], batch_size=500)
+
+    preferences = list(UserPreferences.objects.all())
+    for pref in preferences:
+        pref.color_mask = color_mask(pref.preferred_colors)
+        pref.brand_mask = brand_mask(pref.preferred_brands)
+        pref.style_mask = style_mask(pref.preferred_styles)
+    UserPreferences.objects.bulk_update(preferences, ['color_mask', 'brand_mask', 'style_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0004_outfit_outerwear_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='brand_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='outfit',
+            name='color_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='outfit',
+            name='style_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userpreferences',
+            name='brand_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userpreferences',
+            name='color_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userpreferences',
+            name='style_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_masks, migrations.RunPython.noop),
+    ]
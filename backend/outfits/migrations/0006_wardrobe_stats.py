@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('outfits', '0005_preference_bitmaps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardrobeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='wardrobe_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('outfits', '0006_wardrobe_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WearEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worn_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('outfit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wear_events', to='outfits.outfit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wear_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'worn_at'], name='outfits_wea_user_id_139a41_idx'), models.Index(fields=['outfit', 'worn_at'], name='outfits_wea_outfit__3ef6a2_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutfitWearDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('outfit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wear_rollups', to='outfits.outfit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wear_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='outfits_out_user_id_abb436_idx')],
+                'unique_together': {('outfit', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('outfits', '0007_wear_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutfitSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_public', models.BooleanField(default=False)),
+                ('kind', models.CharField(choices=[('w', 'Word'), ('p', 'Prefix'), ('t', 'Trigram')], max_length=1)),
+                ('term', models.CharField(max_length=32)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('outfit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='outfits.outfit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', 'term'], name='outfits_out_user_id_59bb06_idx'), models.Index(fields=['is_public', 'kind', 'term'], name='outfits_out_is_publ_5a3d71_idx')],
+                'unique_together': {('outfit', 'kind', 'term')},
+            },
+        ),
+        # Postings are built once, by 0020, with the tokenizer frozen there
+    ]
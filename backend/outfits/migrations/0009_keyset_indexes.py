@@ -0,0 +1,21 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'uploaded_at', 'id'], name='outfits_out_user_id_ff5601_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'is_favorite', 'uploaded_at', 'id'], name='outfits_out_user_id_14de22_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'category', 'uploaded_at'], name='outfits_out_user_id_14fd24_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'occasion', 'uploaded_at'], name='outfits_out_user_id_38fd49_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'season', 'uploaded_at'], name='outfits_out_user_id_c1e97e_idx'),
+        ),
+    ]
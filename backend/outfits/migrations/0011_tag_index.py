@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0010_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outfittag',
+            index=models.Index(fields=['tag', 'outfit'], name='outfits_out_tag_6edfaf_idx'),
+        ),
+    ]
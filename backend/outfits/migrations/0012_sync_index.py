@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0011_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'updated_at'], name='outfits_out_user_id_95404d_idx'),
+        ),
+    ]
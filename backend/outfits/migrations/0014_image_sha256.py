@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0013_image_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='image_sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
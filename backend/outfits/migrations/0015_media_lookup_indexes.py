@@ -0,0 +1,21 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0014_image_sha256'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['image'], name='outfits_out_image_2bfe03_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['thumbnail'], name='outfits_out_thumbna_0be1d3_idx'),
+        ),
+    ]
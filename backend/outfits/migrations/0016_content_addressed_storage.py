@@ -0,0 +1,40 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:23
+
+from django.db import migrations, models
+import outfits.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0015_media_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('references', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='outfit',
+            name='source_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='outfit',
+            name='image',
+            field=models.ImageField(storage=outfits.storage.get_outfit_storage, upload_to='outfits/'),
+        ),
+        migrations.AlterField(
+            model_name='outfit',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=outfits.storage.get_outfit_storage, upload_to='outfits/thumbnails/'),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', 'source_sha256'], name='outfits_out_user_id_554e6c_idx'),
+        ),
+    ]
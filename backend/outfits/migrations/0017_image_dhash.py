@@ -0,0 +1,22 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0016_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='image_dhash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['is_public', 'updated_at'], name='outfits_out_is_publ_c801fa_idx'),
+        ),
+    ]
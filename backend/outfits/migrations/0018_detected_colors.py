@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0017_image_dhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='detected_colors',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='[{color, hex, share}], largest share first'),
+        ),
+        migrations.AddField(
+            model_name='outfit',
+            name='primary_color',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='outfit',
+            name='secondary_color',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+    ]
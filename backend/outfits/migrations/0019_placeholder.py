@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0018_detected_colors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Frozen copy of outfits.search as of this migration: later changes to the
+# tokenizer or the searchable fields must not change what it writes
+SEARCH_FIELDS = {
+    'name': 4,
+    'brand': 3,
+    'color': 2,
+    'description': 1,
+}
+MIN_PREFIX = 2
+MAX_TERM_LENGTH = 32
+WORD, PREFIX, TRIGRAM = 'w', 'p', 't'
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return [word[:MAX_TERM_LENGTH] for word in _WORD_RE.findall(normalize(text or ''))]
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def outfit_terms(outfit):
+    terms = {}
+
+    def add(kind, term, weight):
+        if terms.get((kind, term), 0) < weight:
+            terms[(kind, term)] = weight
+
+    for field, weight in SEARCH_FIELDS.items():
+        for word in tokenize(getattr(outfit, field)):
+            add(WORD, word, weight)
+            for end in range(MIN_PREFIX, len(word)):
+                add(PREFIX, word[:end], weight)
+            for gram in trigrams(word):
+                add(TRIGRAM, gram, weight)
+    return terms
+
+
+def rebuild_search_index(apps, schema_editor):
+    # Terms are now accent- and case-folded; (re-)tokenize every outfit
+    Outfit = apps.get_model('outfits', 'Outfit')
+    OutfitSearchTerm = apps.get_model('outfits', 'OutfitSearchTerm')
+
+    OutfitSearchTerm.objects.all().delete()
+    outfits = Outfit.objects.only('id', 'user_id', 'is_public', *SEARCH_FIELDS).order_by('pk')
+    for outfit in outfits.iterator(chunk_size=500):
+        OutfitSearchTerm.objects.bulk_create([
+            OutfitSearchTerm(outfit_id=outfit.id, user_id=outfit.user_id, is_public=outfit.is_public,
+                             kind=kind, term=term, weight=weight)
+            for (kind, term), weight in outfit_terms(outfit).items()
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0019_placeholder'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
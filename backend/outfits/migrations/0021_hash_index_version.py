@@ -0,0 +1,20 @@
+# Generated by Django 4.2.26 on 2026-10-19 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0020_normalize_search_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashIndexVersion',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0021_hash_index_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpreferences',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from .storage import get_outfit_storage
+from .vocabulary import color_mask, brand_mask, style_mask
 
 User = get_user_model()
 
@@ -8,6 +11,7 @@ class Outfit(models.Model):
         ('top', 'Top'),
         ('bottom', 'Bottom'),
         ('dress', 'Dress'),
+        ('outerwear', 'Outerwear'),
         ('full_outfit', 'Full Outfit'),
     ]
     
@@ -27,15 +31,41 @@ class Outfit(models.Model):
         ('all_season', 'All Season'),
     ]
     
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='outfits')
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='outfits/')
-    thumbnail = models.ImageField(upload_to='outfits/thumbnails/', null=True, blank=True)
+    # Content-addressed: identical files are stored once (see storage.py)
+    image = models.ImageField(upload_to='outfits/', storage=get_outfit_storage)
+    thumbnail = models.ImageField(upload_to='outfits/thumbnails/', storage=get_outfit_storage, null=True, blank=True)
+    # Uploads are stored as received and compressed/thumbnailed in the background
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS_CHOICES, default=READY)
+    processing_error = models.CharField(max_length=255, blank=True)
+    # SHA-256 of the processed image; names its cached variants
+    image_sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # Perceptual hash (dHash) of the processed image, for similar-photo search (see similarity.py)
+    image_dhash = models.BigIntegerField(null=True, blank=True, editable=False)
+    # Tiny WebP data URI shown while the thumbnail loads
+    placeholder = models.TextField(blank=True, editable=False)
+    # SHA-256 of the upload as received; re-uploads of the same photo reuse the processed files
+    source_sha256 = models.CharField(max_length=64, blank=True, editable=False)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='full_outfit')
     occasion = models.CharField(max_length=20, choices=OCCASION_CHOICES, null=True, blank=True)
     brand = models.CharField(max_length=100, blank=True)
     color = models.CharField(max_length=50, blank=True)
+    # Colors detected in the photo, snapped to the canonical vocabulary (see colors.py)
+    primary_color = models.CharField(max_length=20, blank=True, editable=False)
+    secondary_color = models.CharField(max_length=20, blank=True, editable=False)
+    detected_colors = models.JSONField(default=list, blank=True, editable=False,
+                                       help_text="[{color, hex, share}], largest share first")
     season = models.CharField(max_length=20, choices=SEASON_CHOICES, blank=True)
     
     # Measurements
@@ -52,11 +82,50 @@ class Outfit(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Attribute bitmaps over the canonical vocabularies, maintained on save
+    color_mask = models.BigIntegerField(default=0, editable=False)
+    brand_mask = models.BigIntegerField(default=0, editable=False)
+    style_mask = models.BigIntegerField(default=0, editable=False)
+    
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Keyset pagination of the outfit and favorites lists
+            models.Index(fields=['user', 'uploaded_at', 'id']),
+            models.Index(fields=['user', 'is_favorite', 'uploaded_at', 'id']),
+            # List filters, newest first
+            models.Index(fields=['user', 'category', 'uploaded_at']),
+            models.Index(fields=['user', 'occasion', 'uploaded_at']),
+            models.Index(fields=['user', 'season', 'uploaded_at']),
+            # Delta sync
+            models.Index(fields=['user', 'updated_at']),
+            # Media access checks by file name
+            models.Index(fields=['image']),
+            models.Index(fields=['thumbnail']),
+            # Duplicate upload lookup
+            models.Index(fields=['user', 'source_sha256']),
+            # Version stamp of the public image hash index
+            models.Index(fields=['is_public', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.user.username}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember loaded values so signal handlers can compute what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.color_mask = color_mask([self.color or self.primary_color])
+        self.brand_mask = brand_mask([self.brand])
+        self.style_mask = style_mask([self.occasion])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'color_mask', 'brand_mask', 'style_mask'}
+        super().save(*args, **kwargs)
 
 
 class OutfitTag(models.Model):
@@ -66,11 +135,51 @@ class OutfitTag(models.Model):
     
     class Meta:
         unique_together = ('outfit', 'tag')
+        indexes = [
+            # Tag filters and the tag cloud look tags up before outfits
+            models.Index(fields=['tag', 'outfit']),
+        ]
     
     def __str__(self):
         return f"{self.outfit.name} - {self.tag}"
 
 
+class OutfitSearchTerm(models.Model):
+    """
+    Inverted-index posting for wardrobe search, maintained on Outfit save.
+
+    Each outfit has one row per distinct word, word prefix and word trigram of
+    its searchable fields, with the weight of the most important field it
+    appears in. Owner and visibility are copied onto the row so a search is a
+    single index range scan per scope.
+    """
+    WORD = 'w'
+    PREFIX = 'p'
+    TRIGRAM = 't'
+    KIND_CHOICES = [
+        (WORD, 'Word'),
+        (PREFIX, 'Prefix'),
+        (TRIGRAM, 'Trigram'),
+    ]
+    
+    outfit = models.ForeignKey(Outfit, on_delete=models.CASCADE, related_name='search_terms')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    is_public = models.BooleanField(default=False)
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    term = models.CharField(max_length=32)
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ('outfit', 'kind', 'term')
+        indexes = [
+            models.Index(fields=['user', 'kind', 'term']),
+            models.Index(fields=['is_public', 'kind', 'term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.outfit_id}: {self.kind}:{self.term}"
+
+
 class UserPreferences(models.Model):
     """User preferences for personalization"""
     THEME_CHOICES = [
@@ -85,5 +194,83 @@ class UserPreferences(models.Model):
     notification_enabled = models.BooleanField(default=True)
     theme = models.CharField(max_length=10, choices=THEME_CHOICES, default='light')
     
+    # Preference bitmaps over the canonical vocabularies, maintained on save
+    color_mask = models.BigIntegerField(default=0, editable=False)
+    brand_mask = models.BigIntegerField(default=0, editable=False)
+    style_mask = models.BigIntegerField(default=0, editable=False)
+    # Recommendation snapshots built before this are stale
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username}'s preferences"
+    
+    def save(self, *args, **kwargs):
+        self.color_mask = color_mask(self.preferred_colors)
+        self.brand_mask = brand_mask(self.preferred_brands)
+        self.style_mask = style_mask(self.preferred_styles)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'color_mask', 'brand_mask', 'style_mask', 'updated_at'}
+        super().save(*args, **kwargs)
+
+
+class WardrobeStats(models.Model):
+    """Per-user wardrobe counts maintained incrementally by Outfit signals"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wardrobe_stats')
+    counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username}'s wardrobe stats"
+
+
+
+class WearEvent(models.Model):
+    """Append-only log of an outfit being worn"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wear_events')
+    outfit = models.ForeignKey(Outfit, on_delete=models.CASCADE, related_name='wear_events')
+    worn_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'worn_at']),
+            models.Index(fields=['outfit', 'worn_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.outfit_id} worn at {self.worn_at}"
+
+
+class OutfitWearDaily(models.Model):
+    """Daily per-outfit wear counts rolled up from WearEvent"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wear_rollups')
+    outfit = models.ForeignKey(Outfit, on_delete=models.CASCADE, related_name='wear_rollups')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('outfit', 'day')
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.outfit_id} on {self.day}: {self.count}"
+
+
+class HashIndexVersion(models.Model):
+    """Version of the outfits behind a cached BK-tree of photo hashes, bumped when they change"""
+    key = models.CharField(max_length=64, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key}: {self.version}"
+
+
+class StoredFile(models.Model):
+    """Reference count of a file in the content-addressed outfit storage"""
+    name = models.CharField(max_length=255, primary_key=True)
+    references = models.PositiveIntegerField(default=1)
+    
     def __str__(self):
-        return f"{self.user.username}'s preferences"
\ No newline at end of file
+        return f"{self.name} ({self.references})"
@@ -0,0 +1,218 @@
+"""
+Background processing of outfit images.
+
+Uploads are validated from their header in the request, stored as received
+and the outfit is returned with ``processing_status = 'processing'``. After
+the transaction commits, the compression and thumbnail job is handed to
+``image_jobs``, a pool of ``IMAGE_PROCESSING_WORKERS`` threads. At most
+``IMAGE_PROCESSING_QUEUE`` jobs wait for a worker; beyond that, uploads are
+processed in the request thread, so a burst slows uploads down instead of
+growing an unbounded in-memory queue.
+
+A finished job swaps the processed files in with a conditional UPDATE that
+only matches while the outfit still points at the raw upload, so a job never
+overwrites a newer image and a deleted outfit is left alone. Jobs lost to a
+restart are picked up by ``python manage.py process_pending_images``.
+
+Images live in content-addressed storage (``storage.py``). An upload whose
+bytes match an earlier, processed upload of the same user is not stored or
+processed again: the new outfit takes references to the existing files.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from common.utils.image_processing import process_image
+from .colors import detected_color_fields, name_colors
+from .models import Outfit
+from .similarity import bump_hash_index, to_signed
+from .storage import outfit_storage
+from .vocabulary import color_mask
+
+logger = logging.getLogger(__name__)
+
+
+def _finish(outfit_id, raw_name, **fields):
+    """Store the job result if the outfit still has the raw upload; returns whether it did"""
+    return Outfit.objects.filter(pk=outfit_id, image=raw_name).update(updated_at=timezone.now(), **fields) > 0
+
+
+def process_stored_image(outfit_id, raw_name):
+    """
+    Compress and thumbnail a stored upload and point the outfit at the results.
+
+    Args:
+        outfit_id: Outfit the upload belongs to
+        raw_name: Storage name of the upload as received
+
+    Returns:
+        str or None: Final processing status, or None if the outfit no longer uses the upload
+    """
+    outfit = Outfit.objects.filter(pk=outfit_id, image=raw_name).only('id', 'user_id', 'image', 'color').first()
+    if outfit is None:
+        return None
+    storage = outfit.image.storage
+
+    try:
+        with storage.open(raw_name) as raw:
+            processed = process_image(raw)
+    except Exception as e:
+        logger.warning('Processing image %s of outfit %s failed: %s', raw_name, outfit_id, e)
+        error = f"Invalid image file: {str(e)}"[:255]
+        if _finish(outfit_id, raw_name, image='', processing_status=Outfit.FAILED, processing_error=error):
+            storage.delete(raw_name)
+        return Outfit.FAILED
+
+    digest = hashlib.sha256(processed.image.file.getvalue()).hexdigest()
+    image_field = Outfit._meta.get_field('image')
+    thumbnail_field = Outfit._meta.get_field('thumbnail')
+    image_name = storage.save(image_field.generate_filename(outfit, processed.image.name), processed.image)
+    thumbnail_name = thumbnail_field.storage.save(
+        thumbnail_field.generate_filename(outfit, processed.thumbnail.name), processed.thumbnail
+    )
+
+    colors = detected_color_fields(name_colors(processed.colors))
+    if _finish(outfit_id, raw_name, image=image_name, thumbnail=thumbnail_name, image_sha256=digest,
+               image_dhash=to_signed(processed.dhash), color_mask=color_mask([outfit.color or colors['primary_color']]),
+               placeholder=processed.placeholder, processing_status=Outfit.READY, processing_error='', **colors):
+        # Read after the update: a concurrent publish either is seen here or bumps the public tree itself
+        is_public = Outfit.objects.filter(pk=outfit_id).values_list('is_public', flat=True).first()
+        bump_hash_index(outfit.user_id, bool(is_public))
+        storage.delete(raw_name)
+        return Outfit.READY
+
+    # Replaced or deleted while processing
+    storage.delete(image_name)
+    thumbnail_field.storage.delete(thumbnail_name)
+    return None
+
+
+def reuse_processed_image(user_id, source_sha256):
+    """
+    Files of an earlier, processed upload of the same bytes by the user.
+
+    Locks the earlier outfit for the rest of the transaction and takes a
+    reference to its files, so deleting it meanwhile cannot remove them.
+
+    Returns:
+        dict or None: Outfit field values sharing the files, or None without a ready duplicate
+    """
+    duplicate = Outfit.objects.select_for_update().filter(
+        user_id=user_id, source_sha256=source_sha256, processing_status=Outfit.READY
+    ).exclude(image='').only(
+        'id', 'image', 'thumbnail', 'image_sha256', 'image_dhash', 'primary_color', 'secondary_color',
+        'detected_colors', 'placeholder'
+    ).first()
+    if duplicate is None:
+        return None
+
+    outfit_storage.acquire(duplicate.image.name)
+    if duplicate.thumbnail:
+        outfit_storage.acquire(duplicate.thumbnail.name)
+    return {
+        'image': duplicate.image.name,
+        'thumbnail': duplicate.thumbnail.name or None,
+        'image_sha256': duplicate.image_sha256,
+        'image_dhash': duplicate.image_dhash,
+        'primary_color': duplicate.primary_color,
+        'secondary_color': duplicate.secondary_color,
+        'detected_colors': duplicate.detected_colors,
+        'placeholder': duplicate.placeholder,
+        'processing_status': Outfit.READY,
+        'processing_error': '',
+    }
+
+
+def release_images(*names):
+    """Release stored files no longer used by an outfit once the transaction commits"""
+    names = [name for name in names if name]
+
+    def release():
+        for name in names:
+            outfit_storage.delete(name)
+
+    if names:
+        transaction.on_commit(release)
+
+
+class ImageJobPool:
+    """Bounded pool of image processing threads, created on first use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._futures = set()
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                workers = settings.IMAGE_PROCESSING_WORKERS
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='outfit-image')
+                self._slots = threading.BoundedSemaphore(workers + settings.IMAGE_PROCESSING_QUEUE)
+        return self._executor
+
+    def submit(self, outfit_id, raw_name):
+        """
+        Process an upload in the background, or inline when disabled or saturated.
+
+        Returns:
+            bool: Whether the job was queued
+        """
+        if settings.IMAGE_PROCESSING_WORKERS <= 0:
+            process_stored_image(outfit_id, raw_name)
+            return False
+
+        executor = self._start()
+        if not self._slots.acquire(blocking=False):
+            logger.info('Image processing queue full; processing outfit %s inline', outfit_id)
+            process_stored_image(outfit_id, raw_name)
+            return False
+
+        future = executor.submit(self._run, outfit_id, raw_name)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        return True
+
+    def _run(self, outfit_id, raw_name):
+        try:
+            return process_stored_image(outfit_id, raw_name)
+        except Exception:
+            logger.exception('Image job for outfit %s failed', outfit_id)
+        finally:
+            self._slots.release()
+            connection.close()
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def wait(self, timeout=None):
+        """Block until the queued jobs have finished"""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.result(timeout)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+image_jobs = ImageJobPool()
+atexit.register(image_jobs.shutdown)
+
+
+def schedule_image_processing(outfit):
+    """Process the outfit's freshly stored upload once the current transaction commits"""
+    outfit_id, raw_name = outfit.id, outfit.image.name
+    transaction.on_commit(lambda: image_jobs.submit(outfit_id, raw_name))
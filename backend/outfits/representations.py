@@ -0,0 +1,128 @@
+"""
+Fast read path producing ``OutfitSerializer`` output without DRF field machinery.
+
+Recommendation responses render many outfits with the full schema. Going
+through ``OutfitSerializer`` costs a serializer instance, per-field attribute
+lookups and (without prefetch) a tags query per outfit. Here rows are turned
+into plain dicts with converters derived once from ``OutfitSerializer``
+itself, and tags come from one batched lookup, so the output matches the
+serializer exactly (without a request in context: relative media URLs).
+"""
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+
+from .models import Outfit, OutfitTag
+from .serializers import OutfitSerializer
+
+_schema = None
+
+
+def _identity(value):
+    return value
+
+
+def _media_url(storage):
+    def convert(name):
+        return storage.url(name) if name else None
+    return convert
+
+
+def _build_schema():
+    """
+    Field names of ``OutfitSerializer`` in output order with value converters.
+
+    Returns:
+        list: (output name, model attname, converter)
+    """
+    schema = []
+    for name, field in OutfitSerializer().fields.items():
+        if name == 'tags':
+            schema.append((name, None, None))
+            continue
+
+        model_field = Outfit._meta.get_field(field.source)
+        if isinstance(field, serializers.FileField):
+            converter = _media_url(model_field.storage)
+        elif isinstance(field, (serializers.DecimalField, serializers.DateTimeField,
+                                serializers.DateField, serializers.FloatField)):
+            converter = field.to_representation
+        else:
+            converter = _identity
+        schema.append((name, model_field.attname, converter))
+    return schema
+
+
+def get_schema():
+    global _schema
+    if _schema is None:
+        _schema = _build_schema()
+    return _schema
+
+
+def _tags_by_outfit(outfit_ids):
+    tags = {outfit_id: [] for outfit_id in outfit_ids}
+    rows = OutfitTag.objects.filter(outfit_id__in=outfit_ids).order_by('pk').values_list('outfit_id', 'tag')
+    for outfit_id, tag in rows:
+        tags[outfit_id].append({'tag': tag})
+    return tags
+
+
+def represent_rows(rows):
+    """
+    Render rows keyed by model attname (e.g. from ``.values()``).
+
+    Returns:
+        list: Dicts identical to ``OutfitSerializer(outfit).data``, in row order
+    """
+    schema = get_schema()
+    tags = _tags_by_outfit([row['id'] for row in rows]) if rows else {}
+
+    rendered = []
+    for row in rows:
+        data = {}
+        for name, attname, convert in schema:
+            if attname is None:
+                data[name] = tags[row['id']]
+                continue
+            value = row[attname]
+            if isinstance(value, FieldFile):
+                value = value.name
+            data[name] = None if value is None else convert(value)
+        rendered.append(data)
+    return rendered
+
+
+def represent_queryset(queryset):
+    """Fetch and render every outfit of ``queryset`` with ``.values()`` and one tag lookup"""
+    attnames = [attname for _, attname, _ in get_schema() if attname is not None]
+    return represent_rows(list(queryset.values(*attnames)))
+
+
+def represent_outfits(ids, queryset=None):
+    """
+    Fetch and render outfits by id with ``.values()`` and one tag lookup.
+
+    Missing ids are skipped.
+
+    Returns:
+        list: Rendered outfits in ``ids`` order
+    """
+    if queryset is None:
+        queryset = Outfit.objects.all()
+    attnames = [attname for _, attname, _ in get_schema() if attname is not None]
+    rows = {row['id']: row for row in queryset.filter(pk__in=ids).values(*attnames)}
+    return represent_rows([rows[pk] for pk in ids if pk in rows])
+
+
+def represent_instances(outfits):
+    """
+    Render already loaded outfits (no outfit query, one tag lookup).
+
+    Values are read through attributes, so ``.only()``/``.defer()`` instances
+    work too (each deferred field costs Django's usual refresh query).
+    """
+    attnames = [attname for _, attname, _ in get_schema() if attname is not None]
+    return represent_rows([
+        {attname: getattr(outfit, attname) for attname in attnames}
+        for outfit in outfits
+    ])
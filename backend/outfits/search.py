@@ -0,0 +1,224 @@
+"""
+Indexed wardrobe search.
+
+Searchable outfit fields are tokenized into ``OutfitSearchTerm`` postings:
+
+- words, for exact matches;
+- word prefixes (``MIN_PREFIX`` characters and up), so search-as-you-type is
+  an equality lookup instead of ``LIKE 'abc%'``;
+- padded word trigrams, for typo tolerance.
+
+A query fetches only the postings of its own words and prefixes through the
+(user|is_public, kind, term) indexes. Trigrams are a fallback for words with
+no exact or prefix match anywhere in scope, and at most ``MAX_GRAM_POSTINGS``
+are read per trigram, so the cost stays flat as the catalog grows. Every
+query word must match (exactly, as a prefix or fuzzily); outfits are ranked
+by the sum of match quality times field weight.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+
+from .models import Outfit, OutfitSearchTerm
+
+# Searchable fields and their weights
+SEARCH_FIELDS = {
+    'name': 4,
+    'brand': 3,
+    'color': 2,
+    'description': 1,
+}
+
+MIN_PREFIX = 2
+MAX_TERM_LENGTH = 32
+MAX_QUERY_WORDS = 8
+# Best matches returned (documented in API.md)
+MAX_RESULTS = 200
+# Postings read per trigram of a typo'd word (newest first)
+MAX_GRAM_POSTINGS = 500
+
+# A typo'd word matches when it shares this fraction of its trigrams
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+# Match quality multipliers
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+TRIGRAM_SCORE = 1
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """
+    Fold case and accents ('Café', 'CAFE' -> 'cafe'; 'Straße' -> 'strasse').
+
+    MySQL's accent- and case-insensitive collation compares terms this way,
+    so two terms it considers equal must already be equal here or they would
+    collide in the unique (outfit, kind, term) index.
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    """Normalized words of ``text``, truncated to the indexed term length"""
+    return [word[:MAX_TERM_LENGTH] for word in _WORD_RE.findall(normalize(text or ''))]
+
+
+def trigrams(word):
+    """Padded trigrams of a word ('jeans' -> '  j', ' je', 'jea', ..., 'ns ')"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def outfit_terms(outfit):
+    """
+    Postings of one outfit.
+
+    Returns:
+        dict: (kind, term) -> weight
+    """
+    terms = {}
+
+    def add(kind, term, weight):
+        if terms.get((kind, term), 0) < weight:
+            terms[(kind, term)] = weight
+
+    for field, weight in SEARCH_FIELDS.items():
+        for word in tokenize(getattr(outfit, field)):
+            add(OutfitSearchTerm.WORD, word, weight)
+            for end in range(MIN_PREFIX, len(word)):
+                add(OutfitSearchTerm.PREFIX, word[:end], weight)
+            for gram in trigrams(word):
+                add(OutfitSearchTerm.TRIGRAM, gram, weight)
+    return terms
+
+
+def _postings(outfit):
+    return [
+        OutfitSearchTerm(outfit_id=outfit.id, user_id=outfit.user_id, is_public=outfit.is_public,
+                         kind=kind, term=term, weight=weight)
+        for (kind, term), weight in outfit_terms(outfit).items()
+    ]
+
+
+def index_outfit(outfit):
+    """Replace the postings of one outfit"""
+    with transaction.atomic():
+        OutfitSearchTerm.objects.filter(outfit_id=outfit.id).delete()
+        OutfitSearchTerm.objects.bulk_create(_postings(outfit), batch_size=500)
+
+
+def set_outfit_visibility(outfit):
+    """Propagate a change of ``is_public`` without re-tokenizing"""
+    OutfitSearchTerm.objects.filter(outfit_id=outfit.id).update(is_public=outfit.is_public)
+
+
+def rebuild_search_index(queryset=None, batch_size=500):
+    """
+    Rebuild postings for ``queryset`` (default: all outfits).
+
+    Returns:
+        int: Number of outfits indexed
+    """
+    if queryset is None:
+        queryset = Outfit.objects.all()
+    queryset = queryset.only('id', 'user_id', 'is_public', *SEARCH_FIELDS).order_by('pk')
+
+    indexed = 0
+    batch = []
+    for outfit in queryset.iterator(chunk_size=batch_size):
+        batch.append(outfit)
+        if len(batch) == batch_size:
+            _replace_postings(batch)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        _replace_postings(batch)
+        indexed += len(batch)
+    return indexed
+
+
+def _replace_postings(outfits):
+    with transaction.atomic():
+        OutfitSearchTerm.objects.filter(outfit_id__in=[o.id for o in outfits]).delete()
+        OutfitSearchTerm.objects.bulk_create(
+            [posting for outfit in outfits for posting in _postings(outfit)], batch_size=1000
+        )
+
+
+def search_outfit_ids(query, user=None, public=False, limit=MAX_RESULTS):
+    """
+    Rank outfits matching ``query``.
+
+    Args:
+        query: Search text
+        user: Search this user's outfits
+        public: Search public outfits instead
+
+    Returns:
+        list: Outfit ids, best match first
+    """
+    words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_WORDS]
+    if not words:
+        return []
+
+    if public:
+        # A bare boolean condition (what is_public=True compiles to) can't seek the index
+        scope = OutfitSearchTerm.objects.filter(is_public=Value(True))
+    else:
+        scope = OutfitSearchTerm.objects.filter(user=user)
+
+    # outfit -> word -> best exact/prefix score
+    direct = defaultdict(dict)
+    matched_words = set()
+    postings = scope.filter(kind__in=[OutfitSearchTerm.WORD, OutfitSearchTerm.PREFIX], term__in=words)
+    for outfit_id, kind, term, weight in postings.values_list('outfit_id', 'kind', 'term', 'weight'):
+        score = weight * (EXACT_SCORE if kind == OutfitSearchTerm.WORD else PREFIX_SCORE)
+        direct[outfit_id][term] = max(direct[outfit_id].get(term, 0), score)
+        matched_words.add(term)
+
+    # Trigrams only for words nothing matched exactly or as a prefix
+    grams = {word: trigrams(word) for word in words if word not in matched_words}
+    fuzzy = defaultdict(lambda: defaultdict(dict))
+    for word, word_grams in grams.items():
+        for gram in word_grams:
+            if gram.startswith('  '):
+                # Shared by every word with the same first letter; the others suffice
+                continue
+            rows = scope.filter(kind=OutfitSearchTerm.TRIGRAM, term=gram).order_by('-pk')[:MAX_GRAM_POSTINGS]
+            for outfit_id, weight in rows.values_list('outfit_id', 'weight'):
+                fuzzy[outfit_id][word][gram] = weight
+
+    ranked = []
+    for outfit_id in direct.keys() | fuzzy.keys():
+        total = 0
+        for word in words:
+            score = direct[outfit_id].get(word, 0) if outfit_id in direct else 0
+            matched = fuzzy[outfit_id].get(word) if outfit_id in fuzzy else None
+            if not score and matched:
+                similarity = len(matched) / (len(grams[word]) - 1)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    score = max(matched.values()) * TRIGRAM_SCORE * similarity
+            if not score:
+                break
+            total += score
+        else:
+            ranked.append((-total, -outfit_id))
+
+    ranked.sort()
+    return [-outfit_id for _, outfit_id in ranked[:limit]]
+
+
+def order_by_ids(queryset, ids):
+    """Filter ``queryset`` to ``ids`` and keep their order"""
+    if not ids:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=pk, then=Value(i)) for i, pk in enumerate(ids)],
+        output_field=IntegerField()
+    )
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('search_rank')
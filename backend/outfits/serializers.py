@@ -1,16 +1,45 @@
 from rest_framework import serializers
 from .models import Outfit, OutfitTag
+from .tags import normalize_tag
+from common.serializers import SparseFieldsMixin
 
 class OutfitTagSerializer(serializers.ModelSerializer):
     class Meta:
         model = OutfitTag
         fields = ['tag']
+    
+    def validate_tag(self, value):
+        tag = normalize_tag(value)
+        if not tag:
+            raise serializers.ValidationError('Tag cannot be blank.')
+        return tag
 
 
-class OutfitSerializer(serializers.ModelSerializer):
+class OutfitSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tags = OutfitTagSerializer(many=True, read_only=True)
     
     class Meta:
         model = Outfit
-        fields = '__all__'
-        read_only_fields = ['user', 'uploaded_at', 'updated_at', 'thumbnail']
\ No newline at end of file
+        exclude = ['color_mask', 'brand_mask', 'style_mask', 'image_dhash']
+        read_only_fields = ['user', 'uploaded_at', 'updated_at', 'thumbnail',
+                            'processing_status', 'processing_error']
+
+
+class OutfitListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Slim read-only representation for wardrobe grids and pickers"""
+    
+    class Meta:
+        model = Outfit
+        fields = ['id', 'name', 'image', 'thumbnail', 'category', 'occasion', 'season',
+                  'is_favorite', 'times_worn', 'uploaded_at', 'processing_status', 'image_sha256',
+                  'placeholder']
+        read_only_fields = fields
+
+
+class OutfitProcessingSerializer(serializers.ModelSerializer):
+    """Image processing status of one outfit"""
+    
+    class Meta:
+        model = Outfit
+        fields = ['id', 'processing_status', 'processing_error', 'image', 'thumbnail']
+        read_only_fields = fields
@@ -0,0 +1,106 @@
+"""
+Signal handlers keeping denormalized outfit data in sync.
+"""
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Outfit
+from .processing import release_images
+from .search import SEARCH_FIELDS, index_outfit, set_outfit_visibility
+from .similarity import bump_hash_index
+from .stats import STATS_FIELDS, outfit_stats_keys, apply_stats_delta, refresh_wardrobe_stats
+
+
+def _current_values(instance):
+    return {field: getattr(instance, field) for field in STATS_FIELDS}
+
+
+@receiver(post_save, sender=Outfit)
+def update_wardrobe_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or not settings.WARDROBE_STATS_ENABLED:
+        return
+
+    current = _current_values(instance)
+    if created:
+        apply_stats_delta(instance.user_id, added=outfit_stats_keys(current))
+    else:
+        previous = outfit_stats_keys(getattr(instance, '_loaded_values', {}))
+        if previous is None:
+            # Previous state unknown (instance not loaded from the database)
+            refresh_wardrobe_stats(instance.user_id)
+        else:
+            apply_stats_delta(instance.user_id, removed=previous, added=outfit_stats_keys(current))
+
+    if not hasattr(instance, '_loaded_values'):
+        instance._loaded_values = {}
+    instance._loaded_values.update(current)
+
+
+@receiver(post_delete, sender=Outfit)
+def update_wardrobe_stats_on_delete(sender, instance, **kwargs):
+    if not settings.WARDROBE_STATS_ENABLED:
+        return
+
+    previous = outfit_stats_keys(getattr(instance, '_loaded_values', {}))
+    apply_stats_delta(instance.user_id, removed=previous or outfit_stats_keys(_current_values(instance)))
+
+
+@receiver(post_save, sender=Outfit)
+def update_hash_index_on_save(sender, instance, created, raw=False, **kwargs):
+    # Registered before the search handler, which records the new is_public
+    if raw:
+        return
+
+    loaded = getattr(instance, '_loaded_values', {})
+    if created:
+        changed = instance.image_dhash is not None
+    else:
+        changed = any(
+            field not in loaded or loaded[field] != getattr(instance, field) for field in ('image_dhash', 'is_public')
+        )
+        # Unhashed outfits are in no tree
+        if 'image_dhash' in loaded and loaded['image_dhash'] is None and instance.image_dhash is None:
+            changed = False
+    if changed:
+        was_public = loaded.get('is_public', False)
+        bump_hash_index(instance.user_id, instance.is_public or was_public)
+
+    if not hasattr(instance, '_loaded_values'):
+        instance._loaded_values = {}
+    instance._loaded_values['image_dhash'] = instance.image_dhash
+
+
+@receiver(post_save, sender=Outfit)
+def update_search_index_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+
+    loaded = getattr(instance, '_loaded_values', {})
+    text_changed = created or any(
+        field not in loaded or loaded[field] != getattr(instance, field) for field in SEARCH_FIELDS
+    )
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        text_changed = False
+
+    if text_changed:
+        index_outfit(instance)
+    elif loaded.get('is_public', not instance.is_public) != instance.is_public:
+        set_outfit_visibility(instance)
+
+    if not hasattr(instance, '_loaded_values'):
+        instance._loaded_values = {}
+    instance._loaded_values.update(
+        {field: getattr(instance, field) for field in (*SEARCH_FIELDS, 'is_public')}
+    )
+
+
+@receiver(post_delete, sender=Outfit)
+def release_images_on_delete(sender, instance, **kwargs):
+    release_images(instance.image.name, instance.thumbnail.name)
+
+
+@receiver(post_delete, sender=Outfit)
+def update_hash_index_on_delete(sender, instance, **kwargs):
+    if instance.image_dhash is not None:
+        bump_hash_index(instance.user_id, instance.is_public)
@@ -0,0 +1,200 @@
+"""
+Visual similarity of outfit photos from perceptual hashes.
+
+Processed images carry a 64-bit dHash (``Outfit.image_dhash``); the Hamming
+distance between two hashes measures how different the photos look. Hashes
+are indexed in BK-trees, one per wardrobe and one for the public catalog.
+A BK-tree node keeps its children by their distance to it, and by the
+triangle inequality a search within ``radius`` of a hash at distance ``d``
+from a node only has to visit children at distances ``d - radius`` to
+``d + radius``, so small-radius queries touch a fraction of the tree.
+
+Trees are built per process on first use and kept until ``HashIndexVersion``
+of their key changes. The version is bumped only by what changes a tree:
+storing or clearing a hash, changing visibility and deleting an outfit
+(``bump_hash_index``, called from the signal handlers and from the updates
+that write hashes). Other writes, such as wear and favorite updates, leave
+cached trees alone, and checking one is a primary key lookup.
+"""
+import threading
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from common.utils.image_processing import dhash
+from .models import HashIndexVersion, Outfit
+
+HASH_BITS = 64
+_MASK = (1 << HASH_BITS) - 1
+# Hamming distances: re-encoded or resized copies of a photo stay within the
+# first; the second still finds shots of the same garment or scene
+NEAR_DUPLICATE_DISTANCE = 6
+SIMILAR_DISTANCE = 16
+# Wardrobe trees kept per process (least recently used are dropped)
+MAX_CACHED_WARDROBES = 256
+
+
+def hamming(a, b):
+    return ((a ^ b) & _MASK).bit_count()
+
+
+def to_signed(value):
+    """Store an unsigned 64-bit hash in a signed BigIntegerField"""
+    return value - (1 << HASH_BITS) if value >> (HASH_BITS - 1) else value
+
+
+class BKTree:
+    """Burkhard-Keller tree of hashes under Hamming distance, with any number of items per hash"""
+
+    def __init__(self):
+        # Nodes are [hash, items, {distance: child}]
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """
+        Items whose hash is within ``radius`` of ``value``.
+
+        Returns:
+            list: (distance, item) pairs, in no particular order
+        """
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                results.extend((distance, item) for item in items)
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return results
+
+
+PUBLIC_INDEX = 'public'
+
+
+def wardrobe_index(user_id):
+    return f'wardrobe:{user_id}'
+
+
+def hash_index_version(key):
+    return HashIndexVersion.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+
+def bump_hash_index(user_id, public):
+    """
+    Invalidate the cached trees holding an outfit.
+
+    Args:
+        user_id: Owner of the outfit
+        public: Whether the outfit is or was public
+    """
+    for key in [wardrobe_index(user_id)] + ([PUBLIC_INDEX] if public else []):
+        if HashIndexVersion.objects.filter(key=key).update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                HashIndexVersion.objects.create(key=key, version=1)
+        except IntegrityError:
+            HashIndexVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+
+class HashIndex:
+    """Per-process BK-trees over outfit querysets, rebuilt when their version changes"""
+
+    def __init__(self, max_entries=MAX_CACHED_WARDROBES):
+        self._lock = threading.Lock()
+        self._trees = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key, queryset):
+        """
+        BK-tree of ``(outfit_id, user_id)`` items for the hashed outfits of ``queryset``.
+
+        Args:
+            key: ``HashIndexVersion`` key of the queryset
+            queryset: Outfits to index
+        """
+        # Read before the outfits: a tree built from newer rows is merely rebuilt once more
+        version = hash_index_version(key)
+        with self._lock:
+            cached = self._trees.get(key)
+            if cached is not None and cached[0] == version:
+                self._trees.move_to_end(key)
+                return cached[1]
+
+        tree = BKTree()
+        hashed = queryset.filter(image_dhash__isnull=False)
+        for outfit_id, user_id, value in hashed.values_list('id', 'user_id', 'image_dhash'):
+            tree.add(value, (outfit_id, user_id))
+        with self._lock:
+            self._trees[key] = (version, tree)
+            self._trees.move_to_end(key)
+            while len(self._trees) > self.max_entries:
+                self._trees.popitem(last=False)
+        return tree
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+
+
+hash_index = HashIndex()
+
+
+def ensure_image_dhash(outfit):
+    """dHash of the outfit's image, computed and stored for images processed before hashing existed"""
+    if outfit.image_dhash is None:
+        source = outfit.thumbnail or outfit.image
+        with source.open('rb') as f, Image.open(f) as img:
+            outfit.image_dhash = to_signed(dhash(img))
+        if Outfit.objects.filter(pk=outfit.pk, image=outfit.image.name).update(
+            image_dhash=outfit.image_dhash, updated_at=timezone.now()
+        ):
+            bump_hash_index(outfit.user_id, outfit.is_public)
+    return outfit.image_dhash
+
+
+def find_similar(outfit, max_distance, public=False, limit=10):
+    """
+    Outfits whose photos are within ``max_distance`` of an outfit's photo.
+
+    Args:
+        outfit: Outfit with a processed image
+        max_distance: Largest Hamming distance to include
+        public: Search the public catalog (other users' outfits) instead of the owner's wardrobe
+        limit: Maximum number of results
+
+    Returns:
+        list: (distance, outfit_id) pairs, nearest first
+    """
+    value = ensure_image_dhash(outfit)
+    if public:
+        tree = hash_index.get(PUBLIC_INDEX, Outfit.objects.filter(is_public=True))
+    else:
+        tree = hash_index.get(wardrobe_index(outfit.user_id), Outfit.objects.filter(user_id=outfit.user_id))
+
+    matches = sorted(
+        (distance, outfit_id) for distance, (outfit_id, user_id) in tree.search(value, max_distance)
+        if outfit_id != outfit.id and (not public or user_id != outfit.user_id)
+    )
+    return matches[:limit]
@@ -0,0 +1,154 @@
+"""
+Wardrobe statistics.
+
+Breakdowns are computed with one grouped aggregate (conditional ``Count`` with
+``filter=``). When ``WARDROBE_STATS_ENABLED`` is on, the counts are also kept in
+a per-user ``WardrobeStats`` row maintained incrementally by ``Outfit`` signals,
+so the dashboard reads a single row.
+
+Counts are stored under flat keys: 'total', 'favorites', 'category:<value>',
+'occasion:<value>' and 'season:<value>'.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Outfit, WardrobeStats
+
+# Fields an outfit's contribution to the counts depends on
+STATS_FIELDS = ('category', 'occasion', 'season', 'is_favorite')
+
+_BREAKDOWNS = (
+    ('category', Outfit.CATEGORY_CHOICES),
+    ('occasion', Outfit.OCCASION_CHOICES),
+    ('season', Outfit.SEASON_CHOICES),
+)
+
+
+def _count_aggregates():
+    aggregates = {
+        'total': Count('id'),
+        'favorites': Count('id', filter=Q(is_favorite=True)),
+    }
+    for field, choices in _BREAKDOWNS:
+        for value, _ in choices:
+            aggregates[f'{field}:{value}'] = Count('id', filter=Q(**{field: value}))
+    return aggregates
+
+
+def _nonzero(counts):
+    return {key: value for key, value in counts.items() if value}
+
+
+def compute_wardrobe_counts(user):
+    """Compute all counts for one user in a single query"""
+    return _nonzero(Outfit.objects.filter(user=user).aggregate(**_count_aggregates()))
+
+
+def compute_all_wardrobe_counts():
+    """
+    Compute counts for every user with outfits in a single grouped query.
+
+    Returns:
+        dict: user_id -> counts
+    """
+    rows = Outfit.objects.order_by().values('user_id').annotate(**_count_aggregates())
+    return {row.pop('user_id'): _nonzero(row) for row in rows}
+
+
+def outfit_stats_keys(values):
+    """
+    Count keys one outfit contributes to.
+
+    Args:
+        values: mapping with the STATS_FIELDS of an outfit
+
+    Returns:
+        list or None: None when some field is unknown (e.g. deferred)
+    """
+    if any(field not in values for field in STATS_FIELDS):
+        return None
+
+    keys = ['total', f"category:{values['category']}"]
+    if values['is_favorite']:
+        keys.append('favorites')
+    if values['occasion']:
+        keys.append(f"occasion:{values['occasion']}")
+    if values['season']:
+        keys.append(f"season:{values['season']}")
+    return keys
+
+
+def rebuild_wardrobe_stats(user_id):
+    """Recompute a user's stats row from scratch"""
+    counts = compute_wardrobe_counts(user_id)
+    WardrobeStats.objects.update_or_create(user_id=user_id, defaults={'counts': counts})
+    return counts
+
+
+def refresh_wardrobe_stats(user_id):
+    """Recompute an existing stats row (no-op when the user has none yet)"""
+    WardrobeStats.objects.filter(user_id=user_id).update(
+        counts=compute_wardrobe_counts(user_id), updated_at=timezone.now()
+    )
+
+
+def apply_stats_delta(user_id, removed=(), added=()):
+    """
+    Adjust a user's stats row for one outfit change.
+
+    The row is locked while it is updated so concurrent changes do not lose
+    increments. Users without a row are skipped; it is built on first read.
+    """
+    delta = {}
+    for key in removed:
+        delta[key] = delta.get(key, 0) - 1
+    for key in added:
+        delta[key] = delta.get(key, 0) + 1
+    delta = _nonzero(delta)
+    if not delta:
+        return
+
+    with transaction.atomic():
+        stats = WardrobeStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None:
+            return
+
+        counts = stats.counts
+        for key, change in delta.items():
+            counts[key] = counts.get(key, 0) + change
+        stats.counts = _nonzero(counts)
+        stats.save(update_fields=['counts', 'updated_at'])
+
+
+def get_wardrobe_counts(user):
+    """Read the maintained stats row, building it on first use"""
+    counts = WardrobeStats.objects.filter(user=user).values_list('counts', flat=True).first()
+    if counts is None:
+        counts = rebuild_wardrobe_stats(user.id)
+    return counts
+
+
+def most_worn_outfit(user):
+    return (
+        Outfit.objects.filter(user=user, times_worn__gt=0)
+        .order_by('-times_worn')
+        .values('id', 'name', 'times_worn')
+        .first()
+    )
+
+
+def build_stats_response(counts, most_worn):
+    """Shape counts into the OutfitStatsView response"""
+    response = {
+        'total_outfits': counts.get('total', 0),
+        'favorites_count': counts.get('favorites', 0),
+    }
+    for field, choices in _BREAKDOWNS:
+        response[f'by_{field}'] = {
+            value: counts[f'{field}:{value}']
+            for value, _ in choices
+            if counts.get(f'{field}:{value}')
+        }
+    response['most_worn'] = most_worn
+    return response
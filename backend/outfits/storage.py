@@ -0,0 +1,108 @@
+"""
+Content-addressed storage for outfit images.
+
+Files are named by the SHA-256 of their bytes and sharded by hash prefix
+(``outfits/ab/cd/abcd....jpg``), so saving a file that is already stored
+writes nothing and both outfits share one file on disk. ``StoredFile`` counts
+the references to each name: ``save()`` takes one, ``acquire()`` takes one on
+an existing name and ``delete()`` releases one, removing the file with the
+last. Files stored before this scheme have no row and count as referenced
+once.
+
+The count row is locked while the last reference is released, so a
+concurrent save of the same content waits and then writes the file again.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from common.storage import SignedFileSystemStorage
+
+
+def content_sha256(content, chunk_size=65536):
+    """SHA-256 of a file's contents (read from the start; the position is restored to 0)"""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(chunk_size), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(SignedFileSystemStorage):
+    """File system storage that names files by content hash and counts their references"""
+
+    def content_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest[2:4], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content in _save(); equal names mean equal files
+        return name
+
+    def _save(self, name, content):
+        name = self.content_name(name, content_sha256(content))
+        self.acquire(name)
+        path = self.path(name)
+        if not os.path.exists(path):
+            self._write(path, content)
+        return name
+
+    def _write(self, path, content):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            # Concurrent writers of the same name write the same bytes
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def acquire(self, name):
+        """Take a reference to a stored name"""
+        from .models import StoredFile  # models import this module
+
+        if StoredFile.objects.filter(name=name).update(references=F('references') + 1):
+            return
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, references=1)
+        except IntegrityError:
+            StoredFile.objects.filter(name=name).update(references=F('references') + 1)
+
+    def references(self, name):
+        from .models import StoredFile
+
+        return StoredFile.objects.filter(name=name).values_list('references', flat=True).first() or 0
+
+    def delete(self, name):
+        """Release a reference, deleting the file with the last one"""
+        from .models import StoredFile
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is not None and stored.references > 1:
+                StoredFile.objects.filter(name=name).update(references=F('references') - 1)
+                return
+            if stored is not None:
+                stored.delete()
+            super().delete(name)
+
+
+outfit_storage = ContentAddressedStorage()
+
+
+def get_outfit_storage():
+    return outfit_storage
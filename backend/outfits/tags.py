@@ -0,0 +1,51 @@
+"""
+Outfit tags: normalization, tag filters and the per-user tag cloud.
+
+Tags are stored lowercased with whitespace collapsed, so filters are plain
+equality lookups on the (tag, outfit) index.
+"""
+from django.db.models import Count
+
+from .models import OutfitTag
+
+
+def normalize_tag(tag):
+    """'  Date  Night ' -> 'date night'"""
+    return ' '.join(str(tag).lower().split())
+
+
+def parse_tags(value):
+    """Normalized, de-duplicated tags from a comma-separated query parameter"""
+    tags = (normalize_tag(tag) for tag in (value or '').split(','))
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def filter_by_tags(queryset, tags, match_all=False):
+    """
+    Restrict an outfit queryset to outfits tagged with any (or all) of ``tags``.
+
+    Both forms are a single semi-join answered from the (tag, outfit) index;
+    "all" groups matching rows per outfit and keeps outfits with every tag.
+    """
+    if not tags:
+        return queryset
+
+    tagged = OutfitTag.objects.filter(tag__in=tags).order_by()
+    if match_all and len(tags) > 1:
+        tagged = tagged.values('outfit_id').annotate(matched=Count('tag')).filter(matched=len(tags))
+    return queryset.filter(id__in=tagged.values('outfit_id'))
+
+
+def tag_cloud(user):
+    """
+    Tag usage counts across a user's outfits, most used first.
+
+    Returns:
+        list: [{'tag': str, 'count': int}]
+    """
+    return list(
+        OutfitTag.objects.filter(outfit__user=user)
+        .values('tag')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'tag')
+    )
@@ -1,10 +1,44 @@
-from django.test import TestCase
-from rest_framework.test import APITestCase
+import hashlib
+import math
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.http import http_date
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth import get_user_model
-from .models import Outfit
-from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from common.testing import QueryCounter, run_concurrently
+from common.utils.image_processing import process_image, validate_image
+from .models import Outfit, OutfitTag, OutfitWearDaily, StoredFile, UserPreferences, WardrobeStats, WearEvent
+from .stats import compute_wardrobe_counts
+from .counters import increment_times_worn, worn_buffer
+from .processing import image_jobs, process_stored_image
+from .storage import outfit_storage
+from .colors import PALETTE, name_colors, snap_color
+from . import variants
+from .similarity import BKTree, hamming, hash_index, to_signed
+from .search import search_outfit_ids, trigrams
+from .wear import record_wears
+from .vocabulary import brand_mask, color_mask, normalize_color, style_mask
+from .representations import represent_instances, represent_outfits
+from .serializers import OutfitListSerializer, OutfitSerializer
+from .views import OutfitStatsView
+from io import BytesIO, StringIO
 from PIL import Image
+import numpy as np
 
 User = get_user_model()
 
@@ -35,6 +69,26 @@ class OutfitAPITests(APITestCase):
         response = self.client.get(self.outfit_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
     
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024, IMAGE_PROCESSING_WORKERS=0)
+    def test_create_outfit_with_spooled_upload(self):
+        """Test uploads above the in-memory limit are spooled to disk and processed"""
+        file = BytesIO()
+        Image.effect_noise((400, 300), 50).convert('RGB').save(file, 'PNG')
+        file.name = 'photo.png'
+        file.seek(0)
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media), \
+                mock.patch('outfits.views.validate_image', wraps=validate_image) as validate:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.outfit_url, {'name': 'Coat', 'image': file}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertIsInstance(validate.call_args.args[0], TemporaryUploadedFile)
+            outfit = Outfit.objects.get(pk=response.data['id'])
+            self.assertEqual(outfit.processing_status, Outfit.READY)
+            self.assertTrue(outfit.image.name.endswith('.jpg'))
+            self.assertTrue(os.path.exists(outfit.thumbnail.path))
+            self.assertEqual(outfit.image.name, outfit_storage.content_name('outfits/photo.jpg', outfit.image_sha256))
+            self.assertTrue(os.path.exists(outfit.image.path))
+    
     def test_outfit_requires_authentication(self):
         """Test outfit endpoints require authentication"""
         self.client.force_authenticate(user=None)
@@ -75,3 +129,1221 @@ class OutfitModelTests(TestCase):
         expected = f'Blue Dress - {self.user.username}'
         self.assertEqual(str(outfit), expected)
 
+
+
+class ConcurrentStatsTests(TransactionTestCase):
+    """Test identical concurrent stats requests share one computation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        Outfit.objects.create(user=self.user, name='Jeans', category='bottom', occasion='casual')
+        Outfit.objects.create(user=self.user, name='Shirt', category='top', times_worn=3)
+
+    def request_stats(self, counter):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with connection.execute_wrapper(counter):
+            return client.get('/api/outfits/stats/')
+
+    def test_concurrent_stats_requests_are_coalesced(self):
+        """Test the query count collapses to that of a single request plus each request's version stamp"""
+        single = QueryCounter()
+        run_concurrently(1, lambda i: self.request_stats(single))
+        self.assertGreater(single.count, 0)
+
+        original = OutfitStatsView.get_stats
+
+        def slow_stats(view, user):
+            time.sleep(0.2)
+            return original(view, user)
+
+        concurrent = QueryCounter()
+        with mock.patch.object(OutfitStatsView, 'get_stats', autospec=True, side_effect=slow_stats):
+            responses = run_concurrently(8, lambda i: self.request_stats(concurrent))
+
+        self.assertTrue(all(r.data == responses[0].data for r in responses))
+        self.assertEqual(responses[0].data['total_outfits'], 2)
+        self.assertEqual(concurrent.count, single.count + 7 * 2)
+
+
+class DetectedColorTests(TestCase):
+    """Test snapping detected colors to the canonical vocabulary"""
+
+    def test_palette_colors_snap_to_themselves(self):
+        """Test the lookup table maps every palette color and close shades to its name"""
+        for name, rgb in PALETTE.items():
+            self.assertEqual(snap_color(rgb), name)
+        self.assertEqual(snap_color((0, 0, 128)), 'navy')
+        self.assertEqual(snap_color((100, 140, 200)), 'blue')
+        self.assertEqual(snap_color((60, 60, 60)), 'black')
+
+    def test_clusters_are_merged_by_name(self):
+        """Test clusters with one name are summed and small ones dropped"""
+        detected = name_colors([((25, 35, 80), 0.5), ((200, 30, 40), 0.3), ((30, 40, 95), 0.15),
+                                ((240, 210, 40), 0.05)])
+        self.assertEqual(detected, [
+            {'color': 'navy', 'hex': '#192350', 'share': 0.65},
+            {'color': 'red', 'hex': '#c81e28', 'share': 0.3},
+        ])
+
+    def test_detected_color_backs_up_stated_color(self):
+        """Test preference masks use the detected color only when none is stated"""
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        outfit = Outfit.objects.create(user=user, name='Coat', primary_color='navy')
+        self.assertEqual(outfit.color_mask, color_mask(['navy']))
+        outfit.color = 'Red'
+        outfit.save()
+        self.assertEqual(outfit.color_mask, color_mask(['red']))
+
+
+class PreferenceBitmapTests(TestCase):
+    """Test attribute and preference bitmaps maintained on save"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+
+    def test_outfit_masks_computed_on_save(self):
+        """Test outfit attributes are encoded when saved"""
+        outfit = Outfit.objects.create(user=self.user, name='Jeans', color='Light Blue',
+                                       brand="Levi's", occasion='casual')
+        self.assertEqual(outfit.color_mask, color_mask(['blue']))
+        self.assertEqual(outfit.brand_mask, brand_mask(["levi's"]))
+        self.assertEqual(outfit.style_mask, style_mask(['casual']))
+
+        outfit.color = 'navy'
+        outfit.save(update_fields=['color'])
+        outfit.refresh_from_db()
+        self.assertEqual(outfit.color_mask, color_mask(['navy']))
+
+    def test_preference_masks_match_outfit_masks(self):
+        """Test preferences and outfits share the same vocabulary"""
+        prefs = UserPreferences.objects.create(
+            user=self.user,
+            preferred_colors=['Gray', 'denim'],
+            preferred_brands=['Zara'],
+            preferred_styles=['Formal', 'unknown-style']
+        )
+        self.assertEqual(prefs.color_mask, color_mask(['grey', 'blue']))
+        self.assertEqual(prefs.style_mask, style_mask(['formal']))
+
+        outfit = Outfit.objects.create(user=self.user, name='Suit', color='charcoal', brand='ZARA')
+        self.assertTrue(outfit.color_mask & prefs.color_mask)
+        self.assertTrue(outfit.brand_mask & prefs.brand_mask)
+
+    def test_unknown_color_has_empty_mask(self):
+        """Test unrecognised colors are ignored"""
+        self.assertIsNone(normalize_color('sparkly'))
+        self.assertEqual(color_mask(['sparkly', '']), 0)
+
+
+class OutfitStatsTests(APITestCase):
+    """Test wardrobe statistics"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/outfits/stats/'
+        Outfit.objects.create(user=self.user, name='Jeans', category='bottom', occasion='casual',
+                              season='all_season', times_worn=2)
+        Outfit.objects.create(user=self.user, name='Shirt', category='top', occasion='work',
+                              is_favorite=True, times_worn=7)
+        Outfit.objects.create(user=self.user, name='Chinos', category='bottom', occasion='work')
+
+    def expected_stats(self, most_worn):
+        return {
+            'total_outfits': 3,
+            'favorites_count': 1,
+            'by_category': {'top': 1, 'bottom': 2},
+            'by_occasion': {'casual': 1, 'work': 2},
+            'by_season': {'all_season': 1},
+            'most_worn': {'id': most_worn.id, 'name': 'Shirt', 'times_worn': 7},
+        }
+
+    def test_stats_use_a_single_aggregate(self):
+        """Test breakdowns come from one grouped query plus the most worn lookup (after the version stamp)"""
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, self.expected_stats(Outfit.objects.get(name='Shirt')))
+
+    @override_settings(WARDROBE_STATS_ENABLED=True)
+    def test_maintained_stats_follow_saves_and_deletes(self):
+        """Test the stats row is updated incrementally by signals"""
+        self.client.get(self.url)
+        self.assertTrue(WardrobeStats.objects.filter(user=self.user).exists())
+
+        shirt = Outfit.objects.get(name='Shirt')
+        chinos = Outfit.objects.get(name='Chinos')
+        chinos.category = 'top'
+        chinos.save()
+        Outfit.objects.create(user=self.user, name='Dress', category='dress', season='summer')
+        Outfit.objects.get(name='Dress').delete()
+        chinos.category = 'bottom'
+        chinos.save()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, self.expected_stats(shirt))
+        self.assertEqual(
+            WardrobeStats.objects.get(user=self.user).counts,
+            compute_wardrobe_counts(self.user)
+        )
+
+    @override_settings(WARDROBE_STATS_ENABLED=True)
+    def test_repair_command_fixes_drift(self):
+        """Test changes that bypass signals are repaired"""
+        self.client.get(self.url)
+        Outfit.objects.filter(user=self.user).update(is_favorite=True)
+
+        call_command('repair_wardrobe_stats', stdout=mock.MagicMock())
+        self.assertEqual(WardrobeStats.objects.get(user=self.user).counts['favorites'], 3)
+
+
+class OutfitCounterTests(APITestCase):
+    """Test atomic worn/favorite counters"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.outfit = Outfit.objects.create(user=self.user, name='Jeans', times_worn=4)
+        self.other = Outfit.objects.create(user=self.user, name='Shirt')
+
+    def test_mark_as_worn_increments_in_one_statement(self):
+        """Test the new value comes from one UPDATE, logged with its wear event"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/outfits/{self.outfit.id}/worn/')
+        self.assertEqual(response.data, {'id': self.outfit.id, 'times_worn': 5})
+        updates = [q['sql'] for q in queries if 'times_worn' in q['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(WearEvent.objects.filter(outfit=self.outfit).count(), 1)
+
+    def test_increment_does_not_rewrite_other_columns(self):
+        """Test a stale in-memory copy cannot clobber concurrent edits"""
+        stale = Outfit.objects.get(pk=self.outfit.pk)
+        Outfit.objects.filter(pk=self.outfit.pk).update(name='Renamed')
+
+        self.assertEqual(increment_times_worn(stale.pk, self.user), 5)
+        self.assertEqual(increment_times_worn(stale.pk, self.user, by=2), 7)
+        self.outfit.refresh_from_db()
+        self.assertEqual((self.outfit.name, self.outfit.times_worn), ('Renamed', 7))
+
+    def test_toggle_favorite_returns_new_value(self):
+        """Test toggling flips the flag atomically"""
+        url = f'/api/outfits/{self.outfit.id}/favorite/'
+        with self.assertNumQueries(1):
+            self.assertTrue(self.client.post(url).data['is_favorite'])
+        self.assertFalse(self.client.post(url).data['is_favorite'])
+
+    def test_counters_only_touch_own_outfits(self):
+        """Test other users' outfits are not found"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        theirs = Outfit.objects.create(user=stranger, name='Theirs')
+
+        self.assertEqual(self.client.post(f'/api/outfits/{theirs.id}/worn/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(f'/api/outfits/{theirs.id}/favorite/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    @override_settings(WARDROBE_STATS_ENABLED=True)
+    def test_toggle_favorite_keeps_maintained_stats(self):
+        """Test the stats row follows favorite toggles"""
+        self.client.get('/api/outfits/stats/')
+        self.client.post(f'/api/outfits/{self.outfit.id}/favorite/')
+        self.assertEqual(WardrobeStats.objects.get(user=self.user).counts['favorites'], 1)
+
+    @override_settings(OUTFIT_WORN_WRITE_BEHIND=True)
+    def test_write_behind_coalesces_increments(self):
+        """Test buffered increments are flushed in batched UPDATEs"""
+        for expected in (5, 6, 7):
+            response = self.client.post(f'/api/outfits/{self.outfit.id}/worn/')
+            self.assertEqual(response.data['times_worn'], expected)
+        self.client.post(f'/api/outfits/{self.other.id}/worn/')
+
+        self.outfit.refresh_from_db()
+        self.assertEqual(self.outfit.times_worn, 4)
+
+        self.assertFalse(WearEvent.objects.exists())
+
+        # One counter UPDATE per increment group, then the events in one INSERT
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(worn_buffer.flush(), 2)
+        sql = [q['sql'] for q in queries]
+        self.assertEqual(sum('UPDATE "outfits_outfit" ' in q for q in sql), 2)
+        self.assertEqual(sum('INTO "outfits_wearevent"' in q for q in sql), 1)
+
+        self.outfit.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.outfit.times_worn, self.other.times_worn), (7, 1))
+        self.assertEqual(WearEvent.objects.count(), 4)
+        self.assertEqual(OutfitWearDaily.objects.get(outfit=self.outfit).count, 3)
+        self.assertEqual(worn_buffer.flush(), 0)
+
+
+class WearHistoryTests(APITestCase):
+    """Test the wear event log and rollup-based analytics"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        long_ago = timezone.now() - timedelta(days=200)
+        self.jeans = Outfit.objects.create(user=self.user, name='Jeans')
+        self.coat = Outfit.objects.create(user=self.user, name='Coat')
+        self.new = Outfit.objects.create(user=self.user, name='New')
+        Outfit.objects.filter(pk__in=[self.jeans.pk, self.coat.pk]).update(uploaded_at=long_ago)
+
+    def wear(self, outfit, days_ago, times=1):
+        worn_at = timezone.now() - timedelta(days=days_ago)
+        record_wears([(outfit.id, self.user.id, worn_at)] * times)
+
+    def test_rollups_count_events_per_day(self):
+        """Test repeated wears on one day share a rollup row"""
+        self.wear(self.jeans, 0, times=2)
+        self.client.post(f'/api/outfits/{self.jeans.id}/worn/')
+        self.wear(self.jeans, 3)
+
+        self.assertEqual(WearEvent.objects.filter(outfit=self.jeans).count(), 4)
+        counts = dict(OutfitWearDaily.objects.filter(outfit=self.jeans).values_list('day', 'count'))
+        self.assertEqual(sorted(counts.values()), [1, 3])
+
+    def test_forgotten_outfits(self):
+        """Test outfits not worn within the window are listed, recent uploads are not"""
+        self.wear(self.jeans, 10)
+        self.wear(self.coat, 90)
+
+        response = self.client.get('/api/outfits/forgotten/?days=60')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([o['id'] for o in response.data['results']], [self.coat.id])
+
+        response = self.client.get('/api/outfits/forgotten/?days=5')
+        self.assertEqual({o['id'] for o in response.data['results']}, {self.jeans.id, self.coat.id})
+
+    def test_wear_trend(self):
+        """Test daily totals and most worn outfits over the window"""
+        self.wear(self.jeans, 0, times=2)
+        self.wear(self.coat, 1)
+        self.wear(self.coat, 40)
+
+        response = self.client.get('/api/outfits/wear-trend/?days=7')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(len(response.data['daily']), 7)
+        self.assertEqual([d['count'] for d in response.data['daily'][-2:]], [1, 2])
+        self.assertEqual(
+            [(o['id'], o['count']) for o in response.data['most_worn']],
+            [(self.jeans.id, 2), (self.coat.id, 1)]
+        )
+
+    def test_invalid_days(self):
+        """Test out-of-range windows are rejected"""
+        self.assertEqual(self.client.get('/api/outfits/wear-trend/?days=0').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/outfits/forgotten/?days=abc').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command_restores_rollups(self):
+        """Test rollups can be rebuilt from the event log"""
+        self.wear(self.jeans, 0, times=2)
+        self.wear(self.coat, 5)
+        OutfitWearDaily.objects.filter(outfit=self.jeans).update(count=99)
+        OutfitWearDaily.objects.filter(outfit=self.coat).delete()
+
+        call_command('rebuild_wear_rollups', stdout=StringIO())
+        self.assertEqual(
+            sorted(OutfitWearDaily.objects.values_list('outfit_id', 'count')),
+            sorted([(self.jeans.id, 2), (self.coat.id, 1)])
+        )
+
+
+class OutfitSearchTests(APITestCase):
+    """Test indexed wardrobe search"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.jacket = Outfit.objects.create(user=self.user, name='Denim Jacket', brand="Levi's", color='Blue')
+        self.shirt = Outfit.objects.create(user=self.user, name='Linen Shirt', color='White',
+                                           description='Pairs well with a denim jacket')
+        self.dress = Outfit.objects.create(user=self.user, name='Summer Dress', color='Yellow')
+
+    def search(self, query, **params):
+        response = self.client.get('/api/outfits/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [o['id'] for o in response.data['results']]
+
+    def test_exact_matches_ranked_by_field(self):
+        """Test a name match ranks above a description match"""
+        self.assertEqual(self.search('denim jacket'), [self.jacket.id, self.shirt.id])
+
+    def test_prefix_and_typo_matching(self):
+        """Test search-as-you-type prefixes and misspellings match"""
+        self.assertEqual(self.search('summ'), [self.dress.id])
+        self.assertEqual(self.search('jaket'), [self.jacket.id, self.shirt.id])
+        self.assertEqual(self.search('denim yellow'), [])
+
+    def test_trigrams_only_for_unmatched_words(self):
+        """Test words with exact or prefix hits skip the trigram postings"""
+        with CaptureQueriesContext(connection) as queries:
+            search_outfit_ids('denim jac', user=self.user)
+        self.assertEqual(len(queries), 1)
+
+        with mock.patch('outfits.search.MAX_GRAM_POSTINGS', 1), \
+                CaptureQueriesContext(connection) as queries:
+            ids = search_outfit_ids('jaket', user=self.user)
+        # One query per trigram except the padded leading one, each capped
+        self.assertEqual(len(queries), 1 + len(trigrams('jaket')) - 1)
+        self.assertTrue(all('LIMIT 1' in q['sql'] for q in queries[1:]))
+        self.assertEqual(ids, [self.shirt.id])
+
+    def test_terms_fold_case_and_accents(self):
+        """Test spellings a case- and accent-insensitive collation equates index as one term"""
+        cafe = Outfit.objects.create(user=self.user, name='Café Cafe CAFÉ', description='Straße strasse')
+        self.assertEqual(self.search('cafe'), [cafe.id])
+        self.assertEqual(self.search('CAFÉ'), [cafe.id])
+        self.assertEqual(self.search('strasse'), [cafe.id])
+        self.assertEqual(self.search('straße'), [cafe.id])
+
+    def test_index_follows_saves(self):
+        """Test renaming, publishing and deleting update the index"""
+        self.dress.name = 'Evening Gown'
+        self.dress.save()
+        self.assertEqual(self.search('summer'), [])
+        self.assertEqual(self.search('gown'), [self.dress.id])
+
+        self.assertEqual(self.search('gown', scope='public'), [])
+        self.dress.is_public = True
+        self.dress.save(update_fields=['is_public'])
+        self.assertEqual(self.search('gown', scope='public'), [self.dress.id])
+
+        self.dress.delete()
+        self.assertEqual(self.search('gown'), [])
+
+    def test_scopes_do_not_leak_private_outfits(self):
+        """Test other users' outfits are only found when public"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        Outfit.objects.create(user=stranger, name='Private Jacket')
+        public = Outfit.objects.create(user=stranger, name='Public Jacket', is_public=True)
+
+        self.assertNotIn(public.id, self.search('jacket'))
+        self.assertEqual(self.search('jacket', scope='public'), [public.id])
+
+    def test_list_search_uses_the_index(self):
+        """Test the list endpoint's search parameter avoids LIKE scans"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/outfits/?search=denim')
+        self.assertEqual([o['id'] for o in response.data['results']], [self.jacket.id, self.shirt.id])
+        self.assertFalse(any('LIKE' in q['sql'] for q in queries))
+
+        response = self.client.get('/api/outfits/?search=denim&ordering=name')
+        self.assertEqual([o['id'] for o in response.data['results']], [self.jacket.id, self.shirt.id])
+
+    def test_rebuild_command(self):
+        """Test the index can be rebuilt after bypassing signals"""
+        Outfit.objects.filter(pk=self.dress.pk).update(name='Maxi Dress')
+        self.assertEqual(self.search('maxi'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('maxi'), [self.dress.id])
+
+
+class OutfitCursorPaginationTests(APITestCase):
+    """Test opt-in keyset pagination of outfit lists"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.outfits = [Outfit.objects.create(user=self.user, name=f'Outfit {i}') for i in range(45)]
+        # Several outfits share a timestamp so the id tie-breaker matters
+        same_time = timezone.now()
+        Outfit.objects.filter(pk__in=[o.pk for o in self.outfits[10:30]]).update(uploaded_at=same_time)
+
+    def collect(self, url):
+        ids, pages = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in q['sql'] or 'OFFSET' in q['sql'] for q in queries))
+            ids.extend(o['id'] for o in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_cursor_walks_every_outfit_once(self):
+        """Test cursor pages cover the list in order without COUNT or OFFSET"""
+        ids, pages = self.collect('/api/outfits/?cursor=')
+        expected = list(Outfit.objects.filter(user=self.user).order_by('-uploaded_at', '-id')
+                        .values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_cursor_keeps_filters(self):
+        """Test filters apply in cursor mode"""
+        Outfit.objects.filter(pk__in=[o.pk for o in self.outfits[::2]]).update(is_favorite=True)
+        ids, _ = self.collect('/api/outfits/favorites/?cursor=')
+        self.assertEqual(sorted(ids), [o.id for o in self.outfits[::2]])
+
+    def test_page_numbers_remain_the_default(self):
+        """Test requests without a cursor keep the page-number response"""
+        response = self.client.get('/api/outfits/?page=2')
+        self.assertEqual(response.data['count'], 45)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is a 404 like an invalid page"""
+        response = self.client.get('/api/outfits/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_rejects_reordering(self):
+        """Test ordering or relevance-ranked search with a cursor is a 400, not a silent reorder"""
+        for params in ('ordering=name', 'search=outfit'):
+            with self.subTest(params=params):
+                response = self.client.get(f'/api/outfits/?cursor=&{params}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('cursor', response.data)
+        self.assertEqual(self.client.get('/api/outfits/?cursor=&ordering=').status_code, status.HTTP_200_OK)
+
+
+class OutfitSparseFieldsTests(APITestCase):
+    """Test the slim list representation and sparse fieldsets"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.outfit = Outfit.objects.create(user=self.user, name='Jeans', category='bottom',
+                                            description='Long text ' * 50, brand='Levi', is_favorite=True)
+
+    def test_lists_use_slim_representation(self):
+        """Test list endpoints render only the grid fields"""
+        for url in ('/api/outfits/', '/api/outfits/favorites/'):
+            item = self.client.get(url).data['results'][0]
+            self.assertEqual(set(item), set(OutfitListSerializer.Meta.fields))
+
+        detail = self.client.get(f'/api/outfits/{self.outfit.id}/').data
+        self.assertIn('description', detail)
+        self.assertIn('tags', detail)
+
+    def test_fields_and_omit(self):
+        """Test clients can narrow the representation"""
+        item = self.client.get('/api/outfits/?fields=id,name,unknown').data['results'][0]
+        self.assertEqual(item, {'id': self.outfit.id, 'name': 'Jeans'})
+
+        item = self.client.get('/api/outfits/?omit=image,thumbnail').data['results'][0]
+        self.assertNotIn('image', item)
+        self.assertIn('category', item)
+
+        detail = self.client.get(f'/api/outfits/{self.outfit.id}/?fields=id,brand').data
+        self.assertEqual(detail, {'id': self.outfit.id, 'brand': 'Levi'})
+
+    def test_list_loads_only_rendered_columns(self):
+        """Test the list query does not transfer unused columns"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/outfits/?fields=id,name')
+        select = queries[-1]['sql']
+        self.assertIn('"name"', select)
+        self.assertNotIn('"description"', select)
+        self.assertNotIn('"image"', select)
+
+    def test_fields_do_not_affect_writes(self):
+        """Test a fields parameter does not drop submitted values"""
+        response = self.client.patch(f'/api/outfits/{self.outfit.id}/?fields=id', {'brand': 'Lee'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('description', response.data)
+        self.outfit.refresh_from_db()
+        self.assertEqual(self.outfit.brand, 'Lee')
+
+
+class OutfitRepresentationTests(APITestCase):
+    """Test the values-based fast path renders exactly like OutfitSerializer"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.full = Outfit.objects.create(
+            user=self.user, name='Blazer', description='Navy', image='outfits/blazer.jpg',
+            thumbnail='outfits/thumbnails/blazer.jpg', category='outerwear', occasion='work',
+            brand='Zara', color='Navy', season='fall', outfit_chest=Decimal('101.5'),
+            outfit_waist=Decimal('88'), is_favorite=True, times_worn=3
+        )
+        self.bare = Outfit.objects.create(user=self.user, name='Plain tee')
+        OutfitTag.objects.create(outfit=self.full, tag='office')
+        OutfitTag.objects.create(outfit=self.full, tag='smart')
+
+    def expected(self, outfits):
+        return JSONRenderer().render(OutfitSerializer(outfits, many=True).data)
+
+    def test_values_rows_match_serializer(self):
+        """Test rendering from .values() is byte-identical to the serializer"""
+        ids = [self.bare.id, self.full.id]
+        with self.assertNumQueries(2):
+            rendered = represent_outfits(ids)
+        outfits = [Outfit.objects.get(pk=pk) for pk in ids]
+        self.assertEqual(JSONRenderer().render(rendered), self.expected(outfits))
+
+    def test_loaded_instances_match_serializer(self):
+        """Test rendering loaded instances needs only the tag lookup"""
+        outfits = list(Outfit.objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            rendered = represent_instances(outfits)
+        self.assertEqual(JSONRenderer().render(rendered), self.expected(outfits))
+
+    def test_deferred_instances_match_serializer(self):
+        """Test instances loaded with .only()/.defer() render without KeyError"""
+        deferred = list(Outfit.objects.defer('description', 'thumbnail').order_by('pk'))
+        partial = list(Outfit.objects.only('id', 'name').order_by('pk'))
+        expected = self.expected(list(Outfit.objects.order_by('pk')))
+        self.assertEqual(JSONRenderer().render(represent_instances(deferred)), expected)
+        self.assertEqual(JSONRenderer().render(represent_instances(partial)), expected)
+
+    def test_missing_ids_are_skipped(self):
+        """Test ids outside the queryset are dropped"""
+        rendered = represent_outfits([self.full.id, 999], Outfit.objects.filter(user=self.user))
+        self.assertEqual([item['id'] for item in rendered], [self.full.id])
+
+
+class OutfitTagTests(APITestCase):
+    """Test tag CRUD, tag filters and the tag cloud"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.jeans = Outfit.objects.create(user=self.user, name='Jeans')
+        self.shirt = Outfit.objects.create(user=self.user, name='Shirt')
+        self.dress = Outfit.objects.create(user=self.user, name='Dress')
+
+    def tag(self, outfit, *tags):
+        return self.client.post(f'/api/outfits/{outfit.id}/tags/', {'tags': list(tags)}, format='json')
+
+    def listed(self, query):
+        return {o['id'] for o in self.client.get(f'/api/outfits/?{query}').data['results']}
+
+    def test_add_list_and_remove_tags(self):
+        """Test tags are normalized, de-duplicated and removable"""
+        response = self.tag(self.jeans, ' Weekend ', 'weekend', 'Date  Night')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, [{'tag': 'weekend'}, {'tag': 'date night'}])
+
+        self.client.post(f'/api/outfits/{self.jeans.id}/tags/', {'tag': 'WEEKEND'}, format='json')
+        self.assertEqual(len(self.client.get(f'/api/outfits/{self.jeans.id}/tags/').data), 2)
+
+        response = self.client.delete(f'/api/outfits/{self.jeans.id}/tags/Date Night/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(f'/api/outfits/{self.jeans.id}/').data['tags'], [{'tag': 'weekend'}])
+
+    def test_invalid_and_foreign_tags(self):
+        """Test blank tags and other users' outfits are rejected"""
+        self.assertEqual(self.tag(self.jeans, '  ').status_code, status.HTTP_400_BAD_REQUEST)
+
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        theirs = Outfit.objects.create(user=stranger, name='Theirs')
+        self.assertEqual(self.tag(theirs, 'mine').status_code, status.HTTP_404_NOT_FOUND)
+        OutfitTag.objects.create(outfit=theirs, tag='keep')
+        self.assertEqual(self.client.delete(f'/api/outfits/{theirs.id}/tags/keep/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_filter_by_any_or_all_tags(self):
+        """Test ?tags= matches any tag by default and every tag with tag_match=all"""
+        self.tag(self.jeans, 'casual', 'denim')
+        self.tag(self.shirt, 'casual')
+        self.tag(self.dress, 'party')
+
+        self.assertEqual(self.listed('tags=denim,party'), {self.jeans.id, self.dress.id})
+        self.assertEqual(self.listed('tags=casual,denim&tag_match=all'), {self.jeans.id})
+        self.assertEqual(self.listed('tags=Casual'), {self.jeans.id, self.shirt.id})
+
+    def test_tag_cloud(self):
+        """Test tag counts come from one grouped query"""
+        self.tag(self.jeans, 'casual', 'denim')
+        self.tag(self.shirt, 'casual')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/outfits/tags/')
+        self.assertEqual(response.data['tags'], [{'tag': 'casual', 'count': 2}, {'tag': 'denim', 'count': 1}])
+
+    def test_tagging_marks_outfit_changed(self):
+        """Test tag changes bump the outfit's updated_at"""
+        before = self.jeans.updated_at
+        self.tag(self.jeans, 'new')
+        self.jeans.refresh_from_db()
+        self.assertGreater(self.jeans.updated_at, before)
+
+
+class OutfitConditionalGetTests(APITestCase):
+    """Test ETag/Last-Modified validators on the wardrobe list and stats"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/outfits/'
+        self.jeans = Outfit.objects.create(user=self.user, name='Jeans')
+        self.shirt = Outfit.objects.create(user=self.user, name='Shirt')
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def seconds_later(self, seconds=2):
+        """Advance the clock the validators see, closing the second of the latest change"""
+        now = time.time() + seconds
+        return mock.patch('common.conditional.time.time', return_value=now)
+
+    def test_matching_etag_short_circuits(self):
+        """Test a matching If-None-Match returns 304 from the version stamp alone"""
+        for url in (self.url, '/api/outfits/stats/'):
+            with self.subTest(url=url), self.seconds_later():
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertIn('Last-Modified', response)
+                self.assertIn('Authorization', response['Vary'])
+                self.assertIn('no-cache', response['Cache-Control'])
+
+                with self.assertNumQueries(2):
+                    cached = self.revalidate(url, response['ETag'])
+                self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                self.assertEqual(cached.content, b'')
+
+    def test_changes_invalidate_etag(self):
+        """Test edits, counter updates, tagging, creation and deletion change the ETag"""
+        etag = self.client.get(self.url)['ETag']
+        changes = [
+            lambda: self.client.patch(f'/api/outfits/{self.jeans.id}/', {'name': 'Blue Jeans'}),
+            lambda: self.client.post(f'/api/outfits/{self.jeans.id}/worn/'),
+            lambda: self.client.post(f'/api/outfits/{self.shirt.id}/favorite/'),
+            lambda: self.client.post(f'/api/outfits/{self.shirt.id}/tags/', {'tag': 'work'}),
+            lambda: Outfit.objects.create(user=self.user, name='Dress'),
+            lambda: self.jeans.delete(),
+        ]
+        for change in changes:
+            time.sleep(0.001)
+            change()
+            response = self.revalidate(self.url, etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_query_strings_get_their_own_etags(self):
+        """Test different pages and filters of the list do not share an ETag"""
+        etag = self.client.get(self.url, {'page': 1})['ETag']
+        filtered = self.client.get(self.url, {'category': 'top'})
+        self.assertNotEqual(filtered['ETag'], etag)
+        self.assertEqual(self.revalidate(f'{self.url}?category=top', etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.revalidate(f'{self.url}?page=1', etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_new_media_url_bucket_changes_etag(self):
+        """Test cached lists are not revalidated past the expiry of the image URLs they embed"""
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch('time.time', return_value=time.time() + settings.MEDIA_URL_LIFETIME):
+            self.assertEqual(self.revalidate(self.url, etag).status_code, status.HTTP_200_OK)
+
+    def test_deletion_advances_last_modified(self):
+        """Test a deletion moves Last-Modified through its tombstone"""
+        Outfit.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        with self.seconds_later():
+            before = self.client.get(self.url)['Last-Modified']
+        self.shirt.delete()
+        with self.seconds_later(3):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=before)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['Last-Modified'], before)
+
+    def test_last_modified_waits_for_its_second_to_close(self):
+        """Test a change in the current second is validated by ETag only, then advertised rounded up"""
+        self.jeans.name = 'Blue Jeans'
+        self.jeans.save()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', response)
+
+        self.jeans.refresh_from_db()
+        with self.seconds_later():
+            response = self.client.get(self.url)
+            self.assertEqual(response['Last-Modified'], http_date(math.ceil(self.jeans.updated_at.timestamp())))
+            cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_is_per_user(self):
+        """Test another user's validators never match"""
+        etag = self.client.get(self.url)['ETag']
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.revalidate(self.url, etag).status_code, status.HTTP_200_OK)
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=2, IMAGE_PROCESSING_QUEUE=4)
+class OutfitImageProcessingTests(TransactionTestCase):
+    """Test background image processing"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        settings_override = self.settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, data=None, name='photo.jpg'):
+        if data is None:
+            file = BytesIO()
+            Image.new('RGB', (2400, 1600), 'teal').save(file, 'JPEG')
+            data = file.getvalue()
+        file = BytesIO(data)
+        file.name = name
+        return self.client.post('/api/outfits/', {'name': 'Coat', 'image': file}, format='multipart')
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media)
+            for root, _, names in os.walk(self.media) for name in names
+        )
+
+    def test_upload_returns_before_processing(self):
+        """Test the outfit is created as processing and finished by the pool"""
+        def slow_process(file):
+            time.sleep(0.5)
+            return process_image(file)
+
+        with mock.patch('outfits.processing.process_image', side_effect=slow_process):
+            started = time.monotonic()
+            response = self.upload()
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['processing_status'], Outfit.PROCESSING)
+            self.assertIsNone(response.data['thumbnail'])
+
+            status_url = f"/api/outfits/{response.data['id']}/processing/"
+            self.assertEqual(self.client.get(status_url)['Retry-After'], '1')
+            image_jobs.wait(timeout=10)
+
+        data = self.client.get(status_url).data
+        self.assertEqual(data['processing_status'], Outfit.READY)
+        outfit = Outfit.objects.get(pk=response.data['id'])
+        self.assertEqual(self.stored_files(), [outfit.image.name, outfit.thumbnail.name])
+        with outfit.image.open('rb') as f:
+            self.assertEqual(outfit.image_sha256, hashlib.sha256(f.read()).hexdigest())
+        with Image.open(outfit.image.path) as img:
+            self.assertEqual(img.size, (1920, 1280))
+        self.assertEqual((outfit.primary_color, outfit.detected_colors[0]['share']), ('teal', 1.0))
+        # List items carry the placeholder to show until the thumbnail loads
+        item = self.client.get('/api/outfits/').data['results'][0]
+        self.assertEqual(item['placeholder'], outfit.placeholder)
+        self.assertTrue(item['placeholder'].startswith('data:image/webp;base64,'))
+        self.assertEqual(outfit.color_mask, color_mask(['teal']))
+
+    def test_undecodable_upload_fails(self):
+        """Test an upload with a valid header but corrupt data ends as failed"""
+        file = BytesIO()
+        Image.effect_noise((400, 300), 50).save(file, 'JPEG')
+        response = self.upload(file.getvalue()[:2000])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        image_jobs.wait(timeout=10)
+        outfit = Outfit.objects.get(pk=response.data['id'])
+        self.assertEqual(outfit.processing_status, Outfit.FAILED)
+        self.assertTrue(outfit.processing_error.startswith('Invalid image file'))
+        self.assertEqual(self.stored_files(), [])
+
+    def test_invalid_header_is_rejected_in_request(self):
+        """Test uploads that are not images still fail synchronously"""
+        response = self.upload(b'not an image')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_replaced_image_is_not_overwritten(self):
+        """Test a job whose upload was replaced meanwhile discards its results"""
+        with self.settings(IMAGE_PROCESSING_WORKERS=0), mock.patch('outfits.processing.transaction.on_commit'):
+            response = self.upload()
+        outfit = Outfit.objects.get(pk=response.data['id'])
+        raw_name = outfit.image.name
+        Outfit.objects.filter(pk=outfit.pk).update(image='outfits/newer.jpg')
+
+        self.assertIsNone(process_stored_image(outfit.pk, raw_name))
+        self.assertEqual(self.stored_files(), [raw_name])
+
+    def test_duplicate_upload_shares_files(self):
+        """Test re-uploading a photo skips processing and shares the stored files"""
+        first = self.upload()
+        image_jobs.wait(timeout=10)
+        original = Outfit.objects.get(pk=first.data['id'])
+
+        with mock.patch('outfits.processing.process_image') as process:
+            second = self.upload(name='copy.jpg')
+        process.assert_not_called()
+        self.assertEqual(second.data['processing_status'], Outfit.READY)
+        duplicate = Outfit.objects.get(pk=second.data['id'])
+        self.assertEqual((duplicate.image.name, duplicate.thumbnail.name, duplicate.image_sha256),
+                         (original.image.name, original.thumbnail.name, original.image_sha256))
+        self.assertEqual(self.stored_files(), [original.image.name, original.thumbnail.name])
+        self.assertEqual(outfit_storage.references(original.image.name), 2)
+
+        # The files stay until the last outfit using them is deleted
+        self.client.delete(f'/api/outfits/{original.id}/')
+        self.assertEqual(self.stored_files(), [original.image.name, original.thumbnail.name])
+        self.client.delete(f'/api/outfits/{duplicate.id}/')
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_replaced_image_is_released(self):
+        """Test replacing an outfit image deletes the previous files"""
+        outfit_id = self.upload().data['id']
+        image_jobs.wait(timeout=10)
+        file = BytesIO()
+        Image.new('RGB', (800, 600), 'navy').save(file, 'JPEG')
+        file.name = 'new.jpg'
+        file.seek(0)
+        self.client.patch(f'/api/outfits/{outfit_id}/', {'image': file}, format='multipart')
+        image_jobs.wait(timeout=10)
+
+        outfit = Outfit.objects.get(pk=outfit_id)
+        self.assertEqual(self.stored_files(), sorted([outfit.image.name, outfit.thumbnail.name]))
+
+    def test_pending_command_finishes_stuck_uploads(self):
+        """Test uploads left processing by a restart are completed by the command"""
+        with mock.patch('outfits.processing.transaction.on_commit'):
+            response = self.upload()
+        Outfit.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+        out = StringIO()
+        call_command('process_pending_images', stdout=out)
+        self.assertIn('Processed 1 images (0 failed)', out.getvalue())
+        self.assertEqual(Outfit.objects.get(pk=response.data['id']).processing_status, Outfit.READY)
+
+
+class OutfitImageVariantTests(APITestCase):
+    """Test responsive image variants"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = os.path.join(directory.name, 'variants')
+        settings_override = self.settings(MEDIA_ROOT=directory.name, IMAGE_VARIANT_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        file = BytesIO()
+        Image.new('RGB', (1920, 1280), 'teal').save(file, 'JPEG')
+        self.outfit = Outfit.objects.create(user=self.user, name='Coat')
+        self.outfit.image.save('coat.jpg', SimpleUploadedFile('coat.jpg', file.getvalue()))
+        self.url = f'/api/outfits/{self.outfit.id}/image/'
+
+    def test_width_is_bucketed_and_cached(self):
+        """Test a variant is rendered once per bucket and format"""
+        with mock.patch.object(variants, 'render_variant', wraps=variants.render_variant) as render:
+            first = self.client.get(self.url + '500/', HTTP_ACCEPT='image/webp,*/*')
+            second = self.client.get(self.url + '600/', HTTP_ACCEPT='image/webp,*/*')
+            jpeg = self.client.get(self.url + '600/', {'fmt': 'jpeg'})
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual((first['Content-Type'], jpeg['Content-Type']), ('image/webp', 'image/jpeg'))
+        self.assertIn('Accept', first['Vary'])
+
+        with Image.open(BytesIO(b''.join(first.streaming_content))) as img:
+            self.assertEqual((img.format, img.size), ('WEBP', (600, 400)))
+        self.outfit.refresh_from_db()
+        self.assertEqual(sorted(os.listdir(self.cache_dir)),
+                         [f'{self.outfit.image_sha256}-600.jpg', f'{self.outfit.image_sha256}-600.webp'])
+
+    def test_content_addressed_urls_are_immutable(self):
+        """Test ?v=<image_sha256> responses are cacheable forever and ETags revalidate"""
+        # Images processed before hashing get their hash on first use
+        self.assertEqual(self.outfit.image_sha256, '')
+        self.client.get(self.url + '300/')
+        digest = self.client.get(f'/api/outfits/{self.outfit.id}/').data['image_sha256']
+        self.assertEqual(len(digest), 64)
+
+        response = self.client.get(self.url + '300/', {'v': digest})
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('no-cache', self.client.get(self.url + '300/', {'v': 'old'})['Cache-Control'])
+
+        with mock.patch.object(variants, 'open_variant') as open_variant:
+            cached = self.client.get(self.url + '300/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        open_variant.assert_not_called()
+
+    def test_access_rules(self):
+        """Test private outfits are hidden from other users and public ones are not"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(self.url + '300/').status_code, status.HTTP_404_NOT_FOUND)
+        Outfit.objects.filter(pk=self.outfit.pk).update(is_public=True)
+        self.assertEqual(self.client.get(self.url + '300/').status_code, status.HTTP_200_OK)
+
+    def test_unavailable_images(self):
+        """Test processing images and unknown formats are refused"""
+        self.assertEqual(self.client.get(self.url + '300/', {'fmt': 'gif'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        Outfit.objects.filter(pk=self.outfit.pk).update(processing_status=Outfit.PROCESSING)
+        response = self.client.get(self.url + '300/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class MediaServingTests(APITestCase):
+    """Test access-checked media serving"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = self.settings(MEDIA_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.content = bytes(range(256)) * 8
+        self.outfit = Outfit.objects.create(user=self.user, name='Coat')
+        self.outfit.image.save('coat.jpg', SimpleUploadedFile('coat.jpg', self.content))
+        self.url = f'/media/{self.outfit.image.name}'
+
+    def test_owner_gets_file(self):
+        """Test the owner can download their image with validators"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('private', response['Cache-Control'])
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_access_rules(self):
+        """Test private files are hidden from strangers unless the URL is signed"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+        # URLs handed out by the API are signed and work without credentials
+        self.client.force_authenticate(user=None)
+        signed = self.outfit.image.url
+        self.assertIn('sig=', signed)
+        self.assertEqual(self.client.get(signed).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url, {'sig': 'forged'}).status_code, status.HTTP_404_NOT_FOUND)
+
+        Outfit.objects.filter(pk=self.outfit.pk).update(is_public=True)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_signed_urls_expire(self):
+        """Test a URL handed out while an outfit was public stops working once it expires"""
+        self.outfit.is_public = True
+        self.outfit.save()
+        self.client.force_authenticate(user=None)
+        signed = self.outfit.image.url
+        response = self.client.get(signed)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Cached no longer than the URL is valid
+        max_age = int(re.search(r'max-age=(\d+)', response['Cache-Control']).group(1))
+        self.assertLessEqual(max_age, 2 * settings.MEDIA_URL_LIFETIME)
+        self.assertEqual(self.outfit.image.url, signed)
+
+        self.outfit.is_public = False
+        self.outfit.save()
+        later = time.time() + 2 * settings.MEDIA_URL_LIFETIME
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(self.client.get(signed).status_code, status.HTTP_404_NOT_FOUND)
+            self.client.force_authenticate(user=self.user)
+            self.assertEqual(self.client.get(signed).status_code, status.HTTP_200_OK)
+            self.assertNotEqual(self.outfit.image.url, signed)
+
+        self.client.force_authenticate(user=None)
+        extended = signed.replace('exp=', 'exp=9')
+        self.assertEqual(self.client.get(extended).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_byte_ranges(self):
+        """Test single byte ranges, suffix ranges and unsatisfiable ranges"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+        # A stale If-Range gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        """Test nginx is handed the transfer when configured"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.outfit.image.name}')
+        self.assertEqual(response.content, b'')
+
+
+class ImageSimilarityTests(APITestCase):
+    """Test perceptual-hash duplicate and similar photo search"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.addCleanup(hash_index.clear)
+        self.base = 0x0F0F_3C3C_A5A5_FF00
+        self.outfit = self.create(self.user, 'Coat', self.base)
+
+    def create(self, user, name, value, **fields):
+        return Outfit.objects.create(user=user, name=name, image=f'outfits/{name}.jpg',
+                                     image_dhash=to_signed(value), **fields)
+
+    def flip(self, bits):
+        """Base hash with the lowest ``bits`` bits inverted"""
+        return self.base ^ ((1 << bits) - 1)
+
+    def test_bk_tree_matches_linear_scan(self):
+        """Test BK-tree radius searches return exactly the hashes a scan finds"""
+        rng = np.random.RandomState(0)
+        values = [int(v) for v in rng.randint(0, 2 ** 63, size=500, dtype=np.int64)]
+        tree = BKTree()
+        for i, value in enumerate(values):
+            tree.add(to_signed(value), i)
+        for query in values[:20]:
+            for radius in (0, 6, 16):
+                expected = sorted((hamming(query, v), i) for i, v in enumerate(values) if hamming(query, v) <= radius)
+                self.assertEqual(sorted(tree.search(query, radius)), expected)
+
+    def test_duplicates(self):
+        """Test near-duplicates are found nearest first and other photos are not"""
+        close = self.create(self.user, 'Copy', self.flip(1))
+        closer = self.create(self.user, 'Same', self.base)
+        self.create(self.user, 'Similar', self.flip(10))
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        self.create(stranger, 'Theirs', self.base, is_public=True)
+
+        response = self.client.get(f'/api/outfits/{self.outfit.id}/duplicates/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(item['outfit']['id'], item['distance']) for item in response.data['duplicates']],
+                         [(closer.id, 0), (close.id, 1)])
+
+    def test_similar_in_public_catalog(self):
+        """Test the public scope searches other users' public outfits only"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        public = self.create(stranger, 'Public', self.flip(12), is_public=True)
+        self.create(stranger, 'Private', self.flip(2))
+        self.create(stranger, 'Far', self.flip(30), is_public=True)
+        self.create(self.user, 'Mine', self.base, is_public=True)
+
+        url = f'/api/outfits/{self.outfit.id}/similar/'
+        response = self.client.get(url, {'scope': 'public'})
+        self.assertEqual([(item['outfit']['id'], item['distance']) for item in response.data['similar_outfits']],
+                         [(public.id, 12)])
+        self.assertEqual(response.data['similar_outfits'][0]['similarity_score'], round(1 - 12 / 64, 3))
+        self.assertEqual(self.client.get(url, {'scope': 'everyone'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_changes(self):
+        """Test cached trees are rebuilt when outfits are added, hidden or deleted"""
+        url = f'/api/outfits/{self.outfit.id}/similar/'
+        self.assertEqual(self.client.get(url).data['similar_outfits'], [])
+        other = self.create(self.user, 'New', self.flip(3))
+        self.assertEqual(len(self.client.get(url).data['similar_outfits']), 1)
+        with mock.patch.object(BKTree, 'add') as add:
+            self.client.get(url)
+        add.assert_not_called()
+        other.delete()
+        self.assertEqual(self.client.get(url).data['similar_outfits'], [])
+
+    def test_unrelated_writes_keep_cached_trees(self):
+        """Test wear and favorite updates keep trees while publishing rebuilds the public one"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        theirs = self.create(stranger, 'Theirs', self.flip(2))
+        url = f'/api/outfits/{self.outfit.id}/similar/'
+        self.assertEqual(self.client.get(url, {'scope': 'public'}).data['similar_outfits'], [])
+        self.client.get(url)
+
+        theirs.times_worn = 5
+        theirs.save()
+        self.client.post(f'/api/outfits/{self.outfit.id}/favorite/')
+        self.client.post(f'/api/outfits/{self.outfit.id}/worn/')
+        with mock.patch.object(BKTree, 'add') as add, CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+            self.client.get(url, {'scope': 'public'})
+        add.assert_not_called()
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries))
+
+        theirs.is_public = True
+        theirs.save()
+        response = self.client.get(url, {'scope': 'public'})
+        self.assertEqual([item['outfit']['id'] for item in response.data['similar_outfits']], [theirs.id])
+
+    def test_unprocessed_images(self):
+        """Test outfits still processing are refused and legacy images are hashed on demand"""
+        Outfit.objects.filter(pk=self.outfit.pk).update(processing_status=Outfit.PROCESSING)
+        response = self.client.get(f'/api/outfits/{self.outfit.id}/duplicates/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            file = BytesIO()
+            Image.new('RGB', (300, 200), 'teal').save(file, 'JPEG')
+            legacy = Outfit.objects.create(user=self.user, name='Legacy')
+            legacy.image.save('legacy.jpg', SimpleUploadedFile('legacy.jpg', file.getvalue()))
+            self.assertEqual(self.client.get(f'/api/outfits/{legacy.id}/duplicates/').status_code,
+                             status.HTTP_200_OK)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.image_dhash, 0)
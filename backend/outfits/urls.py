@@ -2,17 +2,37 @@ from django.urls import path
 from .views import (
     OutfitListCreateView, 
     OutfitDetailView,
+    OutfitProcessingView,
+    OutfitImageVariantView,
+    DuplicateOutfitsView,
+    VisuallySimilarOutfitsView,
     FavoriteOutfitsView,
     ToggleFavoriteView,
     MarkAsWornView,
-    OutfitStatsView
+    OutfitStatsView,
+    ForgottenOutfitsView,
+    WearTrendView,
+    OutfitSearchView,
+    OutfitTagsView,
+    OutfitTagDetailView,
+    TagCloudView
 )
 
 urlpatterns = [
     path('', OutfitListCreateView.as_view(), name='outfit-list-create'),
     path('favorites/', FavoriteOutfitsView.as_view(), name='outfit-favorites'),
+    path('search/', OutfitSearchView.as_view(), name='outfit-search'),
+    path('tags/', TagCloudView.as_view(), name='outfit-tag-cloud'),
     path('stats/', OutfitStatsView.as_view(), name='outfit-stats'),
+    path('forgotten/', ForgottenOutfitsView.as_view(), name='outfit-forgotten'),
+    path('wear-trend/', WearTrendView.as_view(), name='outfit-wear-trend'),
     path('<int:pk>/', OutfitDetailView.as_view(), name='outfit-detail'),
+    path('<int:pk>/processing/', OutfitProcessingView.as_view(), name='outfit-processing'),
+    path('<int:pk>/image/<int:width>/', OutfitImageVariantView.as_view(), name='outfit-image-variant'),
+    path('<int:pk>/duplicates/', DuplicateOutfitsView.as_view(), name='outfit-duplicates'),
+    path('<int:pk>/similar/', VisuallySimilarOutfitsView.as_view(), name='outfit-visually-similar'),
     path('<int:pk>/favorite/', ToggleFavoriteView.as_view(), name='outfit-toggle-favorite'),
     path('<int:pk>/worn/', MarkAsWornView.as_view(), name='outfit-mark-worn'),
+    path('<int:pk>/tags/', OutfitTagsView.as_view(), name='outfit-tags'),
+    path('<int:pk>/tags/<str:tag>/', OutfitTagDetailView.as_view(), name='outfit-tag-detail'),
 ]
\ No newline at end of file
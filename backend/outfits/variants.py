@@ -0,0 +1,110 @@
+"""
+Responsive outfit image variants.
+
+Clients ask for an outfit image at the width they display it. Widths are
+snapped up to a few buckets (``IMAGE_VARIANT_WIDTHS``) so every image has a
+handful of renditions, which are rendered from the processed image on first
+request and kept in a ``DiskLRUCache``. Cache files are named by the SHA-256
+of the source image, the width and the format, so identical images share
+variants, a new upload never hits a stale one and a variant's bytes never
+change: responses for a matching ``v=<image_sha256>`` are cacheable forever.
+Concurrent first requests for the same variant render it once.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from common.singleflight import SingleFlight
+from common.utils.disk_cache import DiskLRUCache
+from common.utils.image_processing import render_variant
+from .models import Outfit
+
+# format name -> (Pillow format, content type, file extension)
+FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+    'webp': ('WEBP', 'image/webp', 'webp'),
+}
+
+variant_flight = SingleFlight()
+_caches = {}
+
+
+def get_cache():
+    key = (settings.IMAGE_VARIANT_CACHE_DIR, settings.IMAGE_VARIANT_CACHE_MAX_BYTES)
+    if key not in _caches:
+        _caches[key] = DiskLRUCache(*key)
+    return _caches[key]
+
+
+def snap_width(width):
+    """Smallest bucket at least ``width`` wide (the largest bucket for anything wider)"""
+    buckets = sorted(settings.IMAGE_VARIANT_WIDTHS)
+    return next((bucket for bucket in buckets if bucket >= width), buckets[-1])
+
+
+def choose_format(requested, accept):
+    """
+    Variant format from ``?fmt=`` or, without it, the ``Accept`` header.
+
+    (``?format=`` is taken by DRF's renderer override.)
+
+    Returns:
+        str or None: Key of ``FORMATS``, or None for an unknown requested format
+    """
+    if requested:
+        requested = requested.lower()
+        return requested if requested in FORMATS else None
+    return 'webp' if 'image/webp' in accept else 'jpeg'
+
+
+def file_sha256(file, chunk_size=65536):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ensure_image_sha256(outfit):
+    """Hash of the outfit's image, computed and stored for images processed before hashing existed"""
+    if not outfit.image_sha256:
+        with outfit.image.open('rb') as f:
+            outfit.image_sha256 = file_sha256(f)
+        Outfit.objects.filter(pk=outfit.pk, image=outfit.image.name).update(
+            image_sha256=outfit.image_sha256, updated_at=timezone.now()
+        )
+    return outfit.image_sha256
+
+
+def variant_key(digest, width, image_format):
+    return f'{digest}-{width}.{FORMATS[image_format][2]}'
+
+
+def open_variant(outfit, width, image_format):
+    """
+    Open a cached variant, rendering it first if needed.
+
+    Args:
+        outfit: Outfit with a processed image
+        width: Bucketed width
+        image_format: Key of ``FORMATS``
+
+    Returns:
+        file: Variant opened in binary mode
+    """
+    cache = get_cache()
+    key = variant_key(ensure_image_sha256(outfit), width, image_format)
+
+    def render():
+        path = cache.get(key)
+        if path is None:
+            with outfit.image.open('rb') as source:
+                path = cache.put(key, render_variant(source, width, FORMATS[image_format][0]))
+        return path
+
+    path = cache.get(key) or variant_flight.do(('variant', key), render)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        # Evicted between lookup and open
+        return open(variant_flight.do(('variant', key), render), 'rb')
@@ -1,22 +1,127 @@
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+
 from rest_framework import generics, status, filters, serializers
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q, Count
-from .models import Outfit
-from .serializers import OutfitSerializer
-from common.utils.image_processing import process_outfit_image
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Q, Count, Max, Value
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from .models import Outfit, OutfitTag
+from .serializers import (
+    OutfitListSerializer, OutfitProcessingSerializer, OutfitSerializer, OutfitTagSerializer
+)
+from .stats import (
+    apply_stats_delta, build_stats_response, compute_wardrobe_counts, get_wardrobe_counts,
+    most_worn_outfit
+)
+from .colors import detected_color_fields
+from .counters import increment_times_worn, toggle_favorite, worn_buffer
+from .processing import release_images, reuse_processed_image, schedule_image_processing
+from .storage import content_sha256
+from .variants import (
+    FORMATS as VARIANT_FORMATS, choose_format, ensure_image_sha256, open_variant, snap_width, variant_key
+)
+from .filters import OutfitSearchFilter
+from .representations import represent_outfits
+from .search import order_by_ids, search_outfit_ids
+from .similarity import HASH_BITS, NEAR_DUPLICATE_DISTANCE, SIMILAR_DISTANCE, find_similar
+from .tags import filter_by_tags, normalize_tag, parse_tags, tag_cloud
+from .wear import forgotten_outfits, record_wears, wear_trend
+from common.utils.image_processing import validate_image
+from common.conditional import conditional_get
+from common.media import MEDIA_MAX_AGE, media_url_bucket, serve_file, verify_media_signature
+from common.pagination import KeysetOrPageNumberPagination
+from common.serializers import sparse_field_names
+from common.singleflight import SingleFlight
+from sync.models import Tombstone
+
+stats_flight = SingleFlight()
+
+
+def slim_outfits(queryset, request):
+    """Load only the columns the slim list representation renders (plus the pagination keys)"""
+    names = sparse_field_names(request, OutfitListSerializer.Meta.fields)
+    return queryset.only('id', 'uploaded_at', *names)
+
+
+def wardrobe_version(request):
+    """
+    Version stamp of the user's outfits for conditional GET.
+
+    Saves and counter updates bump ``updated_at`` (an insert always raises the
+    latest one) and deletions leave tombstones, so the pair of latest
+    timestamps changes with any edit, addition or deletion. Both are single
+    lookups on the (user, updated_at) and (user_id, deleted_at) indexes.
+
+    Returns:
+        tuple: (stamp, last modified datetime or None)
+    """
+    latest = Outfit.objects.filter(user=request.user).aggregate(latest=Max('updated_at'))['latest']
+    deleted = Tombstone.objects.filter(
+        user_id=request.user.id, kind=Tombstone.OUTFIT
+    ).aggregate(latest=Max('deleted_at'))['latest']
+    # Responses embed signed image URLs, which change with their expiry bucket
+    bucket = datetime.fromtimestamp(media_url_bucket(), tz=dt_timezone.utc)
+    return (latest, deleted, bucket), max(filter(None, (latest, deleted, bucket)))
+
+
+def save_uploaded_image(serializer, image, **fields):
+    """
+    Save an outfit with a new image upload.
+    
+    The upload is validated from its header. A re-upload of an image the user
+    already has shares its processed files; anything else is stored as
+    received and compressed and thumbnailed in the background.
+    
+    Returns:
+        Outfit: The saved outfit
+    """
+    is_valid, error = validate_image(image)
+    if not is_valid:
+        raise serializers.ValidationError({'image': error})
+    
+    source_sha256 = content_sha256(image)
+    with transaction.atomic():
+        reused = reuse_processed_image(serializer.context['request'].user.id, source_sha256)
+        if reused is not None:
+            return serializer.save(source_sha256=source_sha256, **reused, **fields)
+        
+        outfit = serializer.save(image=image, thumbnail=None, image_sha256='', image_dhash=None,
+                                 source_sha256=source_sha256, placeholder='', **detected_color_fields([]),
+                                 processing_status=Outfit.PROCESSING, processing_error='', **fields)
+        schedule_image_processing(outfit)
+    return outfit
 
 
 class OutfitListCreateView(generics.ListCreateAPIView):
     serializer_class = OutfitSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description', 'brand', 'color']
+    pagination_class = KeysetOrPageNumberPagination
+    cursor_ordering = ('-uploaded_at', '-id')
+    filter_backends = [filters.OrderingFilter, OutfitSearchFilter]
     ordering_fields = ['uploaded_at', 'name', 'times_worn']
     ordering = ['-uploaded_at']
     
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return OutfitListSerializer
+        return OutfitSerializer
+    
+    @conditional_get(wardrobe_version)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+    
     def get_queryset(self):
-        queryset = Outfit.objects.filter(user=self.request.user)
+        queryset = slim_outfits(Outfit.objects.filter(user=self.request.user), self.request)
         
         # Filter by category
         category = self.request.query_params.get('category', None)
@@ -36,7 +141,14 @@ class OutfitListCreateView(generics.ListCreateAPIView):
         # Filter favorites
         is_favorite = self.request.query_params.get('is_favorite', None)
         if is_favorite is not None:
-            queryset = queryset.filter(is_favorite=is_favorite.lower() == 'true')
+            # Compared to a value (not a bare boolean) so the favorites index is seeked
+            queryset = queryset.filter(is_favorite=Value(is_favorite.lower() == 'true'))
+        
+        # Filter by tags (any of them, or all with tag_match=all)
+        tags = parse_tags(self.request.query_params.get('tags'))
+        if tags:
+            match_all = self.request.query_params.get('tag_match', 'any') == 'all'
+            queryset = filter_by_tags(queryset, tags, match_all)
         
         return queryset
     
@@ -45,18 +157,7 @@ class OutfitListCreateView(generics.ListCreateAPIView):
         image = self.request.FILES.get('image')
         
         if image:
-            # Process image (validate, compress, create thumbnail)
-            compressed_image, thumbnail, error = process_outfit_image(image)
-            
-            if error:
-                raise serializers.ValidationError({'image': error})
-            
-            # Save with processed images
-            serializer.save(
-                user=self.request.user,
-                image=compressed_image,
-                thumbnail=thumbnail
-            )
+            save_uploaded_image(serializer, image, user=self.request.user)
         else:
             serializer.save(user=self.request.user)
 
@@ -65,114 +166,387 @@ class OutfitDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = OutfitSerializer
     
     def get_queryset(self):
-        return Outfit.objects.filter(user=self.request.user)
+        return Outfit.objects.filter(user=self.request.user).prefetch_related('tags')
     
     def perform_update(self, serializer):
         # Check if image is being updated
         image = self.request.FILES.get('image')
         
         if image:
-            # Process new image
-            compressed_image, thumbnail, error = process_outfit_image(image)
-            
-            if error:
-                raise serializers.ValidationError({'image': error})
-            
-            serializer.save(image=compressed_image, thumbnail=thumbnail)
+            previous = (serializer.instance.image.name, serializer.instance.thumbnail.name)
+            save_uploaded_image(serializer, image)
+            release_images(*previous)
         else:
             serializer.save()
 
 
+class OutfitProcessingView(APIView):
+    """Get the image processing status of an outfit (poll until it is no longer processing)"""
+    
+    def get(self, request, pk):
+        outfit = Outfit.objects.filter(pk=pk, user=request.user).only(
+            'id', 'processing_status', 'processing_error', 'image', 'thumbnail'
+        ).first()
+        if outfit is None:
+            return Response(
+                {'error': 'Outfit not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response = Response(OutfitProcessingSerializer(outfit, context={'request': request}).data)
+        if outfit.processing_status == Outfit.PROCESSING:
+            response['Retry-After'] = '1'
+        return response
+
+
+class OutfitImageVariantView(APIView):
+    """Get an outfit image resized to a width bucket, as JPEG or WebP"""
+    
+    def get(self, request, pk, width):
+        outfit = Outfit.objects.filter(
+            Q(user=request.user) | Q(is_public=True), pk=pk
+        ).only('id', 'image', 'image_sha256', 'processing_status').first()
+        if outfit is None or not outfit.image:
+            return Response(
+                {'error': 'Outfit not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if outfit.processing_status != Outfit.READY:
+            return Response(
+                {'error': 'Outfit image is not available yet'},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': '1'}
+            )
+        
+        image_format = choose_format(request.query_params.get('fmt'), request.META.get('HTTP_ACCEPT', ''))
+        if image_format is None:
+            return Response(
+                {'error': f"fmt must be one of: {', '.join(VARIANT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        width = snap_width(width)
+        etag = f'"{variant_key(ensure_image_sha256(outfit), width, image_format)}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(open_variant(outfit, width, image_format),
+                                    content_type=VARIANT_FORMATS[image_format][1])
+        response['ETag'] = etag
+        
+        if request.query_params.get('v') == outfit.image_sha256:
+            # Content-addressed URL: the bytes behind it never change
+            patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+
+def get_hashable_outfit(request, pk):
+    """
+    The user's outfit with a processed image, for photo similarity queries.
+    
+    Returns:
+        tuple: (outfit, None) or (None, error response)
+    """
+    outfit = Outfit.objects.filter(pk=pk, user=request.user).only(
+        'id', 'user_id', 'image', 'thumbnail', 'image_dhash', 'processing_status'
+    ).first()
+    if outfit is None or not outfit.image:
+        return None, Response(
+            {'error': 'Outfit not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if outfit.processing_status != Outfit.READY:
+        return None, Response(
+            {'error': 'Outfit image is not available yet'},
+            status=status.HTTP_409_CONFLICT,
+            headers={'Retry-After': '1'}
+        )
+    return outfit, None
+
+
+def get_limit_param(request, default=10, maximum=50):
+    try:
+        return max(1, min(int(request.query_params.get('limit', default)), maximum))
+    except ValueError:
+        return default
+
+
+class DuplicateOutfitsView(APIView):
+    """Get the user's outfits whose photos are near-duplicates of an outfit's photo"""
+    
+    def get(self, request, pk):
+        outfit, error = get_hashable_outfit(request, pk)
+        if error is not None:
+            return error
+        
+        matches = find_similar(outfit, NEAR_DUPLICATE_DISTANCE, limit=get_limit_param(request))
+        distances = {outfit_id: distance for distance, outfit_id in matches}
+        outfits = represent_outfits([outfit_id for _, outfit_id in matches])
+        return Response({'duplicates': [
+            {'outfit': data, 'distance': distances[data['id']]} for data in outfits
+        ]})
+
+
+class VisuallySimilarOutfitsView(APIView):
+    """Get outfits whose photos look like an outfit's photo, from the wardrobe or the public catalog"""
+    
+    def get(self, request, pk):
+        outfit, error = get_hashable_outfit(request, pk)
+        if error is not None:
+            return error
+        
+        scope = request.query_params.get('scope', 'wardrobe')
+        if scope not in ('wardrobe', 'public'):
+            return Response(
+                {'error': 'scope must be one of: wardrobe, public'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        matches = find_similar(outfit, SIMILAR_DISTANCE, public=scope == 'public',
+                               limit=get_limit_param(request))
+        distances = {outfit_id: distance for distance, outfit_id in matches}
+        outfits = represent_outfits(
+            [outfit_id for _, outfit_id in matches],
+            Outfit.objects.filter(is_public=True) if scope == 'public' else Outfit.objects.filter(user=request.user)
+        )
+        return Response({'similar_outfits': [
+            {
+                'outfit': data,
+                'distance': distances[data['id']],
+                'similarity_score': round(1 - distances[data['id']] / HASH_BITS, 3),
+            }
+            for data in outfits
+        ]})
+
+
+def can_view_media(user, name):
+    """Whether ``user`` may load a media file: an image of their own or a public outfit, or their profile picture"""
+    outfits = Outfit.objects.filter(Q(image=name) | Q(thumbnail=name))
+    if not user.is_authenticated:
+        return outfits.filter(is_public=True).exists()
+    if user.profile_picture and user.profile_picture.name == name:
+        return True
+    return outfits.filter(Q(user=user) | Q(is_public=True)).exists()
+
+
+class MediaView(APIView):
+    """
+    Serve an uploaded file.
+    
+    Signed URLs (as returned by the API) are served as is until they expire,
+    and cached no longer than that; otherwise the file must belong to the
+    user or to a public outfit. Files are streamed with
+    sendfile (or X-Accel-Redirect) and support Range and conditional requests.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, path):
+        not_found = Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            full_path = default_storage.path(path)
+        except SuspiciousFileOperation:
+            return not_found
+        
+        expires = verify_media_signature(path, request.query_params.get('exp'), request.query_params.get('sig'))
+        if expires is None and not can_view_media(request.user, path):
+            return not_found
+        if not os.path.isfile(full_path):
+            return not_found
+        max_age = MEDIA_MAX_AGE if expires is None else min(MEDIA_MAX_AGE, expires - int(time.time()))
+        return serve_file(request, full_path, path, max_age=max_age)
+
+
 class FavoriteOutfitsView(generics.ListAPIView):
     """List all favorite outfits"""
-    serializer_class = OutfitSerializer
+    serializer_class = OutfitListSerializer
+    pagination_class = KeysetOrPageNumberPagination
+    cursor_ordering = ('-uploaded_at', '-id')
     
     def get_queryset(self):
-        return Outfit.objects.filter(user=self.request.user, is_favorite=True)
+        return slim_outfits(Outfit.objects.filter(user=self.request.user, is_favorite=Value(True)), self.request)
 
 
 class ToggleFavoriteView(APIView):
     """Toggle favorite status of an outfit"""
     
     def post(self, request, pk):
-        try:
-            outfit = Outfit.objects.get(pk=pk, user=request.user)
-            outfit.is_favorite = not outfit.is_favorite
-            outfit.save()
-            
-            return Response({
-                'id': outfit.id,
-                'is_favorite': outfit.is_favorite
-            }, status=status.HTTP_200_OK)
-        except Outfit.DoesNotExist:
+        is_favorite = toggle_favorite(pk, request.user)
+        if is_favorite is None:
             return Response(
                 {'error': 'Outfit not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # The UPDATE bypasses signals, so adjust maintained stats directly
+        if settings.WARDROBE_STATS_ENABLED:
+            change = {'added': ['favorites']} if is_favorite else {'removed': ['favorites']}
+            apply_stats_delta(request.user.id, **change)
+        
+        return Response({
+            'id': pk,
+            'is_favorite': is_favorite
+        }, status=status.HTTP_200_OK)
 
 
 class MarkAsWornView(APIView):
-    """Mark outfit as worn (increment counter)"""
+    """Mark outfit as worn (increment counter and log a wear event)"""
     
     def post(self, request, pk):
-        try:
-            outfit = Outfit.objects.get(pk=pk, user=request.user)
-            outfit.times_worn += 1
-            outfit.save()
-            
-            return Response({
-                'id': outfit.id,
-                'times_worn': outfit.times_worn
-            }, status=status.HTTP_200_OK)
-        except Outfit.DoesNotExist:
+        if settings.OUTFIT_WORN_WRITE_BEHIND:
+            # Buffer the tap; the response includes not yet flushed taps
+            stored = Outfit.objects.filter(pk=pk, user=request.user).values_list('times_worn', flat=True).first()
+            if stored is not None:
+                worn_buffer.add(pk, request.user.id)
+                times_worn = stored + worn_buffer.pending(pk)
+            else:
+                times_worn = None
+        else:
+            with transaction.atomic():
+                times_worn = increment_times_worn(pk, request.user)
+                if times_worn is not None:
+                    record_wears([(pk, request.user.id, timezone.now())])
+        
+        if times_worn is None:
             return Response(
                 {'error': 'Outfit not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        return Response({
+            'id': pk,
+            'times_worn': times_worn
+        }, status=status.HTTP_200_OK)
+
+
+def get_days_param(request, default):
+    """Parse the ``days`` window of wear analytics endpoints"""
+    try:
+        days = int(request.query_params.get('days', default))
+    except ValueError:
+        raise serializers.ValidationError({'days': 'Must be an integer.'})
+    if not 1 <= days <= settings.WEAR_ANALYTICS_MAX_DAYS:
+        raise serializers.ValidationError(
+            {'days': f'Must be between 1 and {settings.WEAR_ANALYTICS_MAX_DAYS}.'}
+        )
+    return days
+
+
+class ForgottenOutfitsView(generics.ListAPIView):
+    """List outfits not worn in the last ``days`` days (default 60)"""
+    serializer_class = OutfitListSerializer
+    
+    def get_queryset(self):
+        return slim_outfits(forgotten_outfits(self.request.user, get_days_param(self.request, 60)), self.request)
+
+
+class WearTrendView(APIView):
+    """Get daily wear counts and most worn outfits over the last ``days`` days (default 30)"""
+    
+    def get(self, request):
+        return Response(wear_trend(request.user, get_days_param(request, 30)))
+
+
+class OutfitSearchView(generics.ListAPIView):
+    """Search own (``scope=mine``, default) or public (``scope=public``) outfits, best match first"""
+    serializer_class = OutfitListSerializer
+    
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        scope = self.request.query_params.get('scope', 'mine')
+        if scope not in ('mine', 'public'):
+            raise serializers.ValidationError({'scope': "Must be 'mine' or 'public'."})
+        
+        if scope == 'public':
+            ids = search_outfit_ids(query, public=True)
+            queryset = Outfit.objects.filter(is_public=True)
+        else:
+            ids = search_outfit_ids(query, user=self.request.user)
+            queryset = Outfit.objects.filter(user=self.request.user)
+        return slim_outfits(order_by_ids(queryset, ids), self.request)
+
+
+def _touch_outfit(pk):
+    # Tag changes count as outfit changes for freshness checks
+    Outfit.objects.filter(pk=pk).update(updated_at=timezone.now())
+
+
+class OutfitTagsView(APIView):
+    """List or add tags of an outfit"""
+    
+    def get_outfit_id(self, request, pk):
+        if not Outfit.objects.filter(pk=pk, user=request.user).exists():
+            raise NotFound('Outfit not found')
+        return pk
+    
+    def get(self, request, pk):
+        outfit_id = self.get_outfit_id(request, pk)
+        tags = OutfitTag.objects.filter(outfit_id=outfit_id).order_by('pk')
+        return Response(OutfitTagSerializer(tags, many=True).data)
+    
+    def post(self, request, pk):
+        """Add one tag (``{"tag": ...}``) or several (``{"tags": [...]}``); existing tags are kept"""
+        outfit_id = self.get_outfit_id(request, pk)
+        if 'tags' in request.data:
+            values = request.data.get('tags')
+            if not isinstance(values, list):
+                raise serializers.ValidationError({'tags': 'Must be a list.'})
+            data = [{'tag': value} for value in values]
+        else:
+            data = [{'tag': request.data.get('tag')}]
+        
+        serializer = OutfitTagSerializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        
+        new_tags = dict.fromkeys(item['tag'] for item in serializer.validated_data)
+        OutfitTag.objects.bulk_create(
+            [OutfitTag(outfit_id=outfit_id, tag=tag) for tag in new_tags], ignore_conflicts=True
+        )
+        _touch_outfit(outfit_id)
+        
+        tags = OutfitTag.objects.filter(outfit_id=outfit_id).order_by('pk')
+        return Response(OutfitTagSerializer(tags, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class OutfitTagDetailView(APIView):
+    """Remove a tag from an outfit"""
+    
+    def delete(self, request, pk, tag):
+        deleted, _ = OutfitTag.objects.filter(
+            outfit_id=pk, outfit__user=request.user, tag=normalize_tag(tag)
+        ).delete()
+        if not deleted:
+            return Response(
+                {'error': 'Tag not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        _touch_outfit(pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TagCloudView(APIView):
+    """Get how often each tag is used across the user's outfits"""
+    
+    def get(self, request):
+        return Response({'tags': tag_cloud(request.user)})
 
 
 class OutfitStatsView(APIView):
     """Get statistics about user's wardrobe"""
     
+    @conditional_get(wardrobe_version)
     def get(self, request):
-        outfits = Outfit.objects.filter(user=request.user)
-        
-        # Get category breakdown
-        by_category = {}
-        for choice in Outfit.CATEGORY_CHOICES:
-            count = outfits.filter(category=choice[0]).count()
-            if count > 0:
-                by_category[choice[0]] = count
-        
-        # Get occasion breakdown
-        by_occasion = {}
-        for choice in Outfit.OCCASION_CHOICES:
-            count = outfits.filter(occasion=choice[0]).count()
-            if count > 0:
-                by_occasion[choice[0]] = count
-        
-        # Get season breakdown
-        by_season = {}
-        for choice in Outfit.SEASON_CHOICES:
-            count = outfits.filter(season=choice[0]).count()
-            if count > 0:
-                by_season[choice[0]] = count
-        
-        # Get most worn outfit
-        most_worn = outfits.filter(times_worn__gt=0).order_by('-times_worn').first()
-        most_worn_data = None
-        if most_worn:
-            most_worn_data = {
-                'id': most_worn.id,
-                'name': most_worn.name,
-                'times_worn': most_worn.times_worn
-            }
+        # Identical concurrent requests share one computation
+        stats = stats_flight.do(('stats', request.user.id), lambda: self.get_stats(request.user))
+        return Response(stats)
+    
+    def get_stats(self, user):
+        # Two queries: the counts (one aggregate or the maintained row) and the most worn outfit
+        if settings.WARDROBE_STATS_ENABLED:
+            counts = get_wardrobe_counts(user)
+        else:
+            counts = compute_wardrobe_counts(user)
         
-        return Response({
-            'total_outfits': outfits.count(),
-            'favorites_count': outfits.filter(is_favorite=True).count(),
-            'by_category': by_category,
-            'by_occasion': by_occasion,
-            'by_season': by_season,
-            'most_worn': most_worn_data
-        })
\ No newline at end of file
+        return build_stats_response(counts, most_worn_outfit(user))
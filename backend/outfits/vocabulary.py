@@ -0,0 +1,88 @@
+"""
+Canonical vocabularies and integer bitmap encoding for preference matching.
+
+User preferences and outfit attributes are encoded once, on save, as bitmaps
+over these vocabularies. Ranking then only needs ``(a & b).bit_count()``:
+no JSON parsing or string comparison on the hot path.
+
+Bits 0-62 are used so masks fit a signed 64-bit ``BigIntegerField``.
+"""
+import zlib
+
+MASK_BITS = 63
+
+CANONICAL_COLORS = [
+    'black', 'white', 'grey', 'beige', 'cream', 'brown', 'khaki', 'navy', 'blue', 'teal',
+    'green', 'olive', 'yellow', 'gold', 'orange', 'red', 'maroon', 'pink', 'purple', 'silver',
+    'multicolor',
+]
+
+# Common synonyms folded onto a canonical color
+COLOR_ALIASES = {
+    'gray': 'grey', 'charcoal': 'grey', 'ivory': 'cream', 'offwhite': 'cream',
+    'tan': 'beige', 'nude': 'beige', 'camel': 'brown', 'chocolate': 'brown',
+    'denim': 'blue', 'indigo': 'navy', 'turquoise': 'teal', 'mint': 'green',
+    'mustard': 'yellow', 'rust': 'orange', 'peach': 'orange', 'coral': 'pink',
+    'burgundy': 'maroon', 'wine': 'maroon', 'lavender': 'purple', 'violet': 'purple',
+    'lilac': 'purple', 'multi': 'multicolor', 'printed': 'multicolor',
+}
+
+# Styles are the outfit occasions
+STYLES = ['casual', 'formal', 'sports', 'party', 'work']
+
+_COLOR_BITS = {color: i for i, color in enumerate(CANONICAL_COLORS)}
+_STYLE_BITS = {style: i for i, style in enumerate(STYLES)}
+
+
+def normalize_color(text):
+    """
+    Map free-text color to a canonical color name.
+
+    The last recognised word wins, so 'light blue' -> 'blue'.
+
+    Returns:
+        str or None
+    """
+    if not text:
+        return None
+    for word in reversed(text.lower().replace('-', ' ').replace('/', ' ').split()):
+        word = COLOR_ALIASES.get(word, word)
+        if word in _COLOR_BITS:
+            return word
+    return None
+
+
+def color_mask(values):
+    """Bitmap of canonical colors mentioned in ``values``"""
+    mask = 0
+    for value in values or []:
+        color = normalize_color(value)
+        if color:
+            mask |= 1 << _COLOR_BITS[color]
+    return mask
+
+
+def style_mask(values):
+    """Bitmap of known styles in ``values``"""
+    mask = 0
+    for value in values or []:
+        bit = _STYLE_BITS.get((value or '').strip().lower())
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def brand_mask(values):
+    """
+    Bitmap of brands in ``values``.
+
+    Brands are an open vocabulary, so each normalised name is hashed onto one of
+    ``MASK_BITS`` bits. Collisions can produce rare false matches, which only
+    nudge ranking.
+    """
+    mask = 0
+    for value in values or []:
+        name = ''.join((value or '').lower().split())
+        if name:
+            mask |= 1 << (zlib.crc32(name.encode()) % MASK_BITS)
+    return mask
@@ -0,0 +1,148 @@
+"""
+Wear history.
+
+Every "mark as worn" appends a ``WearEvent``. Per-outfit daily counts are kept
+in ``OutfitWearDaily`` alongside, so time-windowed analytics ("not worn in 60
+days", "most worn this month") read at most one row per outfit per day instead
+of scanning raw events. Days are in the project time zone.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Outfit, OutfitWearDaily, WearEvent
+
+
+def record_wears(events):
+    """
+    Append wear events and bump the daily rollups.
+
+    Args:
+        events: iterable of (outfit_id, user_id, worn_at)
+
+    Returns:
+        int: Number of events written
+    """
+    events = list(events)
+    if not events:
+        return 0
+
+    with transaction.atomic():
+        WearEvent.objects.bulk_create(
+            [WearEvent(outfit_id=outfit_id, user_id=user_id, worn_at=worn_at)
+             for outfit_id, user_id, worn_at in events],
+            batch_size=500
+        )
+        bump_daily_counts(Counter(
+            (outfit_id, user_id, timezone.localdate(worn_at)) for outfit_id, user_id, worn_at in events
+        ))
+    return len(events)
+
+
+def bump_daily_counts(increments):
+    """
+    Add to daily rollup rows, creating missing ones.
+
+    Missing rows are inserted with a zero count (conflicts ignored, so
+    concurrent writers cannot fail or double count) and then every row is
+    incremented with ``F()``, one UPDATE per (day, increment) group.
+
+    Args:
+        increments: mapping of (outfit_id, user_id, day) -> count
+    """
+    OutfitWearDaily.objects.bulk_create(
+        [OutfitWearDaily(outfit_id=outfit_id, user_id=user_id, day=day, count=0)
+         for outfit_id, user_id, day in increments],
+        ignore_conflicts=True,
+        batch_size=500
+    )
+
+    groups = defaultdict(list)
+    for (outfit_id, _, day), count in increments.items():
+        groups[(day, count)].append(outfit_id)
+    for (day, count), outfit_ids in groups.items():
+        OutfitWearDaily.objects.filter(outfit_id__in=outfit_ids, day=day).update(count=F('count') + count)
+
+
+def rebuild_daily_counts():
+    """
+    Recompute all rollup rows from the event log.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    rows = (
+        WearEvent.objects.order_by()
+        .annotate(day=TruncDate('worn_at'))
+        .values('outfit_id', 'user_id', 'day')
+        .annotate(total=Count('id'))
+    )
+    with transaction.atomic():
+        OutfitWearDaily.objects.all().delete()
+        created = OutfitWearDaily.objects.bulk_create(
+            [OutfitWearDaily(outfit_id=row['outfit_id'], user_id=row['user_id'],
+                             day=row['day'], count=row['total'])
+             for row in rows.iterator()],
+            batch_size=500
+        )
+    return len(created)
+
+
+def window_start(days):
+    """First day included in a window of ``days`` days ending today"""
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def forgotten_outfits(user, days):
+    """
+    Outfits not worn in the last ``days`` days.
+
+    Outfits uploaded within the window are not forgotten yet.
+
+    Returns:
+        QuerySet: Least recently added first
+    """
+    start = window_start(days)
+    recently_worn = OutfitWearDaily.objects.filter(user=user, day__gte=start).values('outfit_id')
+    return (
+        Outfit.objects.filter(user=user, uploaded_at__date__lt=start)
+        .exclude(id__in=recently_worn)
+        .order_by('uploaded_at')
+    )
+
+
+def wear_trend(user, days, top=5):
+    """
+    Daily wear totals and most worn outfits over the last ``days`` days.
+
+    Returns:
+        dict: {'days', 'start', 'total', 'daily': [{day, count}], 'most_worn': [{id, name, count}]}
+    """
+    start = window_start(days)
+    rollups = OutfitWearDaily.objects.filter(user=user, day__gte=start).order_by()
+
+    daily = {
+        row['day']: row['total']
+        for row in rollups.values('day').annotate(total=Sum('count'))
+    }
+    series = [
+        {'day': day.isoformat(), 'count': daily.get(day, 0)}
+        for day in (start + timedelta(days=i) for i in range(days))
+    ]
+    most_worn = [
+        {'id': row['outfit_id'], 'name': row['outfit__name'], 'count': row['total']}
+        for row in rollups.values('outfit_id', 'outfit__name')
+        .annotate(total=Sum('count')).order_by('-total', 'outfit_id')[:top]
+    ]
+
+    return {
+        'days': days,
+        'start': start.isoformat(),
+        'total': sum(daily.values()),
+        'daily': series,
+        'most_worn': most_worn,
+    }
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fitresult',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='predictions_user_id_0992d7_idx'),
+        ),
+    ]
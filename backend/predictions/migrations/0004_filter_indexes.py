@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fitresult',
+            index=models.Index(fields=['user', 'fit_status', 'created_at'], name='predictions_user_id_a0bb51_idx'),
+        ),
+    ]
@@ -19,5 +19,13 @@ class FitResult(models.Model):
     recommendations = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination of the fit history
+            models.Index(fields=['user', 'created_at', 'id']),
+            # Fit history filtered by status, newest first
+            models.Index(fields=['user', 'fit_status', 'created_at']),
+        ]
+    
     def __str__(self):
         return f"{self.outfit.name} - {self.fit_status} ({self.fit_score}%)"
\ No newline at end of file
@@ -1,3 +1,46 @@
-from django.test import TestCase
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from outfits.models import Outfit
+from .models import FitResult
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FitResultListTests(APITestCase):
+    """Test fit history pagination"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        outfit = Outfit.objects.create(user=self.user, name='Jeans')
+        for i in range(25):
+            FitResult.objects.create(user=self.user, outfit=outfit, fit_score=80,
+                                     fit_status='tight' if i % 5 == 0 else 'good')
+
+    def test_cursor_pagination(self):
+        """Test fit history can be walked by cursor, newest first"""
+        response = self.client.get('/api/predictions/results/', {'cursor': ''})
+        self.assertEqual(len(response.data['results']), 20)
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 5)
+        self.assertIsNone(next_page.data['next'])
+
+        ids = [r['id'] for r in response.data['results'] + next_page.data['results']]
+        self.assertEqual(ids, list(FitResult.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_cursor_with_status_filter(self):
+        """Test the fit_status filter applies in cursor mode"""
+        response = self.client.get('/api/predictions/results/', {'cursor': '', 'fit_status': 'tight'})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_numbers_remain_the_default(self):
+        """Test requests without a cursor keep the page-number response"""
+        response = self.client.get('/api/predictions/results/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
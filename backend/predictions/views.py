@@ -6,6 +6,7 @@ from .serializers import FitResultSerializer
 from .ml_models import get_fit_predictor
 from measurements.models import Measurement
 from outfits.models import Outfit
+from common.pagination import KeysetOrPageNumberPagination
 
 class PredictFitView(APIView):
     def post(self, request):
@@ -64,9 +65,16 @@ class PredictFitView(APIView):
 
 class FitResultListView(generics.ListAPIView):
     serializer_class = FitResultSerializer
+    pagination_class = KeysetOrPageNumberPagination
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = FitResult.objects.filter(user=self.request.user).order_by('-created_at')
+        queryset = (
+            FitResult.objects.filter(user=self.request.user)
+            .select_related('outfit', 'user__measurement')
+            .prefetch_related('outfit__tags')
+            .order_by('-created_at')
+        )
         
         # Filter by fit_status if provided
         fit_status = self.request.query_params.get('fit_status', None)
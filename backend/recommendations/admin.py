@@ -1,3 +1,12 @@
 from django.contrib import admin
+from .models import RecommendationSnapshot, BodyProfileFactors
 
-# Register your models here.
+@admin.register(RecommendationSnapshot)
+class RecommendationSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'strategy', 'computed_at']
+    search_fields = ['user__username']
+
+@admin.register(BodyProfileFactors)
+class BodyProfileFactorsAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'interactions', 'built_at']
+    search_fields = ['bucket']
@@ -0,0 +1,298 @@
+"""
+Collaborative "fits people like you" recommendations.
+
+Users are grouped into body-profile buckets (body shape, gender and measurements
+rounded to ``BUCKET_CM``). An offline job builds a sparse bucket-by-outfit
+matrix from fit results and favorites, factorizes it with alternating least
+squares in NumPy and stores the low-dimensional factors. Serving a user is a
+single matrix-vector product of the public-outfit factors with their bucket's
+vector.
+"""
+import threading
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from outfits.models import Outfit
+from measurements.models import Measurement
+from predictions.models import FitResult
+from .models import BodyProfileFactors, OutfitFactors
+
+BUCKET_CM = 5
+FAVORITE_BONUS = 0.25
+
+DEFAULT_RANK = 16
+DEFAULT_ITERATIONS = 10
+DEFAULT_REG = 0.1
+
+FACTOR_DTYPE = np.float32
+
+
+def _rounded(value):
+    if not value:
+        return 'x'
+    return str(int(float(value) // BUCKET_CM * BUCKET_CM))
+
+
+def profile_buckets(measurement):
+    """
+    Buckets a measurement belongs to, most specific first.
+
+    Every user contributes to a fine bucket (shape, gender and rounded
+    chest/waist/hips) and a coarse one (shape and gender) used as fallback
+    when the fine bucket has no factors yet.
+    """
+    coarse = f"{measurement.body_shape or 'unknown'}:{measurement.gender}"
+    fine = ':'.join([coarse, _rounded(measurement.chest), _rounded(measurement.waist),
+                     _rounded(measurement.hips)])
+    return [fine, coarse]
+
+
+class InteractionMatrix:
+    """Compact sparse bucket-by-outfit matrix in CSR form (NumPy arrays only)"""
+
+    def __init__(self, buckets, outfit_ids, rows, cols, values):
+        self.buckets = buckets
+        self.outfit_ids = outfit_ids
+        self.shape = (len(buckets), len(outfit_ids))
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+
+    @property
+    def nnz(self):
+        return len(self.values)
+
+    def csr(self, transpose=False):
+        """
+        Row pointers, column indices and values, grouped by row.
+
+        Returns:
+            tuple: (indptr, indices, data)
+        """
+        rows, cols = (self.cols, self.rows) if transpose else (self.rows, self.cols)
+        n_rows = self.shape[1] if transpose else self.shape[0]
+        order = np.argsort(rows, kind='stable')
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return indptr, cols[order], self.values[order]
+
+
+def build_interaction_matrix():
+    """
+    Build the bucket-by-outfit matrix from all fit results and favorites.
+
+    Repeated (bucket, outfit) observations are averaged; favorites add
+    ``FAVORITE_BONUS`` on top of the owner's buckets.
+
+    Returns:
+        InteractionMatrix
+    """
+    user_buckets = {
+        m.user_id: profile_buckets(m)
+        for m in Measurement.objects.only('user_id', 'body_shape', 'gender', 'chest', 'waist', 'hips')
+    }
+
+    bucket_index, outfit_index = {}, {}
+    rows, cols, values, favorite = [], [], [], []
+
+    def add(user_id, outfit_id, value, is_favorite):
+        col = outfit_index.setdefault(outfit_id, len(outfit_index))
+        for bucket in user_buckets[user_id]:
+            rows.append(bucket_index.setdefault(bucket, len(bucket_index)))
+            cols.append(col)
+            values.append(value)
+            favorite.append(is_favorite)
+
+    for user_id, outfit_id, fit_score in FitResult.objects.filter(
+        user_id__in=user_buckets.keys()
+    ).values_list('user_id', 'outfit_id', 'fit_score').iterator():
+        add(user_id, outfit_id, float(fit_score) / 100, False)
+
+    for user_id, outfit_id in Outfit.objects.filter(
+        user_id__in=user_buckets.keys(), is_favorite=True
+    ).values_list('user_id', 'id').iterator():
+        add(user_id, outfit_id, 0.0, True)
+
+    buckets = sorted(bucket_index, key=bucket_index.get)
+    outfit_ids = np.array(sorted(outfit_index, key=outfit_index.get), dtype=np.int64)
+    if not values:
+        empty = np.array([], dtype=np.int32)
+        return InteractionMatrix(buckets, outfit_ids, empty, empty, np.array([], dtype=FACTOR_DTYPE))
+
+    rows = np.asarray(rows, dtype=np.int32)
+    cols = np.asarray(cols, dtype=np.int32)
+    values = np.asarray(values, dtype=FACTOR_DTYPE)
+    favorite = np.asarray(favorite, dtype=bool)
+    observed = (~favorite).astype(np.float64)
+
+    # Collapse duplicate cells: mean of fit scores plus the favorite bonus
+    cells, inverse = np.unique(rows.astype(np.int64) * len(outfit_ids) + cols, return_inverse=True)
+    fit_sum = np.bincount(inverse, weights=np.where(favorite, 0, values))
+    fit_count = np.bincount(inverse, weights=observed)
+    favorites = np.bincount(inverse, weights=1 - observed)
+    cell_values = np.where(fit_count > 0, fit_sum / np.maximum(fit_count, 1), 0.75)
+    cell_values += FAVORITE_BONUS * (favorites > 0)
+
+    return InteractionMatrix(
+        buckets, outfit_ids,
+        (cells // len(outfit_ids)).astype(np.int32),
+        (cells % len(outfit_ids)).astype(np.int32),
+        cell_values.astype(FACTOR_DTYPE),
+    )
+
+
+def _solve_side(target, fixed, indptr, indices, data, reg):
+    rank = fixed.shape[1]
+    eye = np.eye(rank, dtype=np.float64)
+    for i in range(len(indptr) - 1):
+        start, end = indptr[i], indptr[i + 1]
+        if start == end:
+            target[i] = 0
+            continue
+        observed = fixed[indices[start:end]].astype(np.float64)
+        # Weighted-lambda regularization: scale by the number of observations
+        a = observed.T @ observed + reg * (end - start) * eye
+        b = observed.T @ data[start:end]
+        target[i] = np.linalg.solve(a, b)
+
+
+def factorize(matrix, rank=DEFAULT_RANK, iterations=DEFAULT_ITERATIONS, reg=DEFAULT_REG, seed=0):
+    """
+    Factorize the observed cells with alternating least squares.
+
+    Returns:
+        tuple: (bucket_factors, outfit_factors) float32 arrays
+    """
+    rng = np.random.default_rng(seed)
+    n_buckets, n_outfits = matrix.shape
+    rank = max(1, min(rank, n_buckets, n_outfits))
+    bucket_factors = rng.normal(scale=0.1, size=(n_buckets, rank)).astype(FACTOR_DTYPE)
+    outfit_factors = rng.normal(scale=0.1, size=(n_outfits, rank)).astype(FACTOR_DTYPE)
+
+    by_bucket = matrix.csr()
+    by_outfit = matrix.csr(transpose=True)
+    for _ in range(iterations):
+        _solve_side(bucket_factors, outfit_factors, *by_bucket, reg)
+        _solve_side(outfit_factors, bucket_factors, *by_outfit, reg)
+
+    return bucket_factors, outfit_factors
+
+
+def build_factors(rank=DEFAULT_RANK, iterations=DEFAULT_ITERATIONS, reg=DEFAULT_REG):
+    """
+    Rebuild and store all factors.
+
+    Returns:
+        InteractionMatrix: The matrix the factors were learned from
+    """
+    matrix = build_interaction_matrix()
+    built_at = timezone.now()
+
+    if matrix.nnz:
+        bucket_factors, outfit_factors = factorize(matrix, rank, iterations, reg)
+    else:
+        bucket_factors = outfit_factors = np.zeros((0, 0), dtype=FACTOR_DTYPE)
+
+    counts = np.bincount(matrix.rows, minlength=len(matrix.buckets))
+    with transaction.atomic():
+        BodyProfileFactors.objects.all().delete()
+        OutfitFactors.objects.all().delete()
+        BodyProfileFactors.objects.bulk_create([
+            BodyProfileFactors(bucket=bucket, vector=bucket_factors[i].tobytes(),
+                               interactions=int(counts[i]), built_at=built_at)
+            for i, bucket in enumerate(matrix.buckets)
+        ], batch_size=1000)
+        OutfitFactors.objects.bulk_create([
+            OutfitFactors(outfit_id=int(outfit_id), vector=outfit_factors[i].tobytes(), built_at=built_at)
+            for i, outfit_id in enumerate(matrix.outfit_ids)
+        ], batch_size=1000)
+
+    return matrix
+
+
+class _PublicCatalog:
+    """Per-process cache of public-outfit factors, reloaded when a new build is stored"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self.outfit_ids = np.array([], dtype=np.int64)
+        self.owner_ids = np.array([], dtype=np.int64)
+        self.matrix = np.zeros((0, 0), dtype=FACTOR_DTYPE)
+
+    def get(self):
+        built_at = OutfitFactors.objects.order_by('-built_at').values_list('built_at', flat=True).first()
+        with self._lock:
+            if built_at != self._built_at:
+                rows = list(OutfitFactors.objects.filter(outfit__is_public=True)
+                            .values_list('outfit_id', 'outfit__user_id', 'vector'))
+                self.outfit_ids = np.array([r[0] for r in rows], dtype=np.int64)
+                self.owner_ids = np.array([r[1] for r in rows], dtype=np.int64)
+                self.matrix = (
+                    np.vstack([np.frombuffer(bytes(r[2]), dtype=FACTOR_DTYPE) for r in rows])
+                    if rows else np.zeros((0, 0), dtype=FACTOR_DTYPE)
+                )
+                self._built_at = built_at
+            return self.outfit_ids, self.owner_ids, self.matrix
+
+
+public_catalog = _PublicCatalog()
+
+
+class CollaborativeRecommender:
+    """Recommend public outfits that fit people with a similar body profile"""
+
+    def __init__(self, user):
+        self.user = user
+        try:
+            self.measurements = Measurement.objects.get(user=user)
+        except Measurement.DoesNotExist:
+            self.measurements = None
+
+    def recommend(self, limit=10):
+        """
+        Returns:
+            list: Recommended public outfits with scores
+        """
+        if not self.measurements:
+            return []
+
+        buckets = profile_buckets(self.measurements)
+        factors = {
+            f.bucket: f for f in BodyProfileFactors.objects.filter(bucket__in=buckets)
+        }
+        profile = next((factors[b] for b in buckets if b in factors), None)
+        if profile is None:
+            return []
+
+        outfit_ids, owner_ids, matrix = public_catalog.get()
+        vector = np.frombuffer(bytes(profile.vector), dtype=FACTOR_DTYPE)
+        if not len(outfit_ids) or matrix.shape[1] != len(vector):
+            return []
+
+        scores = matrix @ vector
+        scores[owner_ids == self.user.id] = -np.inf
+
+        # Over-fetch: outfits made private since the build are dropped below
+        n = min(len(scores), 2 * limit)
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+
+        outfits = Outfit.objects.filter(is_public=True).in_bulk(outfit_ids[top].tolist())
+        shape = self.measurements.body_shape or 'similar'
+        recommendations = []
+        for i in top:
+            outfit = outfits.get(int(outfit_ids[i]))
+            if outfit is None:
+                continue
+            recommendations.append({
+                'outfit': outfit,
+                'score': round(float(min(max(scores[i], 0), 1.25)) / 1.25 * 100, 2),
+                'reason': f'Fits people with a {shape} body shape like yours'
+            })
+        return recommendations[:limit]
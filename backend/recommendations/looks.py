@@ -0,0 +1,292 @@
+"""
+Complete look generator: pairs tops with bottoms and optionally adds an outer layer.
+
+Scoring a look is the sum of per-item scores (fit, occasion, season) plus a
+pairwise compatibility bonus (occasion, season, color harmony) for every pair
+of items in it. Because the pairwise bonus is bounded by ``MAX_PAIR_BONUS``,
+``top.score + bottom.score + MAX_PAIR_BONUS`` is an upper bound for any pair.
+With both sides sorted by score, the search stops scanning as soon as that
+bound cannot beat the current k-th best look, so large wardrobes are ranked
+without enumerating the full cartesian product.
+"""
+import heapq
+
+from outfits.models import Outfit
+from predictions.models import FitResult
+
+# Weights of the pairwise compatibility factors (each factor is in [0, 1])
+OCCASION_WEIGHT = 10
+SEASON_WEIGHT = 10
+COLOR_WEIGHT = 10
+MAX_PAIR_BONUS = OCCASION_WEIGHT + SEASON_WEIGHT + COLOR_WEIGHT
+
+# Per-item score components
+DEFAULT_FIT_SCORE = 75
+FIT_WEIGHT = 0.5
+MATCH_BONUS = 25
+UNKNOWN_BONUS = 10
+
+# Color families used for harmony; unknown colors are treated as neutral-ish
+COLOR_FAMILIES = {
+    'neutral': ['black', 'white', 'grey', 'gray', 'beige', 'cream', 'ivory', 'khaki', 'tan',
+                'navy', 'denim', 'brown', 'camel', 'charcoal', 'nude'],
+    'warm': ['red', 'orange', 'yellow', 'pink', 'coral', 'maroon', 'burgundy', 'gold',
+             'mustard', 'peach', 'rust'],
+    'cool': ['blue', 'green', 'purple', 'teal', 'turquoise', 'lavender', 'mint', 'olive',
+             'violet', 'silver', 'indigo'],
+}
+_COLOR_TO_FAMILY = {
+    color: family for family, colors in COLOR_FAMILIES.items() for color in colors
+}
+
+# Compatibility of two occasions (symmetric); missing pairs score 0.3
+_OCCASION_COMPAT = {
+    frozenset(['casual', 'work']): 0.6,
+    frozenset(['casual', 'party']): 0.6,
+    frozenset(['casual', 'sports']): 0.5,
+    frozenset(['formal', 'work']): 0.8,
+    frozenset(['formal', 'party']): 0.7,
+    frozenset(['party', 'work']): 0.4,
+    frozenset(['formal', 'sports']): 0.0,
+}
+
+_SEASON_ORDER = ['spring', 'summer', 'fall', 'winter']
+
+
+def color_family(color):
+    """Map a free-text color to its harmony family (None when unknown)"""
+    if not color:
+        return None
+    words = color.lower().replace('-', ' ').split()
+    for word in reversed(words):  # 'light blue' -> 'blue'
+        if word in _COLOR_TO_FAMILY:
+            return _COLOR_TO_FAMILY[word]
+    return None
+
+
+def occasion_compatibility(a, b):
+    if not a or not b:
+        return 0.5
+    if a == b:
+        return 1.0
+    return _OCCASION_COMPAT.get(frozenset([a, b]), 0.3)
+
+
+def season_compatibility(a, b):
+    if not a or not b:
+        return 0.5
+    if a == b or 'all_season' in (a, b):
+        return 1.0
+    distance = abs(_SEASON_ORDER.index(a) - _SEASON_ORDER.index(b))
+    return 0.5 if distance in (1, 3) else 0.0
+
+
+def color_harmony(a, b):
+    if a is None or b is None:
+        return 0.5
+    if a == 'neutral' or b == 'neutral':
+        return 1.0
+    if a == b:
+        return 0.7
+    return 0.4
+
+
+class LookItem:
+    """Lightweight scoring view of an outfit used by the search"""
+    __slots__ = ('outfit', 'score', 'occasion', 'season', 'color')
+
+    def __init__(self, outfit, score, occasion, season, color):
+        self.outfit = outfit
+        self.score = score
+        self.occasion = occasion
+        self.season = season
+        self.color = color
+
+
+def pair_bonus(a, b):
+    """Pairwise compatibility bonus in [0, MAX_PAIR_BONUS]"""
+    return (
+        OCCASION_WEIGHT * occasion_compatibility(a.occasion, b.occasion)
+        + SEASON_WEIGHT * season_compatibility(a.season, b.season)
+        + COLOR_WEIGHT * color_harmony(a.color, b.color)
+    )
+
+
+def item_score(fit_score, occasion, season, target_occasion=None, target_season=None):
+    """Per-item score in [0, 100] from fit and the requested occasion/season"""
+    score = FIT_WEIGHT * float(fit_score)
+
+    if not target_occasion:
+        score += MATCH_BONUS
+    elif occasion == target_occasion:
+        score += MATCH_BONUS
+    elif not occasion:
+        score += UNKNOWN_BONUS
+
+    if not target_season:
+        score += MATCH_BONUS
+    elif season in (target_season, 'all_season'):
+        score += MATCH_BONUS
+    elif not season:
+        score += UNKNOWN_BONUS
+
+    return score
+
+
+def top_k_pairs(tops, bottoms, k, stats=None):
+    """
+    Find the k best (top, bottom) pairs without scanning every combination.
+
+    Args:
+        tops, bottoms: lists of LookItem
+        k: number of pairs to return
+        stats: optional dict receiving the number of evaluated pairs
+
+    Returns:
+        list: (score, top, bottom) tuples, best first
+    """
+    if k <= 0 or not tops or not bottoms:
+        return []
+
+    tops = sorted(tops, key=lambda item: item.score, reverse=True)
+    bottoms = sorted(bottoms, key=lambda item: item.score, reverse=True)
+    best_bottom = bottoms[0].score
+
+    heap = []  # min-heap of (score, tiebreak, top, bottom)
+    evaluated = 0
+    counter = 0
+    for top in tops:
+        if len(heap) == k and top.score + best_bottom + MAX_PAIR_BONUS <= heap[0][0]:
+            break
+        for bottom in bottoms:
+            if len(heap) == k and top.score + bottom.score + MAX_PAIR_BONUS <= heap[0][0]:
+                break
+            evaluated += 1
+            score = top.score + bottom.score + pair_bonus(top, bottom)
+            counter += 1
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -counter, top, bottom))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, -counter, top, bottom))
+
+    if stats is not None:
+        stats['evaluated'] = evaluated
+
+    return [(score, top, bottom) for score, _, top, bottom in sorted(heap, reverse=True)]
+
+
+def best_layer(top, bottom, layers):
+    """
+    Pick the outer layer that adds the most to a pair.
+
+    ``layers`` must be sorted by score, best first.
+
+    Returns:
+        tuple: (gain, layer) or (None, None) when there are no layers
+    """
+    best_gain, best = None, None
+    for layer in layers:
+        if best_gain is not None and layer.score + 2 * MAX_PAIR_BONUS <= best_gain:
+            break
+        gain = layer.score + pair_bonus(layer, top) + pair_bonus(layer, bottom)
+        if best_gain is None or gain > best_gain:
+            best_gain, best = gain, layer
+    return best_gain, best
+
+
+def search_looks(tops, bottoms, layers=None, k=5, beam_width=None, stats=None):
+    """
+    Rank complete looks.
+
+    Pairs are found with ``top_k_pairs``; when layers are given, the best
+    ``beam_width`` pairs are extended with their best layer and re-ranked.
+
+    Returns:
+        list: dicts with 'items' (LookItems) and 'score' (0-100), best first
+    """
+    if not layers:
+        pairs = top_k_pairs(tops, bottoms, k, stats)
+        max_score = 2 * 100 + MAX_PAIR_BONUS
+        return [
+            {'items': [top, bottom], 'score': round(score / max_score * 100, 2)}
+            for score, top, bottom in pairs
+        ]
+
+    beam_width = beam_width or max(3 * k, 20)
+    layers = sorted(layers, key=lambda item: item.score, reverse=True)
+    max_score = 3 * 100 + 3 * MAX_PAIR_BONUS
+
+    looks = []
+    for score, top, bottom in top_k_pairs(tops, bottoms, beam_width, stats):
+        gain, layer = best_layer(top, bottom, layers)
+        looks.append({
+            'items': [top, bottom, layer],
+            'score': round((score + gain) / max_score * 100, 2),
+        })
+
+    looks.sort(key=lambda look: look['score'], reverse=True)
+    return looks[:k]
+
+
+class LookRecommender:
+    """Build complete looks from a user's wardrobe"""
+
+    def __init__(self, user):
+        self.user = user
+
+    def recommend(self, occasion=None, season=None, limit=5, layers=False):
+        """
+        Recommend complete looks.
+
+        Args:
+            occasion: str - Optional target occasion
+            season: str - Optional target season
+            limit: int - Number of looks
+            layers: bool - Add an outerwear layer to each look
+
+        Returns:
+            list: dicts with 'outfits', 'score' and 'reason'
+        """
+        categories = ['top', 'bottom'] + (['outerwear'] if layers else [])
+        outfits = Outfit.objects.filter(user=self.user, category__in=categories)
+
+        # Latest fit score per outfit
+        fit_scores = dict(
+            FitResult.objects.filter(user=self.user)
+            .order_by('created_at')
+            .values_list('outfit_id', 'fit_score')
+        )
+
+        by_category = {category: [] for category in categories}
+        for outfit in outfits:
+            score = item_score(
+                fit_scores.get(outfit.id, DEFAULT_FIT_SCORE),
+                outfit.occasion, outfit.season, occasion, season
+            )
+            by_category[outfit.category].append(
+                LookItem(outfit, score, outfit.occasion, outfit.season, color_family(outfit.color))
+            )
+
+        looks = search_looks(
+            by_category['top'], by_category['bottom'],
+            layers=by_category.get('outerwear'), k=limit
+        )
+
+        return [
+            {
+                'outfits': [item.outfit for item in look['items']],
+                'score': look['score'],
+                'reason': self._reason(look['items'], occasion, season),
+            }
+            for look in looks
+        ]
+
+    def _reason(self, items, occasion, season):
+        reasons = []
+        if occasion:
+            reasons.append(f'Put together for {occasion} occasions')
+        if season:
+            reasons.append(f'suited to {season}')
+        if all(color_harmony(items[0].color, item.color) >= 0.7 for item in items[1:]):
+            reasons.append('harmonious colors')
+        return ', '.join(reasons).capitalize() if reasons else 'Balanced look'
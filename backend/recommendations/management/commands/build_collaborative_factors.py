@@ -0,0 +1,29 @@
+"""
+Rebuild the "fits people like you" factors from all fit results and favorites.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommendations.collaborative import (
+    build_factors, DEFAULT_RANK, DEFAULT_ITERATIONS, DEFAULT_REG
+)
+
+
+class Command(BaseCommand):
+    help = 'Factorize the body-profile by outfit interaction matrix and store the factors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rank', type=int, default=DEFAULT_RANK, help='Number of latent factors')
+        parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='ALS iterations')
+        parser.add_argument('--reg', type=float, default=DEFAULT_REG, help='Regularization strength')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        matrix = build_factors(options['rank'], options['iterations'], options['reg'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Built factors for {matrix.shape[0]} profile buckets x {matrix.shape[1]} outfits '
+            f'({matrix.nnz} interactions) in {elapsed:.1f}s.'
+        ))
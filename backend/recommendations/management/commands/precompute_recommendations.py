@@ -0,0 +1,98 @@
+"""
+Precompute recommendation snapshots for active users.
+
+Users are split into shards and processed by a pool of worker processes. Each
+user's snapshots are replaced in a single transaction, so an interrupted run can
+simply be started again: users refreshed within ``--resume-window-hours`` are skipped.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from recommendations.models import RecommendationSnapshot
+from recommendations.snapshots import compute_snapshots, DEFAULT_STRATEGY
+
+User = get_user_model()
+
+
+def _init_worker():
+    # Needed when the platform spawns rather than forks worker processes
+    django.setup()
+
+
+def _precompute_shard(user_ids):
+    """Build snapshots for one shard of users inside a worker process"""
+    done = 0
+    for user in User.objects.filter(id__in=user_ids):
+        compute_snapshots(user)
+        done += 1
+    return done
+
+
+class Command(BaseCommand):
+    help = 'Precompute recommendation snapshots for active users using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of worker processes (1 runs inline)'
+        )
+        parser.add_argument(
+            '--shard-size', type=int, default=100,
+            help='Number of users handed to a worker at a time'
+        )
+        parser.add_argument(
+            '--resume-window-hours', type=float, default=12,
+            help='Skip users whose snapshots were computed within this many hours'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Recompute every user, ignoring existing snapshots'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = self._pending_user_ids(options['force'], options['resume_window_hours'])
+        if not user_ids:
+            self.stdout.write('No users need new snapshots.')
+            return
+
+        shard_size = max(1, options['shard_size'])
+        shards = [user_ids[i:i + shard_size] for i in range(0, len(user_ids), shard_size)]
+        workers = max(1, min(options['workers'], len(shards)))
+
+        self.stdout.write(f'Precomputing snapshots for {len(user_ids)} users in {len(shards)} shards '
+                          f'({workers} workers)...')
+
+        done = 0
+        if workers == 1:
+            for shard in shards:
+                done += _precompute_shard(shard)
+        else:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_precompute_shard, shard) for shard in shards]
+                for future in as_completed(futures):
+                    done += future.result()
+                    self.stdout.write(f'  {done}/{len(user_ids)} users done')
+
+        self.stdout.write(self.style.SUCCESS(f'Precomputed snapshots for {done} users.'))
+
+    def _pending_user_ids(self, force, resume_window_hours):
+        """Active users (with at least one outfit) that still need a snapshot in this run"""
+        users = User.objects.filter(is_active=True, outfits__isnull=False).distinct()
+
+        if not force:
+            cutoff = timezone.now() - timedelta(hours=resume_window_hours)
+            recent = RecommendationSnapshot.objects.filter(
+                strategy=DEFAULT_STRATEGY, computed_at__gte=cutoff
+            ).values('user_id')
+            users = users.exclude(id__in=recent)
+
+        return list(users.order_by('id').values_list('id', flat=True))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outfits', '0004_outfit_outerwear_category'),
+        ('recommendations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BodyProfileFactors',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=100, unique=True)),
+                ('vector', models.BinaryField(help_text='float32 factor vector')),
+                ('interactions', models.PositiveIntegerField(default=0)),
+                ('built_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutfitFactors',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vector', models.BinaryField(help_text='float32 factor vector')),
+                ('built_at', models.DateTimeField(db_index=True)),
+                ('outfit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='factors', to='outfits.outfit')),
+            ],
+        ),
+    ]
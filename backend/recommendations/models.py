@@ -1,3 +1,40 @@
 from django.db import models
+from django.contrib.auth import get_user_model
+from outfits.models import Outfit
 
-# Create your models here.
+User = get_user_model()
+
+
+class RecommendationSnapshot(models.Model):
+    """Precomputed ranking of outfits for one user and one recommendation strategy"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendation_snapshots')
+    strategy = models.CharField(max_length=50, help_text="e.g. 'default', 'occasion:casual', 'season:summer'")
+    entries = models.JSONField(default=list, blank=True, help_text="Ranked list of {id, score, reason}")
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'strategy')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.strategy} ({self.computed_at:%Y-%m-%d %H:%M})"
+
+
+class BodyProfileFactors(models.Model):
+    """Latent factors of a body-profile bucket, learned from fit results and favorites"""
+    bucket = models.CharField(max_length=100, unique=True)
+    vector = models.BinaryField(help_text="float32 factor vector")
+    interactions = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.bucket} ({self.interactions} interactions)"
+
+
+class OutfitFactors(models.Model):
+    """Latent factors of an outfit, learned from fit results and favorites"""
+    outfit = models.OneToOneField(Outfit, on_delete=models.CASCADE, related_name='factors')
+    vector = models.BinaryField(help_text="float32 factor vector")
+    built_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Factors for {self.outfit_id}"
@@ -1,12 +1,20 @@
 """
 Outfit recommendation engine for personalized suggestions.
 """
-from outfits.models import Outfit
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.lookups import Exact
+
+from outfits.colors import outfit_color
+from outfits.models import Outfit, UserPreferences
 from measurements.models import Measurement
 from predictions.models import FitResult
 from measurements.body_shape import get_body_shape_recommendations
 
 
+# Ranking bonus per matching preference dimension (color, brand, style)
+PREFERENCE_BONUS = 5
+
+
 class OutfitRecommender:
     """Recommend outfits based on user preferences and fit history"""
     
@@ -16,6 +24,36 @@ class OutfitRecommender:
             self.measurements = Measurement.objects.get(user=user)
         except Measurement.DoesNotExist:
             self.measurements = None
+        
+        # Only the precomputed bitmaps are loaded; the JSON lists are never parsed here
+        self.preference_masks = (
+            UserPreferences.objects.filter(user=user)
+            .values_list('color_mask', 'brand_mask', 'style_mask')
+            .first()
+        ) or (0, 0, 0)
+    
+    def recommend(self, occasion=None, season=None, limit=10):
+        """
+        Run the strategy selected by the request parameters.
+        
+        Args:
+            occasion: str - Optional occasion filter
+            season: str - Optional season filter
+            limit: int - Maximum number of recommendations
+            
+        Returns:
+            list: Recommended outfits with scores
+        """
+        if occasion:
+            return self.recommend_by_occasion(occasion, limit)
+        if season:
+            return self.recommend_by_season(season, limit)
+        
+        # Default: recommend by body shape, falling back to best fitting outfits
+        recommendations = self.recommend_by_body_shape(limit)
+        if not recommendations:
+            recommendations = self.get_best_fitting_outfits(limit)
+        return recommendations
     
     def recommend_by_body_shape(self, limit=10):
         """
@@ -58,24 +96,24 @@ class OutfitRecommender:
         Returns:
             list: Recommended outfits
         """
-        # Get outfits for the occasion
-        outfits = Outfit.objects.filter(
+        # Get outfits for the occasion, ranked in SQL so only `limit` rows are loaded
+        outfits = list(self._rank_by_preferences(Outfit.objects.filter(
             user=self.user,
             occasion=occasion
-        ).order_by('-times_worn', '-uploaded_at')
+        ))[:limit])
         
         # Get past fit results for scoring
         fit_results = {
             fr.outfit_id: fr.fit_score 
-            for fr in FitResult.objects.filter(user=self.user)
+            for fr in FitResult.objects.filter(user=self.user, outfit__in=outfits)
         }
         
         recommendations = []
-        for outfit in outfits[:limit]:
+        for outfit in outfits:
             score = fit_results.get(outfit.id, 75)  # Default score if no fit result
             recommendations.append({
                 'outfit': outfit,
-                'score': float(score),
+                'score': min(100.0, float(score) + outfit.preference_bonus),
                 'reason': f'Great for {occasion} occasions'
             })
         
@@ -93,17 +131,17 @@ class OutfitRecommender:
             list: Recommended outfits
         """
         # Get seasonal outfits
-        outfits = Outfit.objects.filter(
+        outfits = self._rank_by_preferences(Outfit.objects.filter(
             user=self.user
         ).filter(
             season__in=[season, 'all_season']
-        ).order_by('-times_worn', '-uploaded_at')
+        ))
         
         recommendations = []
         for outfit in outfits[:limit]:
             recommendations.append({
                 'outfit': outfit,
-                'score': 80,  # Base score for seasonal match
+                'score': 80 + outfit.preference_bonus,  # Base score for seasonal match
                 'reason': f'Perfect for {season}'
             })
         
@@ -152,7 +190,7 @@ class OutfitRecommender:
         fit_results = FitResult.objects.filter(
             user=self.user,
             fit_status__in=['perfect', 'good']
-        ).order_by('-fit_score')[:limit]
+        ).select_related('outfit').order_by('-fit_score')[:limit]
         
         recommendations = []
         for result in fit_results:
@@ -175,8 +213,34 @@ class OutfitRecommender:
         if outfit.is_favorite:
             score += 20
         
+        score += self._preference_bonus(outfit)
+        
         return min(100, score)
     
+    def _preference_bonus(self, outfit):
+        """Bonus for each preference dimension the outfit matches (popcount of AND-ed masks)"""
+        colors, brands, styles = self.preference_masks
+        matches = (
+            min(1, (outfit.color_mask & colors).bit_count())
+            + min(1, (outfit.brand_mask & brands).bit_count())
+            + min(1, (outfit.style_mask & styles).bit_count())
+        )
+        return PREFERENCE_BONUS * matches
+    
+    def _rank_by_preferences(self, queryset):
+        """Order by preference bonus (bitwise AND of the masks, computed in SQL), then most worn / newest"""
+        bonus = Value(0, output_field=IntegerField())
+        for field, mask in zip(('color_mask', 'brand_mask', 'style_mask'), self.preference_masks):
+            if mask:
+                bonus += Case(
+                    When(Exact(F(field).bitand(mask), 0), then=Value(0)),
+                    default=Value(PREFERENCE_BONUS),
+                    output_field=IntegerField(),
+                )
+        return queryset.annotate(preference_bonus=bonus).order_by(
+            '-preference_bonus', '-times_worn', '-uploaded_at'
+        )
+    
     def _calculate_similarity(self, outfit1, outfit2):
         """
         Calculate similarity between two outfits.
@@ -198,9 +262,10 @@ class OutfitRecommender:
                 similarity += 0.2
             factors += 1
         
-        # Color match
-        if outfit1.color and outfit2.color:
-            if outfit1.color.lower() == outfit2.color.lower():
+        # Color match (stated, or detected in the photo)
+        color1, color2 = outfit_color(outfit1), outfit_color(outfit2)
+        if color1 and color2:
+            if color1 == color2:
                 similarity += 0.2
             factors += 1
         
@@ -228,8 +293,8 @@ class OutfitRecommender:
         if outfit1.occasion and outfit2.occasion and outfit1.occasion == outfit2.occasion:
             reasons.append(f"Same occasion ({outfit1.get_occasion_display()})")
         
-        if outfit1.color and outfit2.color and outfit1.color.lower() == outfit2.color.lower():
-            reasons.append(f"Same color ({outfit1.color})")
+        if outfit_color(outfit1) and outfit_color(outfit1) == outfit_color(outfit2):
+            reasons.append(f"Same color ({outfit1.color or outfit1.primary_color})")
         
         if outfit1.brand and outfit2.brand and outfit1.brand.lower() == outfit2.brand.lower():
             reasons.append(f"Same brand ({outfit1.brand})")
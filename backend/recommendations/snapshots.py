@@ -0,0 +1,143 @@
+"""
+Precomputed recommendation snapshots.
+
+The nightly ``precompute_recommendations`` command stores the ranked output of
+every ``OutfitRecommender`` strategy per user, so peak-hour requests can be
+served from a single row instead of re-running the pipeline.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from outfits.models import Outfit, UserPreferences
+from measurements.models import Measurement
+from predictions.models import FitResult
+from .models import RecommendationSnapshot
+from .recommender import OutfitRecommender
+
+# Number of ranked entries stored per strategy; requests asking for more fall back to live
+SNAPSHOT_SIZE = 50
+
+DEFAULT_STRATEGY = 'default'
+
+
+def strategy_key(occasion=None, season=None):
+    """Map request parameters to the snapshot strategy key used by ``OutfitRecommender.recommend``"""
+    if occasion:
+        return f'occasion:{occasion}'
+    if season:
+        return f'season:{season}'
+    return DEFAULT_STRATEGY
+
+
+def all_strategies():
+    """
+    List every strategy worth precomputing.
+
+    Returns:
+        list: (key, kwargs) pairs for ``OutfitRecommender.recommend``
+    """
+    strategies = [(DEFAULT_STRATEGY, {})]
+    for occasion, _ in Outfit.OCCASION_CHOICES:
+        strategies.append((strategy_key(occasion=occasion), {'occasion': occasion}))
+    for season, _ in Outfit.SEASON_CHOICES:
+        if season != 'all_season':
+            strategies.append((strategy_key(season=season), {'season': season}))
+    return strategies
+
+
+def compute_snapshots(user):
+    """
+    Run all strategies for a user and replace their snapshots atomically.
+
+    Returns:
+        int: Number of snapshots written
+    """
+    recommender = OutfitRecommender(user)
+    computed_at = timezone.now()
+
+    snapshots = []
+    for key, kwargs in all_strategies():
+        recommendations = recommender.recommend(limit=SNAPSHOT_SIZE, **kwargs)
+        snapshots.append(RecommendationSnapshot(
+            user=user,
+            strategy=key,
+            entries=[
+                {'id': rec['outfit'].id, 'score': float(rec['score']), 'reason': rec['reason']}
+                for rec in recommendations
+            ],
+            computed_at=computed_at,
+        ))
+
+    with transaction.atomic():
+        RecommendationSnapshot.objects.filter(user=user).delete()
+        RecommendationSnapshot.objects.bulk_create(snapshots)
+
+    return len(snapshots)
+
+
+def snapshot_max_age():
+    return timedelta(hours=settings.RECOMMENDATION_SNAPSHOT_MAX_AGE_HOURS)
+
+
+def is_fresh(snapshot, now=None):
+    """
+    Check whether a snapshot can still be served.
+
+    A snapshot is fresh while it is younger than the configured maximum age and
+    none of its inputs (outfits, measurements, fit results, preferences) changed
+    after it was built.
+    """
+    now = now or timezone.now()
+    if snapshot.computed_at < now - snapshot_max_age():
+        return False
+
+    since = snapshot.computed_at
+    user = snapshot.user_id
+    if Outfit.objects.filter(user=user, updated_at__gt=since).exists():
+        return False
+    if Measurement.objects.filter(user=user, updated_at__gt=since).exists():
+        return False
+    if FitResult.objects.filter(user=user, created_at__gt=since).exists():
+        return False
+    if UserPreferences.objects.filter(user=user, updated_at__gt=since).exists():
+        return False
+    return True
+
+
+def get_snapshot_entries(user, occasion=None, season=None, limit=10):
+    """
+    Load ranked entries from a fresh snapshot.
+
+    Deleting an outfit does not make a snapshot stale, so outfits deleted since
+    it was built are dropped from the whole stored ranking before ``limit`` is
+    applied.
+
+    Returns:
+        list or None: ``{id, score, reason}`` entries, or None when no fresh
+        snapshot can answer the request.
+    """
+    if limit > SNAPSHOT_SIZE:
+        return None
+
+    try:
+        snapshot = RecommendationSnapshot.objects.get(
+            user=user, strategy=strategy_key(occasion, season)
+        )
+    except RecommendationSnapshot.DoesNotExist:
+        return None
+
+    if not is_fresh(snapshot):
+        return None
+
+    existing = set(Outfit.objects.filter(
+        user=user, pk__in=[entry['id'] for entry in snapshot.entries]
+    ).values_list('id', flat=True))
+    entries = [entry for entry in snapshot.entries if entry['id'] in existing]
+    if len(entries) < limit and len(snapshot.entries) == SNAPSHOT_SIZE:
+        # The live ranking would fill the gap from outfits ranked below the stored ones
+        return None
+    return entries[:limit]
+
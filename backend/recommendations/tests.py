@@ -1,3 +1,379 @@
-from django.test import TestCase
+import random
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from common.testing import QueryCounter, run_concurrently
+from outfits.models import Outfit, UserPreferences
+from outfits.serializers import OutfitSerializer
+from measurements.models import Measurement
+from predictions.models import FitResult
+from .recommender import OutfitRecommender, PREFERENCE_BONUS
+from .collaborative import build_interaction_matrix, profile_buckets
+from .looks import LookItem, pair_bonus, search_looks, top_k_pairs
+from .models import RecommendationSnapshot
+from .snapshots import all_strategies
+
+User = get_user_model()
+
+
+class PrecomputeRecommendationsTests(TestCase):
+    """Test the precompute_recommendations management command"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.casual = Outfit.objects.create(user=self.user, name='Jeans', occasion='casual', season='summer')
+        self.formal = Outfit.objects.create(user=self.user, name='Suit', occasion='formal', season='winter')
+        # Users without outfits are not precomputed
+        User.objects.create_user(username='idle', email='idle@example.com', password='testpass123')
+
+    def test_command_creates_snapshots_for_every_strategy(self):
+        """Test one snapshot is stored per strategy for active users only"""
+        call_command('precompute_recommendations', workers=1, stdout=mock.MagicMock())
+
+        snapshots = RecommendationSnapshot.objects.filter(user=self.user)
+        self.assertEqual(snapshots.count(), len(all_strategies()))
+        self.assertEqual(RecommendationSnapshot.objects.count(), len(all_strategies()))
+
+        casual = snapshots.get(strategy='occasion:casual')
+        self.assertEqual([entry['id'] for entry in casual.entries], [self.casual.id])
+
+    def test_command_resumes_by_skipping_fresh_users(self):
+        """Test users refreshed recently are skipped unless forced"""
+        call_command('precompute_recommendations', workers=1, stdout=mock.MagicMock())
+        first_run = RecommendationSnapshot.objects.get(user=self.user, strategy='default').computed_at
+
+        call_command('precompute_recommendations', workers=1, stdout=mock.MagicMock())
+        self.assertEqual(
+            RecommendationSnapshot.objects.get(user=self.user, strategy='default').computed_at,
+            first_run
+        )
+
+        call_command('precompute_recommendations', workers=1, force=True, stdout=mock.MagicMock())
+        self.assertGreater(
+            RecommendationSnapshot.objects.get(user=self.user, strategy='default').computed_at,
+            first_run
+        )
+
+
+class SnapshotServingTests(APITestCase):
+    """Test RecommendedOutfitsView serves snapshots when fresh"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/recommendations/outfits/'
+        self.outfit = Outfit.objects.create(user=self.user, name='Jeans', occasion='casual')
+        call_command('precompute_recommendations', workers=1, stdout=mock.MagicMock())
+
+    def get_live(self, params):
+        """Request recommendations and report whether they were computed live"""
+        with mock.patch('recommendations.views.OutfitRecommender', wraps=OutfitRecommender) as recommender:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, recommender.called
+
+    def test_fresh_snapshot_is_served_without_live_computation(self):
+        """Test a fresh snapshot answers the request"""
+        with mock.patch('recommendations.views.OutfitRecommender') as recommender:
+            response = self.client.get(self.url, {'occasion': 'casual'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recommender.assert_not_called()
+        self.assertEqual(response.data['recommendations'][0]['outfit']['id'], self.outfit.id)
+
+    def test_deleted_outfits_do_not_shorten_the_snapshot(self):
+        """Test outfits deleted after the snapshot are dropped before the limit is applied"""
+        others = [Outfit.objects.create(user=self.user, name=f'Tee {i}', occasion='casual') for i in range(4)]
+        call_command('precompute_recommendations', workers=1, force=True, stdout=mock.MagicMock())
+        top = self.client.get(self.url, {'occasion': 'casual', 'limit': 3}).data['recommendations'][0]
+        Outfit.objects.get(pk=top['outfit']['id']).delete()
+
+        with mock.patch('recommendations.views.OutfitRecommender') as recommender:
+            response = self.client.get(self.url, {'occasion': 'casual', 'limit': 3})
+        recommender.assert_not_called()
+        ids = [rec['outfit']['id'] for rec in response.data['recommendations']]
+        self.assertEqual(len(ids), 3)
+        self.assertNotIn(top['outfit']['id'], ids)
+        self.assertTrue(set(ids) <= {o.id for o in [self.outfit, *others]})
+
+    def test_snapshot_and_live_responses_match_serializer(self):
+        """Test both paths render outfits exactly like OutfitSerializer"""
+        expected = OutfitSerializer(self.outfit).data
+        snapshot = self.client.get(self.url, {'occasion': 'casual'}).data['recommendations']
+        RecommendationSnapshot.objects.all().delete()
+        live = self.client.get(self.url, {'occasion': 'casual'}).data['recommendations']
+
+        self.assertEqual(snapshot[0]['outfit'], expected)
+        self.assertEqual(live[0]['outfit'], expected)
+
+    def test_outfit_change_invalidates_snapshot(self):
+        """Test edits after the snapshot was built force live computation"""
+        Outfit.objects.create(user=self.user, name='Chinos', occasion='casual')
+
+        response, live = self.get_live({'occasion': 'casual'})
+        self.assertTrue(live)
+        self.assertEqual(len(response.data['recommendations']), 2)
+
+    def test_preference_change_invalidates_snapshot(self):
+        """Test changing preferences after the snapshot was built forces live computation"""
+        preferences = UserPreferences.objects.create(user=self.user, preferred_colors=['blue'])
+        call_command('precompute_recommendations', workers=1, force=True, stdout=mock.MagicMock())
+        self.assertFalse(self.get_live({'occasion': 'casual'})[1])
+
+        preferences.preferred_colors = ['black']
+        preferences.save(update_fields=['preferred_colors'])
+        self.assertTrue(self.get_live({'occasion': 'casual'})[1])
+
+    def test_expired_snapshot_falls_back_to_live(self):
+        """Test snapshots older than the maximum age are ignored"""
+        RecommendationSnapshot.objects.filter(user=self.user).update(
+            computed_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertTrue(self.get_live({'occasion': 'casual'})[1])
+
+    def test_large_limit_falls_back_to_live(self):
+        """Test limits beyond the stored ranking size are computed live"""
+        self.assertFalse(self.get_live({'limit': 10})[1])
+        self.assertTrue(self.get_live({'limit': 500})[1])
+
+
+class ConcurrentRecommendationTests(TransactionTestCase):
+    """Test identical concurrent requests share one recommendation computation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        for i in range(5):
+            Outfit.objects.create(user=self.user, name=f'Outfit {i}', occasion='casual')
+        self.url = '/api/recommendations/outfits/'
+
+    def request_recommendations(self, counter, params):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with connection.execute_wrapper(counter):
+            return client.get(self.url, params)
+
+    def test_concurrent_identical_requests_are_coalesced(self):
+        """Test the query count collapses to that of a single request"""
+        single = QueryCounter()
+        run_concurrently(1, lambda i: self.request_recommendations(single, {'occasion': 'casual'}))
+        self.assertGreater(single.count, 0)
+
+        original = OutfitRecommender.recommend
+
+        def slow_recommend(recommender, *args, **kwargs):
+            time.sleep(0.2)
+            return original(recommender, *args, **kwargs)
+
+        concurrent = QueryCounter()
+        with mock.patch.object(OutfitRecommender, 'recommend', autospec=True,
+                               side_effect=slow_recommend) as recommend:
+            responses = run_concurrently(
+                8, lambda i: self.request_recommendations(concurrent, {'occasion': 'casual'})
+            )
+
+        self.assertTrue(all(r.status_code == status.HTTP_200_OK for r in responses))
+        self.assertTrue(all(r.data == responses[0].data for r in responses))
+        self.assertEqual(recommend.call_count, 1)
+        self.assertEqual(concurrent.count, single.count)
+
+    def test_different_parameters_are_not_coalesced(self):
+        """Test requests with different parameters compute separately"""
+        def slow_recommend(recommender, *args, **kwargs):
+            time.sleep(0.2)
+            return []
+
+        occasions = ['casual', 'formal'] * 3
+        with mock.patch.object(OutfitRecommender, 'recommend', autospec=True,
+                               side_effect=slow_recommend) as recommend:
+            run_concurrently(
+                len(occasions),
+                lambda i: self.request_recommendations(QueryCounter(), {'occasion': occasions[i]})
+            )
+
+        self.assertEqual(recommend.call_count, 2)
+
+
+class LookSearchTests(SimpleTestCase):
+    """Test the pruned top-k look search against exhaustive enumeration"""
+
+    def random_items(self, rng, n):
+        occasions = [None, 'casual', 'formal', 'sports', 'party', 'work']
+        seasons = [None, 'spring', 'summer', 'fall', 'winter', 'all_season']
+        colors = [None, 'neutral', 'warm', 'cool']
+        return [
+            LookItem(i, rng.uniform(0, 100), rng.choice(occasions), rng.choice(seasons), rng.choice(colors))
+            for i in range(n)
+        ]
+
+    def test_pruned_pairs_match_brute_force(self):
+        """Test top_k_pairs returns the same scores as scanning every pair"""
+        rng = random.Random(7)
+        tops, bottoms = self.random_items(rng, 300), self.random_items(rng, 300)
+
+        stats = {}
+        pruned = [score for score, _, _ in top_k_pairs(tops, bottoms, 10, stats)]
+        brute = sorted(
+            (t.score + b.score + pair_bonus(t, b) for t in tops for b in bottoms), reverse=True
+        )[:10]
+
+        self.assertEqual(pruned, brute)
+        self.assertLess(stats['evaluated'], len(tops) * len(bottoms) // 10)
+
+    def test_layered_looks_include_a_layer(self):
+        """Test layered search returns three-item looks"""
+        rng = random.Random(3)
+        looks = search_looks(
+            self.random_items(rng, 50), self.random_items(rng, 50),
+            layers=self.random_items(rng, 20), k=3
+        )
+        self.assertEqual(len(looks), 3)
+        self.assertTrue(all(len(look['items']) == 3 for look in looks))
+        self.assertEqual(looks, sorted(looks, key=lambda look: look['score'], reverse=True))
+
+
+class CompleteLooksViewTests(APITestCase):
+    """Test the complete looks endpoint"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/recommendations/looks/'
+        self.shirt = Outfit.objects.create(user=self.user, name='Shirt', category='top',
+                                           occasion='work', color='white')
+        self.tee = Outfit.objects.create(user=self.user, name='Tee', category='top',
+                                         occasion='sports', color='red')
+        self.trousers = Outfit.objects.create(user=self.user, name='Trousers', category='bottom',
+                                              occasion='work', color='navy')
+        self.blazer = Outfit.objects.create(user=self.user, name='Blazer', category='outerwear',
+                                            occasion='work', color='grey')
+
+    def test_looks_pair_tops_with_bottoms(self):
+        """Test looks are ranked top/bottom pairs"""
+        response = self.client.get(self.url, {'occasion': 'work'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        looks = response.data['looks']
+        self.assertEqual(len(looks), 2)
+        self.assertEqual([o['id'] for o in looks[0]['outfits']], [self.shirt.id, self.trousers.id])
+
+    def test_layers_add_outerwear(self):
+        """Test layers=true adds an outer layer"""
+        response = self.client.get(self.url, {'occasion': 'work', 'layers': 'true', 'limit': 1})
+        self.assertEqual(
+            [o['id'] for o in response.data['looks'][0]['outfits']],
+            [self.shirt.id, self.trousers.id, self.blazer.id]
+        )
+
+
+class CollaborativeRecommendationTests(APITestCase):
+    """Test "fits people like you" factors and serving"""
+
+    def make_user(self, name, chest, waist, hips):
+        user = User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+        Measurement.objects.create(user=user, height=170, weight=65, chest=chest, waist=waist,
+                                   hips=hips, gender='female', body_shape='hourglass' if hips == chest else 'triangle')
+        return user
+
+    def setUp(self):
+        self.user = self.make_user('me', 90, 65, 90)
+        self.twin = self.make_user('twin', 91, 66, 91)
+        self.other = self.make_user('other', 85, 70, 100)
+
+        self.twin_dress = Outfit.objects.create(user=self.twin, name='Wrap Dress', is_public=True)
+        self.other_dress = Outfit.objects.create(user=self.other, name='A-line Dress', is_public=True)
+        self.own_dress = Outfit.objects.create(user=self.user, name='Own Dress', is_public=True)
+        self.private_dress = Outfit.objects.create(user=self.twin, name='Private Dress', is_favorite=True)
+
+        FitResult.objects.create(user=self.twin, outfit=self.twin_dress, fit_score=96, fit_status='perfect')
+        FitResult.objects.create(user=self.other, outfit=self.other_dress, fit_score=95, fit_status='perfect')
+        FitResult.objects.create(user=self.other, outfit=self.twin_dress, fit_score=40, fit_status='tight')
+        FitResult.objects.create(user=self.user, outfit=self.own_dress, fit_score=90, fit_status='perfect')
+
+        self.client.force_authenticate(user=self.user)
+
+    def test_interaction_matrix_is_bucketed(self):
+        """Test similar users share a bucket and duplicates are collapsed"""
+        matrix = build_interaction_matrix()
+        self.assertEqual(profile_buckets(self.user.measurement)[1], profile_buckets(self.twin.measurement)[1])
+        self.assertEqual(matrix.shape[1], 4)
+        self.assertEqual(len(set(zip(matrix.rows.tolist(), matrix.cols.tolist()))), matrix.nnz)
+
+    def test_people_like_you_ranks_outfits_fitting_similar_bodies(self):
+        """Test public outfits that fit similar users are ranked first"""
+        call_command('build_collaborative_factors', stdout=mock.MagicMock())
+
+        response = self.client.get('/api/recommendations/people-like-you/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        ids = [rec['outfit']['id'] for rec in response.data['recommendations']]
+        self.assertEqual(ids[0], self.twin_dress.id)
+        self.assertNotIn(self.own_dress.id, ids)
+        self.assertNotIn(self.private_dress.id, ids)
+
+    def test_no_factors_returns_empty(self):
+        """Test users are served nothing before the first build"""
+        response = self.client.get('/api/recommendations/people-like-you/')
+        self.assertEqual(response.data['recommendations'], [])
+
+
+class PreferenceRankingTests(TestCase):
+    """Test UserPreferences are folded into ranking"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.worn = Outfit.objects.create(user=self.user, name='Grey Tee', occasion='casual',
+                                          color='grey', times_worn=5)
+        self.preferred = Outfit.objects.create(user=self.user, name='Red Tee', occasion='casual',
+                                               color='red', brand='Uniqlo')
+
+    def test_preferred_outfits_rank_first(self):
+        """Test matching color and brand outrank a more worn outfit"""
+        ids = [rec['outfit'].id for rec in OutfitRecommender(self.user).recommend_by_occasion('casual')]
+        self.assertEqual(ids, [self.worn.id, self.preferred.id])
+
+        UserPreferences.objects.create(user=self.user, preferred_colors=['red'], preferred_brands=['uniqlo'])
+        recs = OutfitRecommender(self.user).recommend_by_occasion('casual')
+        self.assertEqual([rec['outfit'].id for rec in recs], [self.preferred.id, self.worn.id])
+        self.assertEqual(recs[0]['score'], 75 + 2 * PREFERENCE_BONUS)
+
+    def test_limit_applies_after_preference_ranking(self):
+        """Test the ranking runs in SQL so a LIMIT still returns the preferred outfit"""
+        UserPreferences.objects.create(user=self.user, preferred_colors=['red'])
+        Outfit.objects.filter(pk=self.worn.pk).update(season='summer')
+        Outfit.objects.filter(pk=self.preferred.pk).update(season='all_season')
+
+        recommender = OutfitRecommender(self.user)
+        with CaptureQueriesContext(connection) as captured:
+            recs = recommender.recommend_by_season('summer', limit=1)
+        self.assertEqual([rec['outfit'].id for rec in recs], [self.preferred.id])
+        self.assertEqual(recs[0]['score'], 80 + PREFERENCE_BONUS)
+        self.assertTrue(any('LIMIT 1' in query['sql'] for query in captured.captured_queries))
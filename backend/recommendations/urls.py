@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import RecommendedOutfitsView, SimilarOutfitsView
+from .views import RecommendedOutfitsView, SimilarOutfitsView, CompleteLooksView, PeopleLikeYouView
 
 urlpatterns = [
     path('outfits/', RecommendedOutfitsView.as_view(), name='recommended-outfits'),
     path('outfits/<int:pk>/similar/', SimilarOutfitsView.as_view(), name='similar-outfits'),
+    path('looks/', CompleteLooksView.as_view(), name='complete-looks'),
+    path('people-like-you/', PeopleLikeYouView.as_view(), name='people-like-you'),
 ]
@@ -1,45 +1,64 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import prefetch_related_objects
+from outfits.models import Outfit
+from outfits.representations import represent_instances, represent_outfits
 from outfits.serializers import OutfitSerializer
 from .recommender import OutfitRecommender
+from .looks import LookRecommender
+from .collaborative import CollaborativeRecommender
+from .snapshots import get_snapshot_entries
+from common.singleflight import SingleFlight
+
+recommendation_flight = SingleFlight()
 
 
 class RecommendedOutfitsView(APIView):
     """Get personalized outfit recommendations"""
     
     def get(self, request):
-        recommender = OutfitRecommender(request.user)
-        
         # Get query parameters
         occasion = request.query_params.get('occasion')
         season = request.query_params.get('season')
         limit = int(request.query_params.get('limit', 10))
         
-        # Get recommendations based on parameters
-        if occasion:
-            recommendations = recommender.recommend_by_occasion(occasion, limit)
-        elif season:
-            recommendations = recommender.recommend_by_season(season, limit)
-        else:
-            # Default: recommend by body shape
-            recommendations = recommender.recommend_by_body_shape(limit)
-            
-            # If no body shape recommendations, get best fitting outfits
-            if not recommendations:
-                recommendations = recommender.get_best_fitting_outfits(limit)
+        # Identical concurrent requests (e.g. several dashboard widgets) share one computation
+        key = ('recommendations', request.user.id, occasion, season, limit)
+        results = recommendation_flight.do(
+            key, lambda: self.get_results(request.user, occasion, season, limit)
+        )
         
-        # Serialize recommendations
-        results = []
-        for rec in recommendations:
-            outfit_data = OutfitSerializer(rec['outfit']).data
-            results.append({
+        return Response({'recommendations': results})
+    
+    def get_results(self, user, occasion, season, limit):
+        # Serve the nightly snapshot when it is still fresh, otherwise compute live
+        entries = get_snapshot_entries(user, occasion, season, limit)
+        if entries is not None:
+            # Rows straight from .values(); an outfit deleted meanwhile is skipped
+            outfits = {
+                data['id']: data for data in
+                represent_outfits([entry['id'] for entry in entries], Outfit.objects.filter(user=user))
+            }
+            return [
+                {'outfit': outfits[entry['id']], 'score': entry['score'], 'reason': entry['reason']}
+                for entry in entries
+                if entry['id'] in outfits
+            ]
+        
+        recommender = OutfitRecommender(user)
+        recommendations = recommender.recommend(occasion, season, limit)
+        
+        # Render the already loaded outfits without DRF field machinery
+        outfits = represent_instances([rec['outfit'] for rec in recommendations])
+        return [
+            {
                 'outfit': outfit_data,
                 'score': rec.get('score', rec.get('similarity_score', 0)),
                 'reason': rec['reason']
-            })
-        
-        return Response({'recommendations': results})
+            }
+            for rec, outfit_data in zip(recommendations, outfits)
+        ]
 
 
 class SimilarOutfitsView(APIView):
@@ -51,14 +70,59 @@ class SimilarOutfitsView(APIView):
         
         similar_outfits = recommender.recommend_similar(pk, limit)
         
-        # Serialize results
-        results = []
-        for item in similar_outfits:
-            outfit_data = OutfitSerializer(item['outfit']).data
-            results.append({
+        # Render the already loaded outfits without DRF field machinery
+        outfits = represent_instances([item['outfit'] for item in similar_outfits])
+        results = [
+            {
                 'outfit': outfit_data,
                 'similarity_score': item['similarity_score'],
                 'reason': item['reason']
-            })
+            }
+            for item, outfit_data in zip(similar_outfits, outfits)
+        ]
         
         return Response({'similar_outfits': results})
+
+
+class CompleteLooksView(APIView):
+    """Get complete looks pairing tops with bottoms (and optionally an outer layer)"""
+    
+    def get(self, request):
+        occasion = request.query_params.get('occasion')
+        season = request.query_params.get('season')
+        limit = int(request.query_params.get('limit', 5))
+        layers = request.query_params.get('layers', 'false').lower() == 'true'
+        
+        looks = LookRecommender(request.user).recommend(occasion, season, limit, layers)
+        prefetch_related_objects([outfit for look in looks for outfit in look['outfits']], 'tags')
+        
+        results = []
+        for look in looks:
+            results.append({
+                'outfits': OutfitSerializer(look['outfits'], many=True).data,
+                'score': look['score'],
+                'reason': look['reason']
+            })
+        
+        return Response({'looks': results})
+
+
+
+class PeopleLikeYouView(APIView):
+    """Get public outfits that fit people with a similar body profile"""
+    
+    def get(self, request):
+        limit = int(request.query_params.get('limit', 10))
+        
+        recommendations = CollaborativeRecommender(request.user).recommend(limit)
+        prefetch_related_objects([rec['outfit'] for rec in recommendations], 'tags')
+        
+        results = []
+        for rec in recommendations:
+            results.append({
+                'outfit': OutfitSerializer(rec['outfit']).data,
+                'score': rec['score'],
+                'reason': rec['reason']
+            })
+        
+        return Response({'recommendations': results})
@@ -0,0 +1,88 @@
+"""
+Delta sync of a user's wardrobe data.
+
+A client keeps the ``watermark`` returned by the previous sync and sends it as
+``since``. Changed rows are found through ``updated_at`` (``created_at`` for
+fit results, which are never edited) on per-user indexes, and deletions
+through tombstones. Without a usable watermark (first sync, or one older than
+tombstone retention) everything is returned with ``full: true`` and the
+client replaces its local copy.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from measurements.models import Measurement
+from measurements.serializers import MeasurementSerializer
+from outfits.models import Outfit
+from outfits.representations import represent_queryset
+from predictions.models import FitResult
+from predictions.serializers import FitResultSerializer
+from .models import Tombstone
+
+
+def oldest_usable_watermark(now=None):
+    """Watermarks before this may have lost tombstones to purging"""
+    return (now or timezone.now()) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def build_changes(user, since=None):
+    """
+    Everything that changed for ``user`` since ``since``.
+
+    Args:
+        user: The syncing user
+        since: Watermark of the previous sync, or None for a full sync
+
+    Returns:
+        dict: watermark, full, outfits, measurement, fit_results and deleted ids per kind
+    """
+    now = timezone.now()
+    # Rows saved by transactions still in flight get an earlier updated_at than
+    # their commit time; lagging the watermark re-sends them instead of losing them
+    watermark = now - timedelta(seconds=settings.SYNC_WATERMARK_LAG_SECONDS)
+    full = since is None or since < oldest_usable_watermark(now)
+
+    outfits = Outfit.objects.filter(user=user).order_by('updated_at', 'id')
+    measurements = Measurement.objects.filter(user=user)
+    fit_results = (
+        FitResult.objects.filter(user=user)
+        .select_related('outfit', 'user__measurement')
+        .prefetch_related('outfit__tags')
+        .order_by('created_at', 'id')
+    )
+    deleted = {kind: [] for kind, _ in Tombstone.KIND_CHOICES}
+
+    if not full:
+        outfits = outfits.filter(updated_at__gt=since)
+        measurements = measurements.filter(updated_at__gt=since)
+        fit_results = fit_results.filter(created_at__gt=since)
+        tombstones = (
+            Tombstone.objects.filter(user_id=user.id, deleted_at__gt=since)
+            .order_by('deleted_at')
+            .values_list('kind', 'object_id')
+        )
+        for kind, object_id in tombstones:
+            deleted[kind].append(object_id)
+
+    measurement = measurements.first()
+    return {
+        'watermark': watermark.isoformat(),
+        'full': full,
+        'outfits': represent_queryset(outfits),
+        'measurement': MeasurementSerializer(measurement).data if measurement else None,
+        'fit_results': FitResultSerializer(fit_results, many=True).data,
+        'deleted': deleted,
+    }
+
+
+def purge_tombstones(now=None):
+    """
+    Delete tombstones older than the retention period.
+
+    Returns:
+        int: Number of tombstones deleted
+    """
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=oldest_usable_watermark(now)).delete()
+    return deleted
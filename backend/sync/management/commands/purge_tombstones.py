@@ -0,0 +1,17 @@
+"""
+Delete tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS.
+
+Clients whose watermark is older than the retention period receive a full
+sync, so purged tombstones are never needed. Run daily.
+"""
+from django.core.management.base import BaseCommand
+
+from sync.delta import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones past the retention period'
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones.'))
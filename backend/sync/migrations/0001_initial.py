@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-19 01:53
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('outfit', 'Outfit'), ('measurement', 'Measurement'), ('fit_result', 'Fit Result')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'deleted_at'], name='sync_tombst_user_id_0a082d_idx'), models.Index(fields=['deleted_at'], name='sync_tombst_deleted_a4ccdc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted object, so delta sync can tell clients to drop it.
+
+    ``user_id`` is a plain column rather than a foreign key: tombstones are
+    written while a user's data is being cascade-deleted and must not block
+    (or be removed by) the deletion of the user itself.
+    """
+    OUTFIT = 'outfit'
+    MEASUREMENT = 'measurement'
+    FIT_RESULT = 'fit_result'
+    KIND_CHOICES = [
+        (OUTFIT, 'Outfit'),
+        (MEASUREMENT, 'Measurement'),
+        (FIT_RESULT, 'Fit Result'),
+    ]
+    
+    user_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
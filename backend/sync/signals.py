@@ -0,0 +1,23 @@
+"""
+Record tombstones for deleted synced objects.
+"""
+from django.db.models.signals import post_delete
+
+from measurements.models import Measurement
+from outfits.models import Outfit
+from predictions.models import FitResult
+from .models import Tombstone
+
+SYNCED_MODELS = {
+    Outfit: Tombstone.OUTFIT,
+    Measurement: Tombstone.MEASUREMENT,
+    FitResult: Tombstone.FIT_RESULT,
+}
+
+
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(user_id=instance.user_id, kind=SYNCED_MODELS[sender], object_id=instance.pk)
+
+
+for model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'sync_tombstone_{model.__name__}')
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from io import StringIO
+from measurements.models import Measurement
+from outfits.models import Outfit
+from outfits.serializers import OutfitSerializer
+from predictions.models import FitResult
+from .models import Tombstone
+
+User = get_user_model()
+
+
+class SyncAPITests(APITestCase):
+    """Test delta sync"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/sync/'
+        self.jeans = Outfit.objects.create(user=self.user, name='Jeans')
+        self.shirt = Outfit.objects.create(user=self.user, name='Shirt')
+        Measurement.objects.create(user=self.user, height=170, weight=70, gender='female')
+
+    def sync(self, since=None):
+        response = self.client.get(self.url, {'since': since} if since else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def age(self, seconds=60):
+        """Move every existing row into the past, as if a sync happened in between"""
+        past = timezone.now() - timedelta(seconds=seconds)
+        Outfit.objects.update(updated_at=past)
+        Measurement.objects.update(updated_at=past)
+        FitResult.objects.update(created_at=past)
+        return (past + timedelta(seconds=1)).isoformat()
+
+    def test_first_sync_is_full(self):
+        """Test syncing without a watermark returns everything"""
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual({o['id'] for o in data['outfits']}, {self.jeans.id, self.shirt.id})
+        self.assertEqual(data['outfits'][0], OutfitSerializer(Outfit.objects.get(pk=data['outfits'][0]['id'])).data)
+        self.assertEqual(data['measurement']['height'], '170.00')
+        self.assertIn('watermark', data)
+
+    def test_delta_returns_only_changes_and_deletions(self):
+        """Test a watermark limits the response to later changes and tombstones"""
+        since = self.age()
+        self.jeans.name = 'Blue Jeans'
+        self.jeans.save()
+        FitResult.objects.create(user=self.user, outfit=self.jeans, fit_score=90, fit_status='good')
+        shirt_id = self.shirt.id
+        self.shirt.delete()
+
+        data = self.sync(since)
+        self.assertFalse(data['full'])
+        self.assertEqual([o['name'] for o in data['outfits']], ['Blue Jeans'])
+        self.assertIsNone(data['measurement'])
+        self.assertEqual(len(data['fit_results']), 1)
+        self.assertEqual(data['deleted']['outfit'], [shirt_id])
+
+    def test_nothing_changed(self):
+        """Test an up-to-date client receives an empty delta"""
+        data = self.sync(self.age())
+        self.assertEqual((data['outfits'], data['fit_results']), ([], []))
+        self.assertEqual(data['deleted'], {'outfit': [], 'measurement': [], 'fit_result': []})
+
+    def test_counter_updates_are_synced(self):
+        """Test UPDATE-based changes (worn counter) bump the sync watermark"""
+        since = self.age()
+        self.client.post(f'/api/outfits/{self.jeans.id}/worn/')
+        self.assertEqual([o['id'] for o in self.sync(since)['outfits']], [self.jeans.id])
+
+    def test_stale_watermark_forces_full_sync(self):
+        """Test watermarks older than tombstone retention get a full sync"""
+        data = self.sync((timezone.now() - timedelta(days=365)).isoformat())
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['outfits']), 2)
+
+    def test_invalid_watermark(self):
+        """Test malformed watermarks are rejected"""
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_changes_are_not_synced(self):
+        """Test sync is scoped to the requesting user"""
+        since = self.age()
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        Outfit.objects.create(user=stranger, name='Theirs').delete()
+        data = self.sync(since)
+        self.assertEqual((data['outfits'], data['deleted']['outfit']), ([], []))
+
+    def test_user_deletion_and_purge(self):
+        """Test deleting a user cascades cleanly and old tombstones are purged"""
+        stranger = User.objects.create_user(username='stranger', email='s@example.com', password='testpass123')
+        Outfit.objects.create(user=stranger, name='Theirs')
+        stranger.delete()
+        self.assertEqual(Tombstone.objects.filter(kind=Tombstone.OUTFIT).count(), 1)
+
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=60))
+        call_command('purge_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
@@ -0,0 +1,29 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from .delta import build_changes
+
+
+class SyncView(APIView):
+    """Get wardrobe changes since the client's last sync watermark"""
+    
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response(
+                    {'error': 'since must be a watermark returned by a previous sync'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        else:
+            since = None
+        
+        return Response(build_changes(request.user, since))